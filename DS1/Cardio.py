@@ -2,6 +2,10 @@
 GOAL : Build a binary classification model that predicts whether a person
 is at risk of heart disease based on lifestyle and general health factors.
 Target column → Heart_Disease
+
+Model search / training from the command line: python DS1/train_stage1.py
+(cached per-fold preprocessing, parallel successive halving, writes
+DS1/Models/stage1_xgb_<ts>.joblib + .json metadata).
 '''
 #I mport Liberaries
 import pandas as pd
@@ -15,8 +19,10 @@ import warnings
 warnings.filterwarnings('ignore')
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
-import joblib, json, os
+import joblib, json, os, sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # repo root, for columnar.py
+from columnar import load_table
 from packaging import version
 import sklearn
 from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score, GridSearchCV
@@ -41,7 +47,7 @@ plt.rcParams["figure.dpi"] = 120
 
 
 #read the dataset
-df= pd.read_csv(r"C:\Users\habib\OneDrive\المستندات\Graduation Project\GRAD-proj-DEPI\Cardio_Notebook\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv")
+df= load_table(r"C:\Users\habib\OneDrive\المستندات\Graduation Project\GRAD-proj-DEPI\Cardio_Notebook\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv")
 print(df.head())
 print("Shape:", df.shape)
 print("\nData types:\n", df.dtypes)
@@ -89,7 +95,7 @@ EDA Stage in visuals.py
 
 
 #Ensure target is numeric 0/1
-if df[TARGET].dtype=="O":
+if not pd.api.types.is_numeric_dtype(df[TARGET]):
     df[TARGET] = df[TARGET].map({"Yes":1,"No":0}).astype(int)
 
 X = df[CAT + NUM].copy()
@@ -2,47 +2,130 @@
 """
 Graduation Project - Stage 1B: Exploratory Data Analysis (EDA)
 Goal: Explore lifestyle and general health factors influencing Heart Disease.
+
+    python DS1/Cardio_EDA.py [--data <csv>]
+        interactive: every figure opens (fig.show / plt.show), as before
+    python DS1/Cardio_EDA.py --report reports/eda [--data <csv>] [--workers N]
+        headless: the dataset is loaded once, the sections (univariate,
+        bivariate, multivariate, correlation) run in a process pool and
+        reports/eda/eda_report.html (self-contained: plotly.js and the
+        matplotlib PNGs are embedded) + eda_report.json (the computed tables)
+        are written, with a timing breakdown per section.
+        --no-figures skips the figures (tables + timings only, much faster).
+
+Point-heavy figures (box plots with all points, histograms, the 3D scatter)
+use a REPORT_SAMPLE_ROWS sample in the report, pairplot and parallel
+coordinates STATIC_SAMPLE_ROWS; the tables are always computed on the full
+data.
 """
 
 # ===============================================================
 #  Import Libraries
 # ===============================================================
 
+import argparse
+import base64
+import html
+import io
+import json
+import os
+import time
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
 import warnings
 warnings.filterwarnings('ignore')
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # repo root, for columnar.py
+from columnar import load_table
+
+DATA_PATH = r"C:\Users\habib\OneDrive\المستندات\DEPI_GRAD_PROJECT\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv"
+REPORT_SAMPLE_ROWS = 20000
+STATIC_SAMPLE_ROWS = 5000     # pairplot / parallel coordinates draw every row with matplotlib
+
+num_cols = [
+    'Height_(cm)', 'Weight_(kg)', 'BMI',
+    'Alcohol_Consumption', 'Fruit_Consumption',
+    'Green_Vegetables_Consumption', 'FriedPotato_Consumption'
+]
+
+binary_cols = [
+    "Exercise", "Heart_Disease", "Skin_Cancer", "Other_Cancer",
+    "Depression", "Arthritis", "Smoking_History"
+]
+
+
+def _setup_style(headless=False):
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    # Visualization style setup
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette('husl')
+
+
+class Context:
+    """What a section needs besides df: report mode samples the point-heavy figures."""
+
+    def __init__(self, headless=False, figures=True, sample_rows=REPORT_SAMPLE_ROWS):
+        self.headless = headless
+        self.figures = figures
+        self.sample_rows = sample_rows
+
+    def sample(self, df, rows=None):
+        rows = self.sample_rows if rows is None else min(rows, self.sample_rows)
+        if self.headless and len(df) > rows:
+            return df.sample(rows, random_state=0)
+        return df
+
+
+def _records(obj):
+    """DataFrame / Series -> plain JSON (records / {key: value})."""
+    if isinstance(obj, pd.Series):
+        return {str(k): v for k, v in json.loads(obj.to_json(orient="index")).items()}
+    frame = obj.copy()
+    frame.columns = [" / ".join(map(str, c)) if isinstance(c, tuple) else str(c) for c in frame.columns]
+    if not isinstance(frame.index, pd.RangeIndex):
+        frame = frame.reset_index()
+    return json.loads(frame.to_json(orient="records"))
 
-# Visualization style setup
-plt.style.use('seaborn-v0_8')
-sns.set_palette('husl')
 
 # ===============================================================
-# Load Dataset
+# Section registry
 # ===============================================================
-df = pd.read_csv(r"C:\Users\habib\OneDrive\المستندات\DEPI_GRAD_PROJECT\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv")
+SECTIONS = {}   # name -> (group, title, fn(df, ctx) -> (tables, figures))
+
+
+def section(name, group, title):
+    def register(fn):
+        SECTIONS[name] = (group, title, fn)
+        return fn
+    return register
 
-print(f"✅ Dataset Loaded. Shape: {df.shape}")
-print(df.head())
 
 # ===============================================================
 #  Target Variable Exploration
 # ===============================================================
 
 # Heart Disease Distribution
-fig = px.pie(
-    df, names='Heart_Disease',
-    title='Heart Disease Status Distribution',
-    hole=0.4,
-    color_discrete_sequence=px.colors.qualitative.Set3
-)
-fig.update_traces(textposition='inside', textinfo='percent+label')
-fig.update_layout(title_x=0.5, template='plotly_white')
-fig.show()
+@section("heart_disease", "univariate", "Heart Disease Status Distribution")
+def heart_disease(df, ctx):
+    tables = {"counts": _records(df['Heart_Disease'].value_counts())}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
+    fig = px.pie(
+        df['Heart_Disease'].value_counts().reset_index(), names='Heart_Disease', values='count',
+        title='Heart Disease Status Distribution',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(title_x=0.5, template='plotly_white')
+    return tables, [fig]
 
 # ===============================================================
 # ===============================================================
@@ -53,23 +136,37 @@ fig.show()
 # ===============================================================
 #  General Health Distribution
 # ===============================================================
-if 'General_Health' in df.columns:
+@section("general_health", "univariate", "General Health Proportions")
+def general_health(df, ctx):
+    if 'General_Health' not in df.columns:
+        return {}, []
+    tables = {"counts": _records(df['General_Health'].value_counts())}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
     fig = px.pie(
-        df, names='General_Health',
+        df['General_Health'].value_counts().reset_index(), names='General_Health', values='count',
         title='General Health Proportions',
         hole=0.3,
         color_discrete_sequence=px.colors.qualitative.Pastel
     )
     fig.update_traces(textposition='inside', textinfo='percent+label')
     fig.update_layout(title_x=0.5, template='plotly_white')
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Medical Checkup Frequency
 # ===============================================================
-if 'Checkup' in df.columns:
+@section("checkup", "univariate", "Medical Checkup Frequency Among Patients")
+def checkup(df, ctx):
+    if 'Checkup' not in df.columns:
+        return {}, []
     checkup_counts = df['Checkup'].value_counts().sort_index().reset_index()
     checkup_counts.columns = ['Checkup Interval', 'Count']
+    tables = {"counts": _records(checkup_counts)}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
     fig = px.line(
         checkup_counts,
@@ -88,13 +185,21 @@ if 'Checkup' in df.columns:
         template='plotly_white',
         title_x=0.5
     )
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Age Category vs Heart Disease
 # ===============================================================
-if {'Age_Category', 'Heart_Disease'}.issubset(df.columns):
-    age_hd = df.groupby(['Age_Category', 'Heart_Disease']).size().reset_index(name='Count')
+@section("age_vs_heart_disease", "bivariate", "Heart Disease Cases per Age Group")
+def age_vs_heart_disease(df, ctx):
+    if not {'Age_Category', 'Heart_Disease'}.issubset(df.columns):
+        return {}, []
+    age_hd = df.groupby(['Age_Category', 'Heart_Disease'], observed=True).size().reset_index(name='Count')
+    rate = (df['Heart_Disease'] == 'Yes').groupby(df['Age_Category'], observed=True).mean()
+    tables = {"counts": _records(age_hd), "heart_disease_rate": _records(rate.round(4))}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
     fig = px.bar(
         age_hd,
@@ -110,14 +215,21 @@ if {'Age_Category', 'Heart_Disease'}.issubset(df.columns):
         template='plotly_white',
         title_x=0.5
     )
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Diabetes Frequency
 # ===============================================================
-if 'Diabetes' in df.columns:
+@section("diabetes", "univariate", "Patient Diabetes Status Frequency")
+def diabetes(df, ctx):
+    if 'Diabetes' not in df.columns:
+        return {}, []
     diabetes_freq = df['Diabetes'].value_counts().reset_index()
     diabetes_freq.columns = ['Diabetes Status', 'Count']
+    tables = {"counts": _records(diabetes_freq)}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
     fig = px.pie(
         diabetes_freq,
@@ -129,14 +241,21 @@ if 'Diabetes' in df.columns:
     )
     fig.update_traces(textposition='inside', textinfo='percent+label')
     fig.update_layout(title_x=0.5, template='plotly_white')
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Sex Distribution
 # ===============================================================
-if 'Sex' in df.columns:
+@section("sex", "univariate", "Sex Distribution in Dataset")
+def sex(df, ctx):
+    if 'Sex' not in df.columns:
+        return {}, []
     sex_freq = df['Sex'].value_counts().reset_index()
     sex_freq.columns = ['Sex', 'Count']
+    tables = {"counts": _records(sex_freq)}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
     fig = px.bar(
         sex_freq, x='Count', y='Sex',
@@ -153,77 +272,80 @@ if 'Sex' in df.columns:
         template='plotly_white',
         title_x=0.5
     )
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Binary (Yes/No) Feature Proportions
 # ===============================================================
+@section("binary_proportions", "univariate", "Proportion of Binary Responses Across Features")
+def binary_proportions(df, ctx):
+    prop_df = pd.DataFrame()
+    for col in binary_cols:
+        if col in df.columns:
+            total = len(df)
+            counts = df[col].value_counts().rename('Count')
+            norm = (counts / total * 100).rename('Percent')
+            temp = pd.DataFrame({
+                'Feature': col,
+                'Response': counts.index.astype(str),
+                'Count': counts.values,
+                'Percent': norm.values
+            })
+            prop_df = pd.concat([prop_df, temp], ignore_index=True)
+
+    pivot = prop_df.pivot(index='Feature', columns='Response', values='Percent').fillna(0)
+    tables = {"percent": _records(pivot.round(2))}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
-binary_cols = [
-    "Exercise", "Heart_Disease", "Skin_Cancer", "Other_Cancer",
-    "Depression", "Arthritis", "Smoking_History"
-]
-
-prop_df = pd.DataFrame()
-for col in binary_cols:
-    if col in df.columns:
-        total = len(df)
-        counts = df[col].value_counts().rename('Count')
-        norm = (counts / total * 100).rename('Percent')
-        temp = pd.DataFrame({
-            'Feature': col,
-            'Response': counts.index,
-            'Count': counts.values,
-            'Percent': norm.values
-        })
-        prop_df = pd.concat([prop_df, temp], ignore_index=True)
-
-pivot = prop_df.pivot(index='Feature', columns='Response', values='Percent').fillna(0)
-
-fig = px.bar(
-    pivot,
-    orientation='h',
-    barmode='stack',
-    title='Proportion of Binary Responses Across Features',
-    labels={"value": "Percent (%)", "Feature": "Feature"},
-    color_discrete_sequence=["#1E88E5", "#90CAF9"]
-)
-fig.update_traces(hovertemplate='%{y} - %{legendgroup}: %{x:.1f}%')
-fig.update_layout(
-    xaxis_title='Percent (%)',
-    yaxis_title='Feature',
-    template='plotly_white',
-    legend_title_text='Response',
-    legend=dict(itemsizing='trace', font=dict(size=14)),
-    title_x=0.5
-)
-fig.show()
+    fig = px.bar(
+        pivot,
+        orientation='h',
+        barmode='stack',
+        title='Proportion of Binary Responses Across Features',
+        labels={"value": "Percent (%)", "Feature": "Feature"},
+        color_discrete_sequence=["#1E88E5", "#90CAF9"]
+    )
+    fig.update_traces(hovertemplate='%{y} - %{legendgroup}: %{x:.1f}%')
+    fig.update_layout(
+        xaxis_title='Percent (%)',
+        yaxis_title='Feature',
+        template='plotly_white',
+        legend_title_text='Response',
+        legend=dict(itemsizing='trace', font=dict(size=14)),
+        title_x=0.5
+    )
+    return tables, [fig]
 
 # ===============================================================
 # Numeric Feature Distributions
 # ===============================================================
-
-num_cols = [
-    'Height_(cm)', 'Weight_(kg)', 'BMI',
-    'Alcohol_Consumption', 'Fruit_Consumption',
-    'Green_Vegetables_Consumption', 'FriedPotato_Consumption'
-]
-
-# --- Static overview (Seaborn)
-plt.figure(figsize=(15, 10))
-for i, col in enumerate(num_cols, 1):
-    if col in df.columns:
-        plt.subplot(4, 2, i)
-        sns.histplot(df[col], kde=True, color='#0077b6')
-        plt.title(f'Distribution of {col}')
-plt.tight_layout()
-plt.show()
-
-# --- Interactive Plotly distributions
-for col in num_cols:
-    if col in df.columns:
+@section("numeric_distributions", "univariate", "Numeric Feature Distributions")
+def numeric_distributions(df, ctx):
+    cols = [c for c in num_cols if c in df.columns]
+    tables = {"describe": _records(df[cols].astype(float).describe().T.round(3))}
+    if not ctx.figures:
+        return tables, []
+    import matplotlib.pyplot as plt
+    import plotly.express as px
+    import seaborn as sns
+    figures = []
+
+    # --- Static overview (Seaborn)
+    fig = plt.figure(figsize=(15, 10))
+    for i, col in enumerate(num_cols, 1):
+        if col in df.columns:
+            plt.subplot(4, 2, i)
+            sns.histplot(df[col], kde=True, color='#0077b6')
+            plt.title(f'Distribution of {col}')
+    plt.tight_layout()
+    figures.append(fig)
+
+    # --- Interactive Plotly distributions
+    for col in cols:
         fig = px.histogram(
-            df, x=col, nbins=30,
+            ctx.sample(df), x=col, nbins=30,
             title=f"Distribution of {col}",
             text_auto=True,
             marginal="box",
@@ -231,7 +353,8 @@ for col in num_cols:
             hover_data={col: True}
         )
         fig.update_layout(template='plotly_white', title_x=0.5)
-        fig.show()
+        figures.append(fig)
+    return tables, figures
 
 # ===============================================================
 # ===============================================================
@@ -242,36 +365,55 @@ for col in num_cols:
 # ===============================================================
 # BMI vs Exercise
 # ===============================================================
-if {'BMI', 'Exercise'}.issubset(df.columns):
+@section("bmi_vs_exercise", "bivariate", "BMI Distribution by Exercise Habits")
+def bmi_vs_exercise(df, ctx):
+    if not {'BMI', 'Exercise'}.issubset(df.columns):
+        return {}, []
+    tables = {"bmi_by_exercise": _records(
+        df['BMI'].astype(float).groupby(df['Exercise'], observed=True).describe().round(3))}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
     fig = px.box(
-        df, x="Exercise", y="BMI", color="Exercise",
+        ctx.sample(df), x="Exercise", y="BMI", color="Exercise",
         points="all",
         title="BMI Distribution by Exercise Habits",
         color_discrete_sequence=px.colors.sequential.Blues
     )
     fig.update_layout(template='plotly_white', title_x=0.5)
-    fig.show()
+    return tables, [fig]
 
 # ===============================================================
 # Numeric vs Heart Disease Comparison
 # ===============================================================
-if 'Heart_Disease' in df.columns:
-    for col in num_cols:
-        if col in df.columns:
-            fig = px.box(
-                df, x="Heart_Disease", y=col, color="Heart_Disease",
-                points="all",
-                title=f"{col} by Heart Disease Status",
-                color_discrete_sequence=px.colors.sequential.Blues
-            )
-            fig.update_traces(boxmean=True, jitter=0.25)
-            fig.update_layout(
-                template="plotly_white",
-                xaxis_title="Heart Disease",
-                yaxis_title=col,
-                title_x=0.5
-            )
-            fig.show()
+@section("numeric_vs_heart_disease", "bivariate", "Numeric Features by Heart Disease Status")
+def numeric_vs_heart_disease(df, ctx):
+    if 'Heart_Disease' not in df.columns:
+        return {}, []
+    cols = [c for c in num_cols if c in df.columns]
+    grouped = df[cols].astype(float).groupby(df['Heart_Disease'], observed=True)
+    tables = {"mean": _records(grouped.mean().round(3)), "median": _records(grouped.median().round(3))}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
+    figures = []
+    sample = ctx.sample(df)
+    for col in cols:
+        fig = px.box(
+            sample, x="Heart_Disease", y=col, color="Heart_Disease",
+            points="all",
+            title=f"{col} by Heart Disease Status",
+            color_discrete_sequence=px.colors.sequential.Blues
+        )
+        fig.update_traces(boxmean=True, jitter=0.25)
+        fig.update_layout(
+            template="plotly_white",
+            xaxis_title="Heart Disease",
+            yaxis_title=col,
+            title_x=0.5
+        )
+        figures.append(fig)
+    return tables, figures
 
 
 # ===============================================================
@@ -283,8 +425,15 @@ if 'Heart_Disease' in df.columns:
 # ---------------------------------------------------------------
 # Heart Disease by Age Group and Sex (stacked bar)
 # ---------------------------------------------------------------
-if {'Age_Category', 'Sex', 'Heart_Disease'}.issubset(df.columns):
-    age_sex_hd = df.groupby(['Age_Category', 'Sex', 'Heart_Disease']).size().reset_index(name='Count')
+@section("age_sex_heart_disease", "multivariate", "Heart Disease Distribution by Age and Sex")
+def age_sex_heart_disease(df, ctx):
+    if not {'Age_Category', 'Sex', 'Heart_Disease'}.issubset(df.columns):
+        return {}, []
+    age_sex_hd = df.groupby(['Age_Category', 'Sex', 'Heart_Disease'], observed=True).size().reset_index(name='Count')
+    tables = {"counts": _records(age_sex_hd)}
+    if not ctx.figures:
+        return tables, []
+    import plotly.express as px
 
     fig = px.bar(
         age_sex_hd,
@@ -295,14 +444,18 @@ if {'Age_Category', 'Sex', 'Heart_Disease'}.issubset(df.columns):
         color_discrete_sequence=px.colors.qualitative.Vivid
     )
     fig.update_layout(template='plotly_white', title_x=0.5)
-    fig.show()
+    return tables, [fig]
 
 # ---------------------------------------------------------------
 # BMI, Exercise, and Heart Disease (3D Scatter)
 # ---------------------------------------------------------------
-if {'BMI', 'Alcohol_Consumption', 'Heart_Disease'}.issubset(df.columns):
+@section("bmi_alcohol_fruit_3d", "multivariate", "3D View: BMI, Alcohol, and Fruit Consumption")
+def bmi_alcohol_fruit_3d(df, ctx):
+    if not ctx.figures or not {'BMI', 'Alcohol_Consumption', 'Heart_Disease'}.issubset(df.columns):
+        return {}, []
+    import plotly.express as px
     fig = px.scatter_3d(
-        df,
+        ctx.sample(df),
         x='BMI',
         y='Alcohol_Consumption',
         z='Fruit_Consumption',
@@ -313,75 +466,273 @@ if {'BMI', 'Alcohol_Consumption', 'Heart_Disease'}.issubset(df.columns):
         opacity=0.7
     )
     fig.update_layout(template='plotly_white', title_x=0.5)
-    fig.show()
+    return {}, [fig]
 
 # ---------------------------------------------------------------
 # Pairwise relationships (correlation between numerics)
 # ---------------------------------------------------------------
-num_cols = [
-    'Height_(cm)', 'Weight_(kg)', 'BMI',
-    'Alcohol_Consumption', 'Fruit_Consumption',
-    'Green_Vegetables_Consumption', 'FriedPotato_Consumption'
-]
-numeric_df = df[num_cols + ['Heart_Disease']].dropna()
-
-sns.pairplot(
-    numeric_df,
-    hue='Heart_Disease',
-    palette=['#3498DB', '#E74C3C'],
-    diag_kind='kde',
-    plot_kws={'alpha':0.6}
-)
-plt.suptitle("Pairwise Relationships Between Key Lifestyle Features", y=1.02)
-plt.show()
+@section("pairwise", "multivariate", "Pairwise Relationships Between Key Lifestyle Features")
+def pairwise(df, ctx):
+    if not ctx.figures:
+        return {}, []
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    numeric_df = ctx.sample(df[num_cols + ['Heart_Disease']].dropna(), STATIC_SAMPLE_ROWS)
+
+    grid = sns.pairplot(
+        numeric_df,
+        hue='Heart_Disease',
+        palette=['#3498DB', '#E74C3C'],
+        diag_kind='kde',
+        plot_kws={'alpha':0.6}
+    )
+    plt.suptitle("Pairwise Relationships Between Key Lifestyle Features", y=1.02)
+    return {}, [grid.figure]
 
 # ---------------------------------------------------------------
 # Correlation Heatmap (numerical + encoded target)
 # ---------------------------------------------------------------
-corr = numeric_df.corr()
-plt.figure(figsize=(10,8))
-sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f")
-plt.title("Correlation Matrix - Numeric Variables", fontsize=14, pad=15)
-plt.show()
+@section("correlation", "correlation", "Correlation Matrix - Numeric Variables")
+def correlation(df, ctx):
+    numeric_df = df[num_cols + ['Heart_Disease']].dropna()
+    numeric_df['Heart_Disease'] = numeric_df['Heart_Disease'].map({'Yes': 1, 'No': 0}).astype(float)
+    corr = numeric_df.astype(float).corr()
+    tables = {"pearson": _records(corr.round(4))}
+    if not ctx.figures:
+        return tables, []
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig = plt.figure(figsize=(10,8))
+    sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f")
+    plt.title("Correlation Matrix - Numeric Variables", fontsize=14, pad=15)
+    return tables, [fig]
 
 # ---------------------------------------------------------------
 #  Parallel Coordinates Plot (multi-feature pattern visualization)
 # ---------------------------------------------------------------
-from pandas.plotting import parallel_coordinates
-
-selected_features = [
-    'General_Health', 'Exercise', 'Smoking_History', 'Alcohol_Consumption',
-    'Fruit_Consumption', 'BMI', 'Heart_Disease'
-]
-subset_df = df[selected_features].dropna()
-
-# Encode categories temporarily for plotting
-subset_df['General_Health'] = subset_df['General_Health'].replace({
-    'Excellent':5, 'Very Good':4, 'Good':3, 'Fair':2, 'Poor':1
-})
-subset_df['Exercise'] = subset_df['Exercise'].map({'Yes':1, 'No':0})
-subset_df['Smoking_History'] = subset_df['Smoking_History'].map({'Yes':1, 'No':0})
-
-plt.figure(figsize=(12,6))
-parallel_coordinates(subset_df, class_column='Heart_Disease', colormap=plt.cm.cool)
-plt.title("Parallel Coordinates: Multi-Feature Relationship with Heart Disease", fontsize=14)
-plt.ylabel("Scaled Values (approx.)")
-plt.show()
+@section("parallel_coordinates", "multivariate", "Parallel Coordinates: Multi-Feature Relationship")
+def parallel_coordinates_plot(df, ctx):
+    if not ctx.figures:
+        return {}, []
+    import matplotlib.pyplot as plt
+    from pandas.plotting import parallel_coordinates
+
+    selected_features = [
+        'General_Health', 'Exercise', 'Smoking_History', 'Alcohol_Consumption',
+        'Fruit_Consumption', 'BMI', 'Heart_Disease'
+    ]
+    subset_df = ctx.sample(df[selected_features].dropna(), STATIC_SAMPLE_ROWS)
+
+    # Encode categories temporarily for plotting
+    subset_df['General_Health'] = subset_df['General_Health'].map({
+        'Excellent':5, 'Very Good':4, 'Good':3, 'Fair':2, 'Poor':1
+    }).astype(float)
+    subset_df['Exercise'] = subset_df['Exercise'].map({'Yes':1, 'No':0}).astype(float)
+    subset_df['Smoking_History'] = subset_df['Smoking_History'].map({'Yes':1, 'No':0}).astype(float)
+    subset_df['Heart_Disease'] = subset_df['Heart_Disease'].astype(str)
+
+    fig = plt.figure(figsize=(12,6))
+    parallel_coordinates(subset_df, class_column='Heart_Disease', colormap=plt.cm.cool)
+    plt.title("Parallel Coordinates: Multi-Feature Relationship with Heart Disease", fontsize=14)
+    plt.ylabel("Scaled Values (approx.)")
+    return {}, [fig]
 
 # ---------------------------------------------------------------
 # Grouped Heatmap (Lifestyle Risk Factors vs Heart Disease)
 # ---------------------------------------------------------------
-if {'Exercise', 'Smoking_History', 'Alcohol_Consumption'}.issubset(df.columns):
-    risk_table = df.groupby(['Exercise', 'Smoking_History', 'Heart_Disease']) \
+@section("lifestyle_risk_heatmap", "multivariate", "Heart Disease Counts by Exercise & Smoking Status")
+def lifestyle_risk_heatmap(df, ctx):
+    if not {'Exercise', 'Smoking_History', 'Alcohol_Consumption'}.issubset(df.columns):
+        return {}, []
+    risk_table = df.groupby(['Exercise', 'Smoking_History', 'Heart_Disease'], observed=True) \
                    .size().reset_index(name='Count')
     pivot = risk_table.pivot_table(
         index=['Exercise', 'Smoking_History'],
         columns='Heart_Disease',
-        values='Count', fill_value=0
-    )
-    plt.figure(figsize=(8,5))
+        values='Count', fill_value=0, observed=True
+    ).astype(int)
+    tables = {"counts": _records(pivot)}
+    if not ctx.figures:
+        return tables, []
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig = plt.figure(figsize=(8,5))
     sns.heatmap(pivot, annot=True, cmap='YlGnBu', fmt='d')
     plt.title("Heart Disease Counts by Exercise & Smoking Status", fontsize=13)
-    plt.show()
-
-print(" EDA Completed Successfully.")
\ No newline at end of file
+    return tables, [fig]
+
+
+# ===============================================================
+# Interactive run (the original notebook-style script)
+# ===============================================================
+def run_interactive(df):
+    import matplotlib.pyplot as plt
+    _setup_style()
+    ctx = Context()
+    for name, (group, title, fn) in SECTIONS.items():
+        _, figures = fn(df, ctx)
+        for fig in figures:
+            if hasattr(fig, "to_html"):
+                fig.show()
+            else:
+                plt.show()
+    print(" EDA Completed Successfully.")
+
+
+# ===============================================================
+# Headless report
+# ===============================================================
+_worker_df = None
+
+
+def _init_worker(data_path):
+    global _worker_df
+    _setup_style(headless=True)
+    if data_path is not None:
+        _worker_df = load_table(data_path)
+
+
+def _figure_html(fig):
+    if hasattr(fig, "to_html"):
+        return fig.to_html(full_html=False, include_plotlyjs=False)
+    import matplotlib.pyplot as plt
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100, bbox_inches="tight")
+    plt.close(fig)
+    return f'<img src="data:image/png;base64,{base64.b64encode(buf.getvalue()).decode()}">'
+
+
+def _run_section(name, figures=True, sample_rows=REPORT_SAMPLE_ROWS, df=None):
+    """One section in a worker: tables, figure HTML and where the time went."""
+    group, title, fn = SECTIONS[name]
+    df = _worker_df if df is None else df
+    t0 = time.perf_counter()
+    try:
+        tables, figs = fn(df, Context(headless=True, figures=figures, sample_rows=sample_rows))
+        error = None
+    except Exception as e:
+        tables, figs, error = {}, [], f"{type(e).__name__}: {e}"
+    t1 = time.perf_counter()
+    snippets = [_figure_html(fig) for fig in figs]
+    t2 = time.perf_counter()
+    return name, {"group": group, "title": title, "tables": tables, "error": error,
+                  "figures": len(snippets),
+                  "seconds": {"compute": round(t1 - t0, 3), "render": round(t2 - t1, 3),
+                              "total": round(t2 - t0, 3)}}, snippets
+
+
+def _write_html(path, report, snippets):
+    import plotly.offline
+    timing_rows = "".join(
+        f"<tr><td>{html.escape(name)}</td><td>{s['group']}</td><td>{s['seconds']['compute']:.2f}</td>"
+        f"<td>{s['seconds']['render']:.2f}</td><td>{s['seconds']['total']:.2f}</td></tr>"
+        for name, s in sorted(report["sections"].items(), key=lambda kv: -kv[1]["seconds"]["total"]))
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Cardio EDA report</title>",
+        f"<script type='text/javascript'>{plotly.offline.get_plotlyjs()}</script>",
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}"
+        "td:first-child{text-align:left}pre{background:#f6f6f6;padding:8px;max-height:300px;"
+        "overflow:auto}</style></head><body>",
+        "<h1>Cardio EDA report</h1>",
+        f"<p>{html.escape(report['dataset']['path'])}: {report['dataset']['rows']} rows, "
+        f"{report['dataset']['columns']} columns. Generated {report['generated_at']}.</p>",
+        "<h2>Timings (s)</h2><table><tr><th>stage</th><th></th><th>total</th></tr>",
+        "".join(f"<tr><td>{k}</td><td></td><td>{v:.2f}</td></tr>" for k, v in report["timings"].items()),
+        "</table><br><table><tr><th>section</th><th>group</th><th>compute</th><th>render</th>"
+        f"<th>total</th></tr>{timing_rows}</table>",
+    ]
+    for group in ("univariate", "bivariate", "multivariate", "correlation"):
+        parts.append(f"<h2>{group.capitalize()}</h2>")
+        for name, s in report["sections"].items():
+            if s["group"] != group:
+                continue
+            parts.append(f"<h3>{html.escape(s['title'])}</h3>")
+            if s["error"]:
+                parts.append(f"<p><b>failed:</b> {html.escape(s['error'])}</p>")
+            parts.extend(snippets.get(name, []))
+            for table, rows in s["tables"].items():
+                parts.append(f"<details><summary>{html.escape(table)}</summary><pre>"
+                             f"{html.escape(json.dumps(rows, indent=1))}</pre></details>")
+    parts.append("</body></html>")
+    Path(path).write_text("".join(parts), encoding="utf-8")
+
+
+def run_report(data_path, out_dir, workers=None, figures=True, sample_rows=REPORT_SAMPLE_ROWS):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t_start = time.perf_counter()
+    df = load_table(data_path)
+    t_loaded = time.perf_counter()
+    print(f"✅ Dataset Loaded. Shape: {df.shape} ({t_loaded - t_start:.1f}s)")
+
+    sections, snippets = {}, {}
+    workers = min(workers or os.cpu_count() or 1, len(SECTIONS))
+    if workers <= 1:
+        _setup_style(headless=True)
+        results = (_run_section(name, figures, sample_rows, df) for name in SECTIONS)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(str(data_path),))
+        # slowest first, so the long ones do not start last
+        order = sorted(SECTIONS, key=lambda n: n not in ("pairwise", "numeric_vs_heart_disease",
+                                                         "numeric_distributions"))
+        futures = [pool.submit(_run_section, name, figures, sample_rows) for name in order]
+        results = (f.result() for f in as_completed(futures))
+    try:
+        for name, info, html_parts in results:
+            sections[name], snippets[name] = info, html_parts
+            print(f"{'❌' if info['error'] else '✅'} {name}: {info['seconds']['total']:.2f}s"
+                  + (f" ({info['error']})" if info["error"] else ""))
+    finally:
+        if workers > 1:
+            pool.shutdown()
+    t_sections = time.perf_counter()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dataset": {"path": str(data_path), "rows": int(len(df)), "columns": int(df.shape[1])},
+        "workers": workers,
+        "sample_rows": sample_rows,
+        "sections": {name: sections[name] for name in SECTIONS if name in sections},
+    }
+    report["timings"] = {"load": round(t_loaded - t_start, 3),
+                         "sections_wall": round(t_sections - t_loaded, 3),
+                         "sections_cpu": round(sum(s["seconds"]["total"] for s in sections.values()), 3)}
+    if figures:
+        _write_html(out_dir / "eda_report.html", report, snippets)
+    report["timings"]["write"] = round(time.perf_counter() - t_sections, 3)
+    report["timings"]["total"] = round(time.perf_counter() - t_start, 3)
+    (out_dir / "eda_report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"📁 {out_dir / 'eda_report.json'}" + (f", {out_dir / 'eda_report.html'}" if figures else "")
+          + f" ({report['timings']['total']:.1f}s)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cardio EDA: interactive figures or a headless report")
+    parser.add_argument("--data", default=DATA_PATH, help="BRFSS export CSV")
+    parser.add_argument("--report", metavar="OUT_DIR",
+                        help="write eda_report.html / .json there instead of showing figures")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="report sections in parallel (default: CPU count; 1 = this process)")
+    parser.add_argument("--no-figures", action="store_true", help="report: tables and timings only")
+    parser.add_argument("--sample-rows", type=int, default=REPORT_SAMPLE_ROWS)
+    args = parser.parse_args()
+    if args.report:
+        report = run_report(args.data, args.report, args.workers, not args.no_figures,
+                            args.sample_rows)
+        return 1 if any(s["error"] for s in report["sections"].values()) else 0
+
+    # ===============================================================
+    # Load Dataset
+    # ===============================================================
+    df = load_table(args.data)
+
+    print(f"✅ Dataset Loaded. Shape: {df.shape}")
+    print(df.head())
+    run_interactive(df)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
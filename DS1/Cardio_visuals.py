@@ -9,32 +9,46 @@ It only provides functions to:
 - build specific Plotly figures if needed
 """
 
+from collections import Counter
+
 import pandas as pd
-import plotly.express as px
 import warnings
 warnings.filterwarnings("ignore")
 
+from columnar import chunk_specs, load_table, read_chunk
+
 DATA_PATH = r"C:\Users\habib\OneDrive\المستندات\DEPI_GRAD_PROJECT\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv"
 
 
+# columns get_visual_stats needs; the rest of the export is never read
+VISUAL_COLUMNS = ["Heart_Disease", "General_Health", "Age_Category", "Diabetes",
+                  "BMI", "Exercise", "Sex", "Alcohol_Consumption"]
+
+
 # -------------------------------------------------
 # Core loader
 # -------------------------------------------------
-def load_cardio_df(path: str = DATA_PATH) -> pd.DataFrame:
-    """Load full dataset once when called (not at import)."""
-    df = pd.read_csv(path)
-    return df
+def load_cardio_df(path: str = DATA_PATH, columns=None) -> pd.DataFrame:
+    """Load the dataset (typed; only `columns` if given) when called, not at import.
+    Uses the .feather copy from `python columnar.py convert` when present."""
+    return load_table(path, columns)
 
 
 # -------------------------------------------------
 # Small stats for React (JSON‑friendly)
 # -------------------------------------------------
-def get_visual_stats(path: str = DATA_PATH) -> dict:
+def get_visual_stats(path: str = DATA_PATH, chunksize: int = None, workers: int = 0) -> dict:
     """
     Return lightweight stats for React / APIs.
     Does NOT create any figures.
+
+    chunksize: stream the file in chunks of that many rows and merge partial
+    aggregates instead of loading it whole (same JSON); workers > 1
+    aggregates the chunks in a process pool.
     """
-    df = load_cardio_df(path)
+    if chunksize:
+        return get_visual_stats_streaming(path, chunksize, workers)
+    df = load_cardio_df(path, VISUAL_COLUMNS)
     stats = {}
 
     # 1) Heart disease yes / no
@@ -48,7 +62,7 @@ def get_visual_stats(path: str = DATA_PATH) -> dict:
     # 3) Age x Heart Disease
     if {"Age_Category", "Heart_Disease"}.issubset(df.columns):
         age_hd = (
-            df.groupby(["Age_Category", "Heart_Disease"])
+            df.groupby(["Age_Category", "Heart_Disease"], observed=True)
               .size()
               .reset_index(name="Count")
         )
@@ -61,8 +75,9 @@ def get_visual_stats(path: str = DATA_PATH) -> dict:
     # 5) BMI mean by exercise
     if {"BMI", "Exercise"}.issubset(df.columns):
         bmi_ex = (
-            df.groupby("Exercise")["BMI"]
+            df.groupby("Exercise", observed=True)["BMI"]
               .agg(["mean"])
+              .astype("float64")   # float32 columns, see columnar.py
               .round(1)
               .reset_index()
         )
@@ -75,8 +90,9 @@ def get_visual_stats(path: str = DATA_PATH) -> dict:
     # 7) Average alcohol consumption by exercise
     if {"Alcohol_Consumption", "Exercise"}.issubset(df.columns):
         alc_ex = (
-            df.groupby("Exercise")["Alcohol_Consumption"]
+            df.groupby("Exercise", observed=True)["Alcohol_Consumption"]
               .mean()
+              .astype("float64")
               .round(2)
               .reset_index()
         )
@@ -84,11 +100,100 @@ def get_visual_stats(path: str = DATA_PATH) -> dict:
 
     return stats
 
+
+# -------------------------------------------------
+# Streaming mode: chunked partial aggregates
+# -------------------------------------------------
+COUNT_STATS = {"heart_disease": "Heart_Disease", "general_health": "General_Health",
+               "diabetes": "Diabetes", "sex": "Sex"}
+MEAN_STATS = {"bmi_exercise": "BMI", "alcohol_exercise": "Alcohol_Consumption"}
+
+
+def _chunk_partial(spec) -> dict:
+    """Counts / sums of one chunk; small, so cheap to send back from a pool worker."""
+    df = read_chunk(spec, VISUAL_COLUMNS)
+    part = {"columns": set(df.columns)}
+    for key, col in COUNT_STATS.items():
+        if col in df.columns:
+            vc = df[col].value_counts()
+            part[key] = Counter({k: int(v) for k, v in vc.items() if v})
+    if {"Age_Category", "Heart_Disease"}.issubset(df.columns):
+        size = df.groupby(["Age_Category", "Heart_Disease"], observed=True).size()
+        part["age_disease"] = Counter({k: int(v) for k, v in size.items() if v})
+    if "Exercise" in df.columns:
+        for key, col in MEAN_STATS.items():
+            if col in df.columns:
+                g = df[col].astype("float64").groupby(df["Exercise"], observed=True).agg(["sum", "count"])
+                part[key] = {ex: [float(r["sum"]), int(r["count"])] for ex, r in g.iterrows()}
+    return part
+
+
+def _merge_partials(total, part):
+    if total is None:
+        return part
+    total["columns"] &= part["columns"]
+    for key, value in part.items():
+        if key == "columns":
+            continue
+        if isinstance(value, Counter):
+            total.setdefault(key, Counter()).update(value)
+        else:
+            acc = total.setdefault(key, {})
+            for ex, (s, n) in value.items():
+                a = acc.setdefault(ex, [0.0, 0])
+                a[0] += s
+                a[1] += n
+    return total
+
+
+def _finalize_partials(total) -> dict:
+    stats = {}
+    if total is None:
+        return stats
+    for key in ("heart_disease", "general_health", "age_disease", "diabetes",
+                "bmi_exercise", "sex", "alcohol_exercise"):
+        if key not in total:
+            continue
+        value = total[key]
+        if key == "age_disease":
+            stats[key] = [{"Age_Category": a, "Heart_Disease": h, "Count": n}
+                          for (a, h), n in sorted(value.items())]
+        elif key == "bmi_exercise":
+            stats[key] = [{"Exercise": ex, "mean": round(s / n, 1)}
+                          for ex, (s, n) in sorted(value.items()) if n]
+        elif key == "alcohol_exercise":
+            stats[key] = [{"Exercise": ex, "Alcohol_Consumption": round(s / n, 2)}
+                          for ex, (s, n) in sorted(value.items()) if n]
+        else:
+            stats[key] = dict(value.most_common())
+    return stats
+
+
+def get_visual_stats_streaming(path: str = DATA_PATH, chunksize: int = 200000,
+                               workers: int = 0) -> dict:
+    """get_visual_stats with peak memory bounded by one chunk (per worker)."""
+    specs = chunk_specs(path, chunksize)
+    total = None
+    if workers and workers > 1 and len(specs) > 1:
+        import multiprocessing as mp
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn: safe to start from the web app's threads (snapshot rebuilds)
+        with ProcessPoolExecutor(max_workers=min(workers, len(specs)),
+                                 mp_context=mp.get_context("spawn")) as pool:
+            for part in pool.map(_chunk_partial, specs):
+                total = _merge_partials(total, part)
+    else:
+        for spec in specs:
+            total = _merge_partials(total, _chunk_partial(spec))
+    return _finalize_partials(total)
+
 # -------------------------------------------------
 # Optional: Build individual Plotly figures (no .show())
 # You can still use these in a Flask template if needed.
+# plotly is imported here, not at module import: the API only needs the stats.
 # -------------------------------------------------
 def fig_heart_disease(df: pd.DataFrame):
+    import plotly.express as px
     if "Heart_Disease" not in df.columns:
         return None
     fig = px.pie(
@@ -104,6 +209,7 @@ def fig_heart_disease(df: pd.DataFrame):
 
 
 def fig_general_health(df: pd.DataFrame):
+    import plotly.express as px
     if "General_Health" not in df.columns:
         return None
     fig = px.pie(
@@ -119,6 +225,7 @@ def fig_general_health(df: pd.DataFrame):
 
 
 def fig_age_vs_hd(df: pd.DataFrame):
+    import plotly.express as px
     if {"Age_Category", "Heart_Disease"}.issubset(df.columns) is False:
         return None
     age_hd = (
@@ -1,19 +1,47 @@
 # DS1/cardio_predict.py
-import joblib
-import pandas as pd
 from pathlib import Path
-
-MODEL_PATH = Path(__file__).resolve().parent / "Models" / "stage1_xgb_latest.joblib"
-xgb_pipe = joblib.load(MODEL_PATH)
+from model_registry import ModelRegistry, Prediction
+from observability import get_logger, sampled, timed
+
+log = get_logger("lifestyle")
+
+MODELS_DIR = Path(__file__).resolve().parent / "Models"
+MODEL_PATH = MODELS_DIR / "stage1_xgb_latest.joblib"
+
+# row used to warm every newly loaded version before it is swapped in
+WARMUP_ROWS = [{
+    "General_Health": "Good", "Checkup": "Within the past year", "Exercise": "Yes",
+    "Heart_Disease": "No", "Skin_Cancer": "No", "Other_Cancer": "No", "Depression": "No",
+    "Diabetes": "No", "Arthritis": "No", "Sex": "Female", "Age_Category": "45-49",
+    "Height_(cm)": 170.0, "Weight_(kg)": 70.0, "BMI": 24.2, "Smoking_History": "No",
+    "Alcohol_Consumption": 0.0, "Fruit_Consumption": 30.0,
+    "Green_Vegetables_Consumption": 15.0, "FriedPotato_Consumption": 4.0,
+}]
+
+# Serves the newest stage1_xgb_<timestamp> artifact and hot-swaps new ones
+# (flask_app starts the watcher). MODEL_BACKEND=onnx → *.onnx artifacts.
+# Loaded on first use / by flask_app's warm-up, not at import.
+registry = ModelRegistry(MODELS_DIR, "stage1_xgb", warmup_rows=WARMUP_ROWS, name="lifestyle",
+                         lazy=True)
 
 def predict_lifestyle(input_dict: dict):
-    df = pd.DataFrame([input_dict])
-    print("\n=== DEBUG LIFESTYLE INPUT ===")
-    print(df.T)  # عرض الأعمدة والقيم
-    proba = xgb_pipe.predict_proba(df)[:, 1]
+    proba, version = registry.predict_proba([input_dict])
+    pred  = (proba >= 0.5).astype(int)
+    if sampled(log):  # LOG_LEVEL=DEBUG + LOG_SAMPLE_RATE
+        log.debug("lifestyle input=%s pred=%d proba=%.4f", input_dict, pred[0], proba[0])
+    return Prediction(int(pred[0]), float(proba[0]), version)
+
+def predict_lifestyle_batch(rows: list):
+    """
+    نفس predict_lifestyle لكن لعدة صفوف مرة واحدة:
+    مصفوفة واحدة + استدعاء predict_proba واحد.
+    ترجع list من Prediction (pred, proba) بنفس ترتيب الإدخال.
+    """
+    if not rows:
+        return []
+    proba, version = registry.predict_proba(rows)
     pred  = (proba >= 0.5).astype(int)
-    print("Pred:", int(pred[0]), "Prob:", float(proba[0]))
-    return int(pred[0]), float(proba[0])
+    return [Prediction(int(p), float(pr), version) for p, pr in zip(pred, proba)]
 
 def lifestyle_tips(row: dict):
     """
@@ -85,12 +113,19 @@ def lifestyle_tips(row: dict):
 
     return tips
 
-def full_lifestyle_eval(form_dict: dict):
+LIFESTYLE_REQUIRED = ("generalHealth", "exercise", "diabetes", "sex",
+                      "ageCategory", "bmi", "smoking")
+
+def build_life_dict(form_dict: dict):
     """
-    تأخذ بيانات الـ form من Flask، تبني life_dict الذي يناسب الموديل،
-    ثم ترجع (life_dict, pred, proba, tips).
+    تحول بيانات الـ form إلى life_dict الذي يناسب الموديل.
+    ترفع ValueError لو حقل مطلوب ناقص أو رقم غير صالح.
     """
-    life_dict = {
+    missing = [k for k in LIFESTYLE_REQUIRED if form_dict.get(k) in (None, "")]
+    if missing:
+        raise ValueError(f"Missing required fields: {', '.join(missing)}")
+
+    return {
         "General_Health": form_dict["generalHealth"],
         "Checkup": "Within the past year",
         "Exercise": form_dict["exercise"],
@@ -112,6 +147,56 @@ def full_lifestyle_eval(form_dict: dict):
         "FriedPotato_Consumption": float(form_dict.get("fried", 4) or 4),
     }
 
-    pred, proba = predict_lifestyle(life_dict)
-    tips = lifestyle_tips(life_dict)
-    return life_dict, pred, proba, tips
\ No newline at end of file
+def full_lifestyle_eval(form_dict: dict, predict=predict_lifestyle, tips=lifestyle_tips):
+    """
+    تأخذ بيانات الـ form من Flask، تبني life_dict الذي يناسب الموديل،
+    ثم ترجع (life_dict, pred, proba, tips).
+    predict / tips: دوال التقييم والنصائح (مثلاً MicroBatcher أو cache بدل الأصلية).
+    """
+    with timed("parse", model="lifestyle"):
+        life_dict = build_life_dict(form_dict)
+
+    with timed("predict", model="lifestyle"):
+        result = predict(life_dict)
+    pred, proba = result
+    with timed("tips", model="lifestyle"):
+        advice = tips(life_dict)
+    # metadata, not a model feature: which model version produced this row
+    life_dict["Model_Version"] = getattr(result, "model_version", None)
+    return life_dict, pred, proba, advice
+
+def full_lifestyle_eval_batch(form_dicts: list):
+    """
+    تقييم batch لعدة forms (مثلاً قائمة intake من عيادة).
+    الصفوف غير الصالحة ترجع {"index", "error"} ولا توقف باقي الـ batch؛
+    الصفوف الصالحة تُقيَّم كلها في استدعاء predict_proba واحد.
+    النتيجة بنفس ترتيب الإدخال.
+    """
+    results = [None] * len(form_dicts)
+    valid_idx, life_rows = [], []
+
+    with timed("parse", model="lifestyle", batch="1"):
+        for i, form_dict in enumerate(form_dicts):
+            if not isinstance(form_dict, dict):
+                results[i] = {"index": i, "error": "Record must be an object"}
+                continue
+            try:
+                life_rows.append(build_life_dict(form_dict))
+                valid_idx.append(i)
+            except (ValueError, TypeError) as e:
+                results[i] = {"index": i, "error": str(e)}
+
+    with timed("predict", model="lifestyle", batch="1"):
+        scored = predict_lifestyle_batch(life_rows)
+
+    with timed("tips", model="lifestyle", batch="1"):
+        for i, life_dict, result in zip(valid_idx, life_rows, scored):
+            pred, proba = result
+            results[i] = {
+                "index": i,
+                "pred": pred,
+                "proba": proba,
+                "tips": lifestyle_tips(life_dict),
+                "model_version": result.model_version,
+            }
+    return results
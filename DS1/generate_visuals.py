@@ -1,173 +1,411 @@
 """
 Graduation Project - Generate ALL Visuals for Flask Dashboard
 Saves every plot from Cardio_visuals.py as PNG in static/visuals/
+
+    python DS1/generate_visuals.py [--data <csv>] [--out static/visuals] [--workers N] [--force]
+
+Incremental build: static/visuals/manifest.json records, per PNG, a key made
+of the figure spec (builder source + parameters) and the hashes of the dataset
+columns it reads. A run hashes the CSV first: same file and same specs ->
+nothing to do, without even loading the data. Otherwise only the figures whose
+key changed (or whose PNG is missing) are rendered, in a process pool; each
+worker loads the dataset once and keeps one kaleido instance for all its
+figures. --force renders everything.
 """
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-import kaleido  # pip install kaleido
+import sys
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # repo root, for columnar.py
+import pandas as pd
 
-# Setup
-plt.style.use('seaborn-v0_8')
-sns.set_palette('husl')
+from columnar import load_table
+from stats_snapshot import fingerprint
+
+DATA_PATH = r"C:\Users\habib\OneDrive\المستندات\DEPI_GRAD_PROJECT\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv"
 
 # Create static/visuals directory
 VIS_DIR = Path("static/visuals")
-VIS_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST = "manifest.json"
+# bump to re-render everything after a change outside the builders (styles, dpi)
+RENDER_VERSION = 1
+
 
-print("📊 Generating ALL visuals for Flask dashboard...")
+# =====================================================
+# Figure registry
+# =====================================================
+FIGURES = {}   # filename -> (builder, columns, params)
 
-# Load Dataset (UPDATE YOUR PATH)
-df = pd.read_csv(r"C:\Users\habib\OneDrive\المستندات\DEPI_GRAD_PROJECT\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv")
 
-print(f"✅ Dataset loaded: {df.shape}")
+def figure(filename, columns, **params):
+    """Register builder(df, **params) -> plotly / matplotlib figure (None = skip)."""
+    def register(fn):
+        FIGURES[filename] = (fn, tuple(columns), params)
+        return fn
+    return register
+
+
+def spec_hash(filename) -> str:
+    fn, columns, params = FIGURES[filename]
+    spec = json.dumps([RENDER_VERSION, filename, columns, params], sort_keys=True)
+    return hashlib.blake2b((spec + inspect.getsource(fn)).encode(), digest_size=16).hexdigest()
+
+
+def needed_columns(filenames) -> list:
+    return sorted({c for name in filenames for c in FIGURES[name][1]})
+
 
 # =====================================================
 # 1. HEART DISEASE PIE (Dashboard Hero)
 # =====================================================
-fig = px.pie(df, names='Heart_Disease', hole=0.4, title='Heart Disease Distribution',
-             color_discrete_sequence=px.colors.qualitative.Set3)
-fig.update_traces(textposition='inside', textinfo='percent+label')
-fig.update_layout(title_x=0.5, template='plotly_white', width=600, height=400)
-fig.write_image(VIS_DIR / "01_heart_disease_pie.png")
-print("✅ 01_heart_disease_pie.png")
+@figure("01_heart_disease_pie.png", ["Heart_Disease"])
+def heart_disease_pie(df):
+    import plotly.express as px
+    fig = px.pie(df, names='Heart_Disease', hole=0.4, title='Heart Disease Distribution',
+                 color_discrete_sequence=px.colors.qualitative.Set3)
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    fig.update_layout(title_x=0.5, template='plotly_white', width=600, height=400)
+    return fig
+
 
 # =====================================================
 # 2. GENERAL HEALTH PIE (Dashboard Key Visual)
 # =====================================================
-if 'General_Health' in df.columns:
+@figure("02_general_health_pie.png", ["General_Health"])
+def general_health_pie(df):
+    import plotly.express as px
+    if 'General_Health' not in df.columns:
+        return None
     fig = px.pie(df, names='General_Health', hole=0.3, title='General Health Distribution',
                  color_discrete_sequence=px.colors.qualitative.Pastel)
     fig.update_traces(textposition='inside', textinfo='percent+label')
     fig.update_layout(title_x=0.5, template='plotly_white', width=600, height=400)
-    fig.write_image(VIS_DIR / "02_general_health_pie.png")
-    print("✅ 02_general_health_pie.png")
+    return fig
+
 
 # =====================================================
 # 3. AGE vs HEART DISEASE BAR (Critical Insight)
 # =====================================================
-if {'Age_Category', 'Heart_Disease'}.issubset(df.columns):
-    age_hd = df.groupby(['Age_Category', 'Heart_Disease']).size().reset_index(name='Count')
+@figure("03_age_hd_bar.png", ["Age_Category", "Heart_Disease"])
+def age_hd_bar(df):
+    import plotly.express as px
+    if not {'Age_Category', 'Heart_Disease'}.issubset(df.columns):
+        return None
+    age_hd = df.groupby(['Age_Category', 'Heart_Disease'], observed=True).size().reset_index(name='Count')
     fig = px.bar(age_hd, x='Age_Category', y='Count', color='Heart_Disease', barmode='group',
                  title='Heart Disease by Age Group', color_discrete_sequence=px.colors.qualitative.Safe)
     fig.update_layout(template='plotly_white', width=800, height=400, title_x=0.5)
-    fig.write_image(VIS_DIR / "03_age_hd_bar.png")
-    print("✅ 03_age_hd_bar.png")
+    return fig
+
 
 # =====================================================
 # 4. DIABETES PIE
 # =====================================================
-if 'Diabetes' in df.columns:
+@figure("04_diabetes_pie.png", ["Diabetes"])
+def diabetes_pie(df):
+    import plotly.express as px
+    if 'Diabetes' not in df.columns:
+        return None
     diabetes_freq = df['Diabetes'].value_counts().reset_index()
     diabetes_freq.columns = ['Diabetes Status', 'Count']
     fig = px.pie(diabetes_freq, names='Diabetes Status', values='Count', hole=0.3,
                  title='Diabetes Status', color_discrete_sequence=px.colors.qualitative.Pastel)
     fig.update_traces(textposition='inside', textinfo='percent+label')
     fig.update_layout(title_x=0.5, template='plotly_white', width=500, height=400)
-    fig.write_image(VIS_DIR / "04_diabetes_pie.png")
-    print("✅ 04_diabetes_pie.png")
+    return fig
+
 
 # =====================================================
 # 5. SEX DISTRIBUTION HORIZONTAL BAR
 # =====================================================
-if 'Sex' in df.columns:
+@figure("05_sex_bar.png", ["Sex"])
+def sex_bar(df):
+    import plotly.express as px
+    if 'Sex' not in df.columns:
+        return None
     sex_freq = df['Sex'].value_counts().reset_index()
     sex_freq.columns = ['Sex', 'Count']
     fig = px.bar(sex_freq, x='Count', y='Sex', orientation='h', color='Sex',
                  title='Sex Distribution', color_discrete_sequence=["#2e86de", "#54a0ff"])
     fig.update_layout(template='plotly_white', width=500, height=400, title_x=0.5)
-    fig.write_image(VIS_DIR / "05_sex_bar.png")
-    print("✅ 05_sex_bar.png")
+    return fig
+
 
 # =====================================================
 # 6. BINARY FEATURES STACKED BAR
 # =====================================================
-binary_cols = ["Exercise", "Heart_Disease", "Skin_Cancer", "Other_Cancer", "Depression", "Arthritis", "Smoking_History"]
-prop_df = pd.DataFrame()
-for col in binary_cols:
-    if col in df.columns:
-        total = len(df)
-        counts = df[col].value_counts().rename('Count')
-        norm = (counts / total * 100).rename('Percent')
-        temp = pd.DataFrame({'Feature': col, 'Response': counts.index, 'Percent': norm.values})
-        prop_df = pd.concat([prop_df, temp], ignore_index=True)
+BINARY_COLS = ["Exercise", "Heart_Disease", "Skin_Cancer", "Other_Cancer", "Depression",
+               "Arthritis", "Smoking_History"]
+
+
+@figure("06_binary_stacked.png", BINARY_COLS)
+def binary_stacked(df):
+    import plotly.express as px
+    prop_df = pd.DataFrame()
+    for col in BINARY_COLS:
+        if col in df.columns:
+            total = len(df)
+            counts = df[col].value_counts().rename('Count')
+            norm = (counts / total * 100).rename('Percent')
+            temp = pd.DataFrame({'Feature': col, 'Response': counts.index.astype(str),
+                                 'Percent': norm.values})
+            prop_df = pd.concat([prop_df, temp], ignore_index=True)
+
+    pivot = prop_df.pivot(index='Feature', columns='Response', values='Percent').fillna(0)
+    fig = px.bar(pivot, orientation='h', barmode='stack', title='Binary Feature Proportions',
+                 color_discrete_sequence=["#1E88E5", "#90CAF9"])
+    fig.update_layout(template='plotly_white', width=700, height=500, title_x=0.5)
+    return fig
 
-pivot = prop_df.pivot(index='Feature', columns='Response', values='Percent').fillna(0)
-fig = px.bar(pivot, orientation='h', barmode='stack', title='Binary Feature Proportions',
-             color_discrete_sequence=["#1E88E5", "#90CAF9"])
-fig.update_layout(template='plotly_white', width=700, height=500, title_x=0.5)
-fig.write_image(VIS_DIR / "06_binary_stacked.png")
-print("✅ 06_binary_stacked.png")
 
 # =====================================================
 # 7. BMI vs EXERCISE BOXPLOT
 # =====================================================
-if {'BMI', 'Exercise'}.issubset(df.columns):
+@figure("07_bmi_exercise_box.png", ["BMI", "Exercise"])
+def bmi_exercise_box(df):
+    import plotly.express as px
+    if not {'BMI', 'Exercise'}.issubset(df.columns):
+        return None
     fig = px.box(df, x="Exercise", y="BMI", color="Exercise", points="all",
                  title="BMI by Exercise Habits", color_discrete_sequence=px.colors.sequential.Blues)
     fig.update_layout(template='plotly_white', width=600, height=400, title_x=0.5)
-    fig.write_image(VIS_DIR / "07_bmi_exercise_box.png")
-    print("✅ 07_bmi_exercise_box.png")
+    return fig
+
 
 # =====================================================
 # 8. CHECKUP FREQUENCY LINE
 # =====================================================
-if 'Checkup' in df.columns:
+@figure("08_checkup_line.png", ["Checkup"])
+def checkup_line(df):
+    import plotly.express as px
+    if 'Checkup' not in df.columns:
+        return None
     checkup_counts = df['Checkup'].value_counts().sort_index().reset_index()
     checkup_counts.columns = ['Checkup Interval', 'Count']
     fig = px.line(checkup_counts, x='Checkup Interval', y='Count', markers=True,
                   title='Medical Checkup Frequency', color_discrete_sequence=['#1f77b4'])
     fig.update_layout(template='plotly_white', width=700, height=400, title_x=0.5)
-    fig.write_image(VIS_DIR / "08_checkup_line.png")
-    print("✅ 08_checkup_line.png")
+    return fig
+
 
 # =====================================================
 # 9. CORRELATION HEATMAP (Matplotlib -> PNG)
 # =====================================================
-num_cols = ['Height_(cm)', 'Weight_(kg)', 'BMI', 'Alcohol_Consumption', 'Fruit_Consumption',
+NUM_COLS = ['Height_(cm)', 'Weight_(kg)', 'BMI', 'Alcohol_Consumption', 'Fruit_Consumption',
             'Green_Vegetables_Consumption', 'FriedPotato_Consumption']
-numeric_df = df[num_cols + ['Heart_Disease']].dropna()
-corr = numeric_df.corr()
-plt.figure(figsize=(10,8))
-sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f", center=0)
-plt.title("Correlation Matrix - Lifestyle Factors")
-plt.tight_layout()
-plt.savefig(VIS_DIR / "09_correlation_heatmap.png", dpi=300, bbox_inches='tight')
-plt.close()
-print("✅ 09_correlation_heatmap.png")
+
+
+@figure("09_correlation_heatmap.png", NUM_COLS + ["Heart_Disease"], dpi=300)
+def correlation_heatmap(df):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    numeric_df = df[NUM_COLS + ['Heart_Disease']].dropna()
+    # encoded target (Yes = 1), as in Cardio_EDA.py
+    numeric_df['Heart_Disease'] = numeric_df['Heart_Disease'].map({'Yes': 1, 'No': 0}).astype(float)
+    corr = numeric_df.astype(float).corr()
+    fig, ax = plt.subplots(figsize=(10, 8))
+    sns.heatmap(corr, annot=True, cmap='coolwarm', fmt=".2f", center=0, ax=ax)
+    ax.set_title("Correlation Matrix - Lifestyle Factors")
+    fig.tight_layout()
+    return fig
+
 
 # =====================================================
 # 10. AGE-SEX-HEART DISEASE FACET BAR
 # =====================================================
-if {'Age_Category', 'Sex', 'Heart_Disease'}.issubset(df.columns):
-    age_sex_hd = df.groupby(['Age_Category', 'Sex', 'Heart_Disease']).size().reset_index(name='Count')
+@figure("10_age_sex_facet.png", ["Age_Category", "Sex", "Heart_Disease"])
+def age_sex_facet(df):
+    import plotly.express as px
+    if not {'Age_Category', 'Sex', 'Heart_Disease'}.issubset(df.columns):
+        return None
+    age_sex_hd = df.groupby(['Age_Category', 'Sex', 'Heart_Disease'], observed=True).size().reset_index(name='Count')
     fig = px.bar(age_sex_hd, x='Age_Category', y='Count', color='Sex', facet_col='Heart_Disease',
                  title='Heart Disease by Age & Sex', color_discrete_sequence=px.colors.qualitative.Vivid)
     fig.update_layout(template='plotly_white', width=1000, height=400, title_x=0.5)
-    fig.write_image(VIS_DIR / "10_age_sex_facet.png")
-    print("✅ 10_age_sex_facet.png")
+    return fig
+
 
 # =====================================================
 # 11-17. NUMERIC DISTRIBUTIONS (Sample 3 key ones)
 # =====================================================
+def numeric_hist(df, col):
+    import plotly.express as px
+    if col not in df.columns:
+        return None
+    fig = px.histogram(df, x=col, nbins=30, title=f"{col} Distribution",
+                       marginal="box", color_discrete_sequence=["#118ab2"])
+    fig.update_layout(template='plotly_white', width=600, height=400, title_x=0.5)
+    return fig
+
+
 key_num_cols = ['BMI', 'Alcohol_Consumption', 'Fruit_Consumption']
 for i, col in enumerate(key_num_cols, 11):
-    if col in df.columns:
-        fig = px.histogram(df, x=col, nbins=30, title=f"{col} Distribution",
-                          marginal="box", color_discrete_sequence=["#118ab2"])
-        fig.update_layout(template='plotly_white', width=600, height=400, title_x=0.5)
-        fig.write_image(VIS_DIR / f"{i:02d}_{col.lower().replace('_(cm)', '').replace('_(kg)', '')}_hist.png")
-        print(f"✅ {i:02d}_{col.lower()}_hist.png")
+    figure(f"{i:02d}_{col.lower().replace('_(cm)', '').replace('_(kg)', '')}_hist.png",
+           [col], col=col)(numeric_hist)
+
+
+# =====================================================
+# Rendering (runs in the pool workers)
+# =====================================================
+_worker_df = None
+
+
+def _init_worker(data_path, columns):
+    """Once per worker: the dataset, plot styles and a long-lived kaleido."""
+    global _worker_df
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette('husl')
+    try:
+        import kaleido
+        # kaleido >= 1.0 starts a browser per write_image unless a sync
+        # server is running; 0.2.x keeps its own per-process instance anyway
+        if hasattr(kaleido, "start_sync_server"):
+            kaleido.start_sync_server(silence_warnings=True)
+    except ImportError:
+        pass
+    if data_path is not None:
+        _worker_df = load_table(data_path, columns)
+
+
+def _render(filename, out_dir, df=None):
+    """Build + save one figure; (filename, seconds, error or None, skipped)."""
+    t0 = time.perf_counter()
+    fn, _, params = FIGURES[filename]
+    df = _worker_df if df is None else df
+    try:
+        build_params = {k: v for k, v in params.items() if k != "dpi"}
+        fig = fn(df, **build_params)
+        if fig is None:
+            return filename, time.perf_counter() - t0, None, True
+        path = Path(out_dir) / filename
+        tmp = path.with_name(path.name + ".tmp")
+        if hasattr(fig, "write_image"):
+            fig.write_image(tmp, format="png")
+        else:
+            import matplotlib.pyplot as plt
+            fig.savefig(tmp, format="png", dpi=params.get("dpi", 100), bbox_inches='tight')
+            plt.close(fig)
+        os.replace(tmp, path)
+        return filename, time.perf_counter() - t0, None, False
+    except Exception as e:
+        return filename, time.perf_counter() - t0, f"{type(e).__name__}: {e}", False
+
+
+# =====================================================
+# Build
+# =====================================================
+def _read_manifest(out_dir) -> dict:
+    try:
+        return json.loads((Path(out_dir) / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(out_dir, manifest):
+    path = Path(out_dir) / MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def column_hashes(df) -> dict:
+    return {col: hashlib.blake2b(pd.util.hash_pandas_object(df[col], index=False).values.tobytes(),
+                                 digest_size=16).hexdigest()
+            for col in df.columns}
+
+
+def figure_key(filename, col_hashes) -> str:
+    _, columns, _ = FIGURES[filename]
+    parts = [spec_hash(filename)] + [f"{c}={col_hashes.get(c, '-')}" for c in columns]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def build(data_path=DATA_PATH, out_dir=VIS_DIR, workers=None, force=False) -> dict:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    old = _read_manifest(out_dir)
+    old_figs = old.get("figures", {})
+    source = fingerprint(data_path)
+    specs = {name: spec_hash(name) for name in FIGURES}
+
+    def up_to_date(name):
+        entry = old_figs.get(name)
+        return (entry is not None and entry.get("spec") == specs[name]
+                and (entry.get("skipped") or (out_dir / name).exists()))
+
+    if not force and old.get("source", {}).get("sha256") == source["sha256"] \
+            and all(up_to_date(name) for name in FIGURES):
+        print(f"✅ {len(FIGURES)} visuals up to date ({time.perf_counter() - t0:.1f}s)")
+        return old
+
+    df = load_table(data_path, needed_columns(FIGURES))
+    print(f"✅ Dataset loaded: {df.shape}")
+    hashes = column_hashes(df)
+    keys = {name: figure_key(name, hashes) for name in FIGURES}
+    todo = [name for name in FIGURES
+            if force or not up_to_date(name) or old_figs[name].get("key") != keys[name]]
+    print(f"📊 Rendering {len(todo)} of {len(FIGURES)} visuals...")
+
+    figures = {name: old_figs[name] for name in FIGURES if name not in todo}
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        _init_worker(None, None)
+        results = (_render(name, out_dir, df) for name in todo)
+    else:
+        del df   # the workers load their own copy
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(str(data_path), needed_columns(todo)))
+        futures = [pool.submit(_render, name, str(out_dir)) for name in todo]
+        results = (f.result() for f in as_completed(futures))
+    try:
+        for name, seconds, error, skipped in results:
+            if error:
+                print(f"❌ {name}: {error}")
+                continue
+            print(f"{'⏭️ ' if skipped else '✅'} {name} ({seconds:.1f}s)")
+            figures[name] = {"spec": specs[name], "key": keys[name], "columns": list(FIGURES[name][1]),
+                             "skipped": skipped, "seconds": round(seconds, 2),
+                             "rendered_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    manifest = {"source": source, "render_version": RENDER_VERSION,
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "figures": dict(sorted(figures.items()))}
+    _write_manifest(out_dir, manifest)
+    failed = [name for name in todo if name not in figures]
+    print(f"🎉 {len(todo) - len(failed)} rendered, {len(FIGURES) - len(todo)} unchanged, "
+          f"{len(failed)} failed in {time.perf_counter() - t0:.1f}s")
+    print(f"📁 Saved to: {out_dir.absolute()}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the dashboard PNGs into static/visuals")
+    parser.add_argument("--data", default=DATA_PATH, help="BRFSS export CSV")
+    parser.add_argument("--out", default=str(VIS_DIR))
+    parser.add_argument("--workers", type=int, default=None,
+                        help="render processes (default: CPU count; 1 = in this process)")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest, render everything")
+    args = parser.parse_args()
+    manifest = build(args.data, args.out, args.workers, args.force)
+    return 0 if len(manifest["figures"]) == len(FIGURES) else 1
 
-print("🎉 ALL VISUALS GENERATED SUCCESSFULLY!")
-print(f"📁 Saved to: {VIS_DIR.absolute()}")
-print("🔗 Now update your visuals_lifestyle.html with these filenames!")
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""
+Stage 1 (lifestyle) model search and training, from the command line.
+
+    python DS1/train_stage1.py --data <BRFSS csv> [--jobs N] [--models xgb,logistic,...]
+        [--folds 5] [--factor 3] [--min-resources 2000] [--no-save]
+
+Same setup as DS1/cardio_model.ipynb: CAT + NUM features, one-hot + median /
+scale ColumnTransformer, 70/15/15 stratified train / valid / test split,
+StratifiedKFold on train, candidates ranked by CV PR-AUC (average precision).
+
+- Preprocessing is fitted once per fold (not once per fold and candidate as
+  with GridSearchCV over a Pipeline). The transformed folds are written to
+  .cache/stage1_folds/, keyed by the CSV's sha256 and the split settings, and
+  memory-mapped from there: a re-run on the same data skips it, and the
+  worker processes share the arrays instead of receiving copies.
+- Search is successive halving over every (model, params) config: round 0
+  fits all configs on a small subsample of each fold, each round keeps the
+  best 1/factor on factor times more rows, the last round uses full folds.
+  The (config, fold) fits of a round run in parallel (joblib, --jobs,
+  default all cores).
+- XGBoost fits with early stopping on the fold's validation part, so
+  n_estimators is a cap, not a grid dimension.
+
+The best XGBoost config (the family the app serves, see cardio_predict.py)
+gets early-stopped on the valid split, then refitted on train + valid with
+that many trees and scored on test. It is saved as
+DS1/Models/stage1_xgb_<YYYYmmdd_HHMMSS>.joblib (+ .onnx when skl2onnx is
+available), with a stage1_xgb_<ts>.json sidecar: data fingerprint, params,
+CV leaderboard, test metrics, library versions and wall-clock timings.
+
+Selection report (--no-benchmark skips it): the best config of every family
+is refitted on train and measured on both axes, quality on the valid split
+(PR-AUC, ROC-AUC, Brier) and inference cost (model_costs.measure:
+single-row and batch latency, artifact size, load time). The Pareto fronts
+(quality vs single-row latency, and vs all four costs) go into the sidecar
+under "selection" and into reports/stage1_selection.md, which flags the
+shipped family if another model beats it on both.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # repo root, for columnar.py
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, average_precision_score, f1_score, roc_auc_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+from columnar import load_table
+from fast_encoder import final_estimator
+from model_costs import measure, pareto, score_fn
+from stats_snapshot import fingerprint
+
+ROOT = Path(__file__).resolve().parents[1]
+MODELS_DIR = ROOT / "DS1" / "Models"
+CACHE_DIR = ROOT / ".cache" / "stage1_folds"
+REPORT_PATH = ROOT / "reports" / "stage1_selection.md"
+DATA_PATH = r"C:\Users\habib\OneDrive\المستندات\Graduation Project\GRAD-proj-DEPI\DS1\Cardiovascular Diseases Risk Prediction Dataset export 2025-10-15 21-12-56.csv"
+PREFIX = "stage1_xgb"
+RANDOM_STATE = 42
+# bump when the preprocessing below changes, to invalidate cached folds
+CACHE_VERSION = 1
+
+CAT = ["General_Health", "Checkup", "Exercise", "Skin_Cancer", "Other_Cancer",
+       "Depression", "Diabetes", "Arthritis", "Sex", "Age_Category", "Smoking_History",
+       "BMI_Category"]
+NUM = ["Height_(cm)", "Weight_(kg)", "BMI", "Alcohol_Consumption",
+       "Fruit_Consumption", "Green_Vegetables_Consumption", "FriedPotato_Consumption"]
+TARGET = "Heart_Disease"
+
+XGB_MAX_TREES = 2000
+XGB_EARLY_STOPPING = 50
+
+# family -> (estimator, param grid, max training rows or None)
+# Kernel SVC and KNN do not scale to the full folds (SVC is O(n^2) or worse);
+# they are fitted / indexed on at most max rows in every round.
+CANDIDATES = {
+    "logistic": (LogisticRegression(max_iter=4000, class_weight="balanced"),
+                 {"C": [0.1, 1.0, 10.0]}, None),
+    "naive_bayes": (GaussianNB(), {"var_smoothing": [1e-9, 1e-6]}, None),
+    "knn": (KNeighborsClassifier(n_neighbors=15), {"n_neighbors": [15, 51]}, 50000),
+    "svc": (SVC(kernel="rbf", class_weight="balanced"), {"C": [0.5, 2.0]}, 20000),
+    "decision_tree": (DecisionTreeClassifier(class_weight="balanced", random_state=RANDOM_STATE),
+                      {"max_depth": [4, 6, 10], "min_samples_leaf": [1, 50]}, None),
+    "random_forest": (RandomForestClassifier(n_estimators=400, class_weight="balanced_subsample",
+                                             n_jobs=1, random_state=RANDOM_STATE),
+                      {"max_depth": [None, 12], "min_samples_leaf": [2, 10]}, None),
+    "xgb": (XGBClassifier(n_estimators=XGB_MAX_TREES, subsample=0.8, colsample_bytree=0.8,
+                          reg_lambda=1.0, eval_metric="logloss", tree_method="hist",
+                          early_stopping_rounds=XGB_EARLY_STOPPING, n_jobs=1,
+                          random_state=RANDOM_STATE),
+            {"max_depth": [3, 4, 5, 6], "learning_rate": [0.05, 0.1]}, None),
+}
+
+
+def make_preprocess(cat, num):
+    cat_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+    ])
+    num_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='median')),
+        ('scaler', StandardScaler())
+    ])
+    return ColumnTransformer(
+        transformers=[('cat', cat_transformer, cat), ('num', num_transformer, num)],
+        remainder='drop',
+        verbose_feature_names_out=False)
+
+
+# -------------------------------------------------
+# Data
+# -------------------------------------------------
+def load_xy(data_path):
+    df = load_table(data_path)
+    cat = [c for c in CAT if c in df.columns]
+    num = [c for c in NUM if c in df.columns]
+    y = df[TARGET]
+    if not pd.api.types.is_numeric_dtype(y):
+        y = y.astype(str).map({"Yes": 1, "No": 0})
+    return df[cat + num], y.astype(int).to_numpy(), cat, num
+
+
+def split(X, y, seed=RANDOM_STATE):
+    """70 / 15 / 15 stratified train / valid / test, as in the notebook."""
+    idx = np.arange(len(y))
+    train, temp = train_test_split(idx, test_size=0.30, stratify=y, random_state=seed)
+    valid, test = train_test_split(temp, test_size=0.50, stratify=y[temp], random_state=seed)
+    return train, valid, test
+
+
+# -------------------------------------------------
+# Fold cache
+# -------------------------------------------------
+def _cache_key(source, cat, num, folds, seed):
+    spec = json.dumps([CACHE_VERSION, source.get("sha256"), cat, num, folds, seed,
+                       sklearn.__version__])
+    return hashlib.blake2b(spec.encode(), digest_size=8).hexdigest()
+
+
+def fold_cache(X, y, train, cat, num, folds, seed, source, cache_dir=CACHE_DIR):
+    """
+    [{"X_fit", "y_fit", "X_val", "y_val", "order"}] per fold, preprocessing
+    fitted on the fold's training part only. Memory-mapped from cache_dir.
+    "order" is a fixed random permutation of X_fit; the first r rows are the
+    successive-halving subsample of size r.
+    """
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f"folds_{_cache_key(source, cat, num, folds, seed)}.joblib"
+    if path.exists():
+        return joblib.load(path, mmap_mode="r"), True
+
+    out = []
+    rng = np.random.default_rng(seed)
+    X_train, y_train = X.iloc[train], y[train]
+    for fit_idx, val_idx in StratifiedKFold(folds, shuffle=True, random_state=seed).split(X_train, y_train):
+        pre = make_preprocess(cat, num).fit(X_train.iloc[fit_idx])
+        out.append({
+            "X_fit": pre.transform(X_train.iloc[fit_idx]).astype(np.float32),
+            "y_fit": y_train[fit_idx],
+            "X_val": pre.transform(X_train.iloc[val_idx]).astype(np.float32),
+            "y_val": y_train[val_idx],
+            "order": rng.permutation(len(fit_idx)),
+        })
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    joblib.dump(out, tmp)
+    os.replace(tmp, path)
+    return joblib.load(path, mmap_mode="r"), False
+
+
+# -------------------------------------------------
+# Successive halving
+# -------------------------------------------------
+def configs(families):
+    out = []
+    for family in families:
+        for params in ParameterGrid(CANDIDATES[family][1]):
+            out.append((family, params))
+    return out
+
+
+def fit_score(family, params, fold, rows):
+    """One (config, fold) fit on the first `rows` rows of the fold; PR-AUC on its validation part."""
+    estimator, _, max_rows = CANDIDATES[family]
+    if max_rows:
+        rows = min(rows, max_rows)
+    pick = np.sort(fold["order"][:rows])
+    X_fit, y_fit = fold["X_fit"][pick], fold["y_fit"][pick]
+    clf = clone(estimator).set_params(**params)
+    t0 = time.perf_counter()
+    if family == "xgb":
+        clf.fit(X_fit, y_fit, eval_set=[(fold["X_val"], fold["y_val"])], verbose=False)
+    else:
+        clf.fit(X_fit, y_fit)
+    score = average_precision_score(fold["y_val"], score_fn(clf)(fold["X_val"]))
+    return {"score": float(score), "seconds": time.perf_counter() - t0,
+            "best_iteration": getattr(clf, "best_iteration", None) if family == "xgb" else None}
+
+
+def successive_halving(cands, folds, factor=3, min_resources=2000, jobs=-1, log=print):
+    """Rounds of parallel (config, fold) fits; returns the leaderboard and per-round timings."""
+    max_resources = min(len(f["order"]) for f in folds)
+    n_rounds = 1 + math.ceil(math.log(max(len(cands), 1), factor))
+    r0 = max(min(min_resources, max_resources), max_resources // factor ** (n_rounds - 1))
+    board = {i: {"model": family, "params": params, "rounds": 0, "score": None, "rows": 0}
+             for i, (family, params) in enumerate(cands)}
+    survivors = list(board)
+    rounds = []
+    with Parallel(n_jobs=jobs) as parallel:
+        for rnd in range(n_rounds):
+            rows = max_resources if rnd == n_rounds - 1 else min(r0 * factor ** rnd, max_resources)
+            t0 = time.perf_counter()
+            results = parallel(delayed(fit_score)(board[i]["model"], board[i]["params"], fold, rows)
+                               for i in survivors for fold in folds)
+            for n, i in enumerate(survivors):
+                per_fold = results[n * len(folds):(n + 1) * len(folds)]
+                its = [r["best_iteration"] for r in per_fold if r["best_iteration"] is not None]
+                board[i].update(rounds=rnd + 1, rows=rows,
+                                score=float(np.mean([r["score"] for r in per_fold])),
+                                fit_seconds=round(sum(r["seconds"] for r in per_fold), 2),
+                                best_iteration=int(np.median(its)) if its else None)
+            seconds = time.perf_counter() - t0
+            rounds.append({"round": rnd, "rows": rows, "configs": len(survivors),
+                           "seconds": round(seconds, 2)})
+            log(f"round {rnd}: {len(survivors)} configs x {len(folds)} folds "
+                f"on {rows} rows, {seconds:.1f}s")
+            survivors.sort(key=lambda i: -board[i]["score"])
+            if len(survivors) == 1 or rows >= max_resources:
+                break
+            survivors = survivors[:max(1, math.ceil(len(survivors) / factor))]
+    leaderboard = sorted(board.values(), key=lambda b: (-b["rounds"], -(b["score"] or 0)))
+    return leaderboard, rounds
+
+
+# -------------------------------------------------
+# Final model
+# -------------------------------------------------
+def train_final(X, y, train, valid, test, cat, num, params, jobs=-1):
+    """Early-stop the chosen XGB config on valid, refit on train + valid with that many trees."""
+    base = clone(CANDIDATES["xgb"][0]).set_params(n_jobs=jobs, **params)
+    pre = make_preprocess(cat, num).fit(X.iloc[train])
+    probe = clone(base).fit(pre.transform(X.iloc[train]), y[train],
+                            eval_set=[(pre.transform(X.iloc[valid]), y[valid])], verbose=False)
+    n_trees = int(probe.best_iteration) + 1
+
+    fit = np.concatenate([train, valid])
+    pipe = Pipeline([("pre", make_preprocess(cat, num)),
+                     ("clf", clone(base).set_params(n_estimators=n_trees, early_stopping_rounds=None))])
+    pipe.fit(X.iloc[fit], y[fit])
+
+    proba = pipe.predict_proba(X.iloc[test])[:, 1]
+    thresholds = np.linspace(0.01, 0.99, 99)
+    f1s = [f1_score(y[test], proba >= t) for t in thresholds]
+    metrics = {
+        "roc_auc": float(roc_auc_score(y[test], proba)),
+        "pr_auc": float(average_precision_score(y[test], proba)),
+        "accuracy@0.5": float(accuracy_score(y[test], proba >= 0.5)),
+        "f1@0.5": float(f1_score(y[test], proba >= 0.5)),
+        "best_f1_threshold": float(thresholds[int(np.argmax(f1s))]),
+        "best_f1": float(max(f1s)),
+    }
+    return pipe, n_trees, metrics
+
+
+def save(pipe, meta, models_dir=MODELS_DIR):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out = Path(models_dir) / f"{PREFIX}_{stamp}.joblib"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    meta["artifact"] = out.name
+    meta["version"] = stamp
+    meta["onnx"] = None
+    sidecar = out.with_suffix(".json")
+
+    def write_sidecar():
+        tmp = sidecar.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, sidecar)
+
+    # sidecar first: the registry picks up the .joblib as soon as it appears
+    write_sidecar()
+    tmp = out.with_suffix(".joblib.tmp")
+    joblib.dump(pipe, tmp)
+    os.replace(tmp, out)
+    try:  # same version for MODEL_BACKEND=onnx; the .joblib is already safe
+        from export_onnx import write_onnx
+        meta["onnx"] = write_onnx(pipe, out.with_suffix(".onnx")).name
+        write_sidecar()
+    except Exception as e:
+        print(f"⚠️ ONNX export skipped ({type(e).__name__}: {e})")
+    return out
+
+
+# -------------------------------------------------
+# Selection report: quality against inference cost
+# -------------------------------------------------
+def fit_candidate(family, params, best_iteration, X, y, train, cat, num, seed=RANDOM_STATE):
+    """Full pipeline of a family's best config, fitted on train (capped at the family's max rows)."""
+    estimator, _, max_rows = CANDIDATES[family]
+    clf = clone(estimator).set_params(**params)
+    if family == "xgb":
+        n_trees = XGB_MAX_TREES if best_iteration is None else best_iteration + 1
+        clf.set_params(n_estimators=n_trees, early_stopping_rounds=None)
+    if max_rows and len(train) > max_rows:
+        train = np.sort(np.random.default_rng(seed).permutation(train)[:max_rows])
+    t0 = time.perf_counter()
+    pipe = Pipeline([("pre", make_preprocess(cat, num)), ("clf", clf)]).fit(X.iloc[train], y[train])
+    return pipe, time.perf_counter() - t0
+
+
+def selection_report(X, y, train, valid, cat, num, leaderboard, jobs=-1, bench_rows=1000):
+    """
+    Best config of every family, refitted on train, scored on valid and
+    benchmarked with model_costs.measure on bench_rows valid rows (as dicts,
+    like the app's requests). Fits run in parallel; the timings run one
+    model at a time so they do not compete for cores.
+    """
+    best = {}
+    for b in leaderboard:                       # furthest round first, then CV score
+        best.setdefault(b["model"], b)
+    fitted = Parallel(n_jobs=jobs)(
+        delayed(fit_candidate)(b["model"], b["params"], b.get("best_iteration"), X, y, train, cat, num)
+        for b in best.values())
+    rows = X.iloc[valid[:bench_rows]].to_dict("records")
+    out = {}
+    for (family, b), (pipe, fit_s) in zip(best.items(), fitted):
+        clf = final_estimator(pipe)
+        scores = score_fn(clf)(pipe[:-1].transform(X.iloc[valid]))
+        out[family] = {
+            "params": b["params"], "cv_pr_auc": b["score"], "cv_rows": b["rows"],
+            "pr_auc": float(average_precision_score(y[valid], scores)),
+            "roc_auc": float(roc_auc_score(y[valid], scores)),
+            "brier": float(np.mean((scores - y[valid]) ** 2)) if hasattr(clf, "predict_proba") else None,
+            "fit_s": round(fit_s, 2),
+            **measure(pipe, rows),
+        }
+        print(f"⏱ {family}: PR-AUC {out[family]['pr_auc']:.4f}, {out[family]['single_ms']:.3f} ms/row, "
+              f"{out[family]['size_kb']:.0f} KB, load {out[family]['load_ms']:.1f} ms")
+    front = pareto(out, "pr_auc", ("single_ms",))
+    front_all = pareto(out, "pr_auc", ("single_ms", "batch_ms", "size_kb", "load_ms"))
+    for family, c in out.items():
+        c["pareto_latency"] = family in front
+        c["pareto_all_costs"] = family in front_all
+    return out
+
+
+def build_selection_md(selection, shipped, artifact=None):
+    lines = [
+        "# Stage 1 model selection: quality against inference cost",
+        "",
+        "Generated by `python DS1/train_stage1.py`. Each family's best successive-halving config, "
+        "refitted on the train split and scored on the valid split. Latency goes through the app's "
+        "FeatureEncoder path: one predict_proba call per row (single) and "
+        f"{next(iter(selection.values()))['batch_rows']} rows in one call (batch, per row). "
+        "Size is the joblib artifact, load is joblib.load with MODEL_MMAP.",
+        "",
+        "| model | valid PR-AUC | ROC-AUC | Brier | ms/row (single) | ms/row (batch) | artifact KB "
+        "| load ms | fit s | Pareto (latency) | Pareto (all costs) |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for family, c in sorted(selection.items(), key=lambda kv: -kv[1]["pr_auc"]):
+        brier = "" if c["brier"] is None else f"{c['brier']:.4f}"
+        mark = " (shipped)" if family == shipped else ""
+        lines.append(
+            f"| {family}{mark} | {c['pr_auc']:.4f} | {c['roc_auc']:.4f} | {brier} "
+            f"| {c['single_ms']:.3f} | {c['batch_ms']:.4f} | {c['size_kb']:.0f} | {c['load_ms']:.1f} "
+            f"| {c['fit_s']:.1f} | {'★' if c['pareto_latency'] else ''} "
+            f"| {'★' if c['pareto_all_costs'] else ''} |")
+    ship = selection.get(shipped)
+    lines.append("")
+    if ship and not ship["pareto_latency"]:
+        better = [f for f, c in selection.items() if f != shipped and c["pr_auc"] >= ship["pr_auc"]
+                  and c["single_ms"] <= ship["single_ms"]]
+        lines.append(f"⚠️ **{shipped}** is not on the quality / latency front; dominated by "
+                     f"{', '.join(better)}.")
+    else:
+        lines.append(f"**{shipped}** is on the quality / latency front.")
+    if artifact:
+        lines.append(f"Saved: `DS1/Models/{artifact}`")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------
+# Main
+# -------------------------------------------------
+def main(data_path=DATA_PATH, families=None, folds=5, factor=3, min_resources=2000,
+         jobs=-1, seed=RANDOM_STATE, save_model=True, cache_dir=CACHE_DIR, benchmark=True):
+    timings = {}
+    t_start = t = time.perf_counter()
+    source = fingerprint(data_path)
+    X, y, cat, num = load_xy(data_path)
+    train, valid, test = split(X, y, seed)
+    timings["load"] = round(time.perf_counter() - t, 2)
+    print(f"✅ Dataset Loaded. Shape: {X.shape}, positives: {y.mean():.3f} ({timings['load']:.1f}s)")
+
+    t = time.perf_counter()
+    cached, hit = fold_cache(X, y, train, cat, num, folds, seed, source, cache_dir)
+    timings["preprocess"] = round(time.perf_counter() - t, 2)
+    print(f"✅ {folds} preprocessed folds {'from cache' if hit else 'built'} ({timings['preprocess']:.1f}s)")
+
+    families = families or list(CANDIDATES)
+    if "xgb" not in families:
+        families.append("xgb")
+    t = time.perf_counter()
+    leaderboard, rounds = successive_halving(configs(families), cached, factor, min_resources, jobs)
+    timings["search"] = round(time.perf_counter() - t, 2)
+
+    best = leaderboard[0]
+    best_xgb = next(b for b in leaderboard if b["model"] == "xgb")
+    print(f"🏆 best overall: {best['model']} {best['params']} PR-AUC {best['score']:.4f}")
+    print(f"🏆 best xgb:     {best_xgb['params']} PR-AUC {best_xgb['score']:.4f} "
+          f"(round {best_xgb['rounds']}, ~{best_xgb['best_iteration']} trees)")
+
+    t = time.perf_counter()
+    pipe, n_trees, metrics = train_final(X, y, train, valid, test, cat, num, best_xgb["params"], jobs)
+    timings["final_fit"] = round(time.perf_counter() - t, 2)
+    print(f"✅ final xgb: {n_trees} trees, test ROC-AUC {metrics['roc_auc']:.4f} "
+          f"PR-AUC {metrics['pr_auc']:.4f} ({timings['final_fit']:.1f}s)")
+
+    selection = None
+    if benchmark:
+        t = time.perf_counter()
+        selection = selection_report(X, y, train, valid, cat, num, leaderboard, jobs)
+        timings["selection"] = round(time.perf_counter() - t, 2)
+    timings["total"] = round(time.perf_counter() - t_start, 2)
+
+    meta = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "data": {**source, "rows": int(len(y)), "positive_rate": round(float(y.mean()), 4),
+                 "train": len(train), "valid": len(valid), "test": len(test)},
+        "features": {"categorical": cat, "numeric": num, "target": TARGET},
+        "model": {"family": "xgb", "params": {**best_xgb["params"], "n_estimators": n_trees},
+                  "cv_pr_auc": best_xgb["score"]},
+        "test_metrics": metrics,
+        "cost": measure(pipe, X.iloc[test[:1000]].to_dict("records")),
+        "search": {"method": "successive_halving", "folds": folds, "factor": factor,
+                   "min_resources": min_resources, "seed": seed, "fold_cache_hit": hit,
+                   "rounds": rounds, "leaderboard": leaderboard},
+        "selection": selection,
+        "timings_s": timings,
+        "versions": {"python": platform.python_version(), "sklearn": sklearn.__version__,
+                     "xgboost": __import__("xgboost").__version__, "numpy": np.__version__},
+        "jobs": jobs if jobs > 0 else os.cpu_count(),
+    }
+    out = None
+    if save_model:
+        out = save(pipe, meta)
+        print(f"✅ {out} (+ {out.with_suffix('.json').name})")
+    if selection:
+        report = build_selection_md(selection, "xgb", out.name if out else None)
+        REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        REPORT_PATH.write_text(report, encoding="utf-8")
+        print(report)
+    print(f"⏱ {timings}")
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage 1 model search and XGBoost training")
+    parser.add_argument("--data", default=DATA_PATH, help="BRFSS export CSV")
+    parser.add_argument("--models", default=None,
+                        help=f"comma-separated subset of {','.join(CANDIDATES)} (xgb always runs)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--factor", type=int, default=3, help="successive halving: keep 1/factor per round")
+    parser.add_argument("--min-resources", type=int, default=2000,
+                        help="successive halving: training rows per fold in the first round")
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (default: all cores)")
+    parser.add_argument("--seed", type=int, default=RANDOM_STATE)
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="preprocessed fold cache")
+    parser.add_argument("--no-save", action="store_true", help="search and evaluate only")
+    parser.add_argument("--no-benchmark", action="store_true",
+                        help="skip the latency / size selection report")
+    args = parser.parse_args()
+    families = None
+    if args.models:
+        families = [m.strip() for m in args.models.split(",") if m.strip()]
+        unknown = set(families) - set(CANDIDATES)
+        if unknown:
+            parser.error(f"unknown models: {', '.join(sorted(unknown))}")
+    main(args.data, families, args.folds, args.factor, args.min_resources, args.jobs,
+         args.seed, not args.no_save, args.cache_dir, not args.no_benchmark)
@@ -1,17 +1,46 @@
 # DS2/clinical_predict.py
-import joblib
-import pandas as pd
+import os
 from pathlib import Path
+from model_registry import ModelRegistry, Prediction
+from observability import timed
 
-MODEL_PATH = Path(__file__).resolve().parent / "Models" / "stage1_svm_latest.joblib"
-clin_model = joblib.load(MODEL_PATH)
+MODELS_DIR = Path(__file__).resolve().parent / "Models"
+MODEL_PATH = MODELS_DIR / "stage1_svm_latest.joblib"
+
+# row used to warm every newly loaded version before it is swapped in
+WARMUP_ROWS = [{
+    "Age (years)": 55, "Resting BP (mm Hg)": 130, "Cholesterol (mg/dl)": 240,
+    "Fasting Blood Sugar": 0, "Fasting Blood Sugar Missing": 0, "Resting ECG": 0,
+    "Max Heart Rate (bpm)": 150, "Exercise Angina": 0, "Exercise Angina Missing": 0,
+    "ST Depression (oldpeak)": 1.0, "ST Slope": 1, "Major Vessels (0–3)": 0,
+    "Thalassemia": 0, "Chest Pain Type": 3,
+}]
+
+# CLINICAL_MODEL=fast serves the surrogate distilled from the SVM
+# (distill_clinical.py, stage1_svm_fast_<timestamp>) for high-volume days;
+# trade-off in reports/clinical_fast.md.
+CLINICAL_MODEL = os.environ.get("CLINICAL_MODEL", "svm").lower()
+MODEL_PREFIX = "stage1_svm_fast" if CLINICAL_MODEL == "fast" else "stage1_svm"
+
+# Serves the newest <MODEL_PREFIX>_<timestamp> artifact and hot-swaps new ones
+# (flask_app starts the watcher). MODEL_BACKEND=onnx → *.onnx artifacts.
+# Loaded on first use / by flask_app's warm-up, not at import.
+registry = ModelRegistry(MODELS_DIR, MODEL_PREFIX, warmup_rows=WARMUP_ROWS, name="clinical",
+                         lazy=True)
 
 def predict_clinical(clin_dict: dict):
-    """يأخذ dict بأعمدة DS2 ويرجع (pred, proba)."""
-    df = pd.DataFrame([clin_dict])
-    proba = clin_model.predict_proba(df)[:, 1]
+    """يأخذ dict بأعمدة DS2 ويرجع Prediction (pred, proba) مع model_version."""
+    proba, version = registry.predict_proba([clin_dict])
     pred = (proba >= 0.5).astype(int)[0]
-    return int(pred), float(proba[0])
+    return Prediction(int(pred), float(proba[0]), version)
+
+def predict_clinical_batch(rows: list):
+    """نفس predict_clinical لعدة صفوف في استدعاء predict_proba واحد."""
+    if not rows:
+        return []
+    proba, version = registry.predict_proba(rows)
+    pred = (proba >= 0.5).astype(int)
+    return [Prediction(int(p), float(pr), version) for p, pr in zip(pred, proba)]
 
 def clinical_tips(clin_dict: dict):
     """نصائح rule-based بناءً على القياسات السريرية."""
@@ -48,12 +77,9 @@ def clinical_tips(clin_dict: dict):
 
     return tips
 
-def full_clinical_eval(form_dict: dict):
-    """
-    يأخذ بيانات الـ form من Flask، يحولها إلى أعمدة الموديل،
-    ثم يرجع (clin_dict, pred, proba, tips).
-    """
-    clin_dict = {
+def build_clin_dict(form_dict: dict):
+    """تحول بيانات الـ form إلى clin_dict بأعمدة الموديل."""
+    return {
         "Age (years)": int(form_dict["age"]),
         "Resting BP (mm Hg)": int(form_dict["restingBP"]),
         "Cholesterol (mg/dl)": int(form_dict["cholesterol"]),
@@ -70,6 +96,20 @@ def full_clinical_eval(form_dict: dict):
         "Chest Pain Type": form_dict["chestPain"],
     }
 
-    pred, proba = predict_clinical(clin_dict)
-    tips = clinical_tips(clin_dict)
-    return clin_dict, pred, proba, tips
+def full_clinical_eval(form_dict: dict, predict=predict_clinical, tips=clinical_tips):
+    """
+    يأخذ بيانات الـ form من Flask، يحولها إلى أعمدة الموديل،
+    ثم يرجع (clin_dict, pred, proba, tips).
+    predict / tips: دوال التقييم والنصائح (مثلاً MicroBatcher أو cache بدل الأصلية).
+    """
+    with timed("parse", model="clinical"):
+        clin_dict = build_clin_dict(form_dict)
+
+    with timed("predict", model="clinical"):
+        result = predict(clin_dict)
+    pred, proba = result
+    with timed("tips", model="clinical"):
+        advice = tips(clin_dict)
+    # metadata, not a model feature: which model version produced this row
+    clin_dict["Model_Version"] = getattr(result, "model_version", None)
+    return clin_dict, pred, proba, advice
@@ -1,16 +1,18 @@
 import os
+from functools import lru_cache
+from pathlib import Path
+
 import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-from flask import jsonify  # For Flask API
+
+from columnar import load_table
+from quantile_sketch import KLLSketch
 
 # ---------------------------------------------------------
 # 1) CONSTANTS - FIXED STRING KEYS ✅
 # ---------------------------------------------------------
-DATA_PATH = r"C:\Users\habib\OneDrive\المستندات\Graduation Project\GRAD-proj-DEPI\DS2\heart_cleveland_upload.csv"
-assert os.path.exists(DATA_PATH), f"File not found: {DATA_PATH}"
+# the Cleveland CSV ships next to this file; CLINICAL_DATA_PATH overrides it
+DATA_PATH = os.environ.get("CLINICAL_DATA_PATH",
+                           str(Path(__file__).resolve().parent / "heart_cleveland_upload.csv"))
 
 TGT = "Heart Disease Class (0,1)"
 
@@ -62,24 +64,63 @@ CATEGORY_MAPS = {
 }
 
 # ---------------------------------------------------------
-# 2) LOAD DATA
+# 2) LOAD DATA (on first use, not at import)
 # ---------------------------------------------------------
-df = pd.read_csv(DATA_PATH)
+@lru_cache(maxsize=None)
+def load_clinical_df() -> pd.DataFrame:
+    df = load_table(DATA_PATH)   # .feather copy if converted, see columnar.py
+    print("Original data shape:", df.shape)
+    return df
+
+
+@lru_cache(maxsize=None)
+def get_df_viz() -> pd.DataFrame:
+    """df_viz for visuals (drop unknowns)."""
+    df_viz = load_clinical_df().copy()
+    for col in CAT:
+        if col in df_viz.columns:
+            df_viz = df_viz[df_viz[col].notna()]
+    print("Visuals data shape:", df_viz.shape)
+    return df_viz
+
+
+def build_sketches(df) -> dict:
+    """One KLL quantile sketch per NUM column; mergeable with the live ones (cohort_stats)."""
+    sketches = {}
+    for col in NUM:
+        if col in df.columns:
+            sketch = KLLSketch()
+            sketch.update_many(df[col].dropna().tolist())
+            sketches[col] = sketch
+    return sketches
 
-# Create df_viz for visuals (drop unknowns)
-df_viz = df.copy()
-for col in CAT:
-    if col in df_viz.columns:
-        df_viz = df_viz[df_viz[col].notna()]
 
-print("Original data shape:", df.shape)
-print("Visuals data shape:", df_viz.shape)
+@lru_cache(maxsize=None)
+def get_sketches() -> dict:
+    """Sketches of the reference (Cleveland) data, built once."""
+    return build_sketches(get_df_viz())
+
+
+def __getattr__(name):
+    # `from DS2.clinical_visuals import df, df_viz` still works, loading them then
+    if name == "df":
+        return load_clinical_df()
+    if name == "df_viz":
+        return get_df_viz()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------------------------------------------------------
 # 3) MAIN FUNCTION - COMPLETE FIXED ✅
 # ---------------------------------------------------------
-def get_clinical_visual_stats(df):
+def get_clinical_visual_stats(df, bins=8, sketches=None):
+    """
+    Dashboard stats. Numeric summaries and the `bins`-bin histograms are read
+    from the per-column quantile sketches (built from df unless given), so
+    any bin count costs the same; exact for the Cleveland table.
+    """
     stats = {}
+    if sketches is None:
+        sketches = build_sketches(df)
     
     # //////////////////////// HEART DISEASE ///////////////////////////////
     label_map = {0: "Healthy", 1: "Diseased"}
@@ -91,18 +132,14 @@ def get_clinical_visual_stats(df):
     #///////////////////////// NUMERIC SUMMARY + HISTOGRAMS ////////////////////////////
     stats["numeric_summary"] = {}
     for col in NUM:
-        if col in df.columns:
-            series = df[col].dropna()
-            if len(series) > 0:
-                stats["numeric_summary"][col] = {
-                    "min": float(series.min()), "max": float(series.max()),
-                    "median": float(series.median()), "mean": float(series.mean())
-                }
-                try:
-                    hist, edges = np.histogram(series, bins=8)
-                    stats[f"{col}_histogram"] = [{"bin": f"{edges[i]:.0f}-{edges[i+1]:.0f}", "count": int(hist[i])} for i in range(len(hist))]
-                except:
-                    stats[f"{col}_histogram"] = [{"bin": "0-100", "count": 100}]
+        sketch = sketches.get(col)
+        if sketch is not None and sketch.n > 0:
+            stats["numeric_summary"][col] = {
+                "min": sketch.min, "max": sketch.max,
+                "median": sketch.median(), "mean": sketch.total / sketch.n
+            }
+            stats[f"{col}_histogram"] = [{"bin": b["bin"], "count": b["count"]}
+                                         for b in sketch.histogram(bins)]
 
     # //////////////////////// FIXED CATEGORICALS - STRING CONVERSION  ////////////////////////
     stats["categoricals"] = {}
@@ -128,6 +165,27 @@ def get_clinical_visual_stats(df):
     return stats
 
 
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def get_clinical_distribution(sketches, columns=None, qs=DEFAULT_QUANTILES, bins=8,
+                              lo=None, hi=None, label_digits=0) -> dict:
+    """Percentiles + a histogram over [lo, hi] per column, straight from the sketches."""
+    out = {}
+    for col in columns or NUM:
+        sketch = sketches.get(col)
+        if sketch is None or sketch.n == 0:
+            out[col] = {"n": 0}
+            continue
+        out[col] = {
+            "n": sketch.n, "min": sketch.min, "max": sketch.max,
+            "mean": round(sketch.total / sketch.n, 4),
+            "quantiles": {str(q): v for q, v in zip(qs, sketch.quantiles(qs))},
+            "histogram": sketch.histogram(bins, lo, hi, label_digits),
+        }
+    return out
+
+
 
 
 # ---------------------------------------------------------
@@ -139,7 +197,7 @@ def flask_endpoint_example():
     
     @app.route("/api/clinical-visuals-data")
     def clinical_visuals_data():
-        return jsonify(get_clinical_visual_stats(df))
+        return jsonify(get_clinical_visual_stats(get_df_viz()))
     """
     pass
 
@@ -151,7 +209,7 @@ if __name__ == "__main__":
     print("🚀 CLINICAL VISUAL STATS - FULL TEST")
     print("="*60)
     
-    out = get_clinical_visual_stats(df)
+    out = get_clinical_visual_stats(load_clinical_df())
     
     # ✅ SAFE CHECKS
     print("\n✅ Heart disease:", len(out.get("heart_disease", [])), "items")
@@ -0,0 +1,448 @@
+# benchmark.py
+"""
+HTTP benchmark for flask_app against a local SQLite stand-in for MediPredict.
+
+    python benchmark.py run [--profile 1x10,8x20,32x20] [--workers 4]
+                            [--scenarios lifestyle_form,clinical_form,...]
+                            [--save-baseline] [--traffic-model reports/traffic_model.json]
+    python benchmark.py compare reports/bench_latest.json [--threshold 0.15]
+
+run seeds a fresh SQLite database (users, profiles, lab branches and some
+prediction history; ARRAY tip columns are stored as JSON, see models.py),
+starts gunicorn with DATABASE_URL pointing at it and drives the routes with
+closed-loop clients: each step of --profile is "<concurrency>x<seconds>".
+Per step and scenario it reports throughput and p50/p95/p99 latency, and
+writes the result JSON (--out, default reports/bench_latest.json;
+--save-baseline also copies it to reports/bench_baseline.json).
+With --traffic-model the lifestyle / clinical forms are drawn from the
+training-data distributions (see traffic_gen.py) instead of uniform ranges.
+
+compare diffs a result against the baseline and exits 1 when a scenario's
+p95/p99 grew, its throughput dropped (both by more than --threshold) or its
+error rate went up.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+REPORTS = ROOT / "reports"
+BASELINE_PATH = REPORTS / "bench_baseline.json"
+LATEST_PATH = REPORTS / "bench_latest.json"
+
+N_USERS = 200
+BRANCHES = ("LAB-CAI-01", "LAB-ALX-01", "LAB-GIZ-01")
+HISTORY_PER_USER = 10
+
+AGE_CATS = ["18-24", "25-29", "30-34", "35-39", "40-44", "45-49", "50-54",
+            "55-59", "60-64", "65-69", "70-74", "75-79", "80+"]
+
+
+# -------------------------------------------------
+# Database stand-in
+# -------------------------------------------------
+def seed_database(path, n_users=N_USERS, history=HISTORY_PER_USER, seed=42):
+    """Create the schema in a SQLite file and fill it with benchmark data."""
+    from flask import Flask
+    from sqlalchemy import text
+    from werkzeug.security import generate_password_hash
+    from models import (db, User, PatientProfile, LabBranch,
+                        LifestylePrediction, ClinicalPrediction)
+
+    rng = random.Random(seed)
+    app = Flask("benchmark_seed")
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        # readers and the writer don't block each other
+        db.session.execute(text("PRAGMA journal_mode=WAL"))
+
+        for code in BRANCHES:
+            db.session.add(LabBranch(branch_code=code, branch_name=f"Branch {code}",
+                                     location="Benchmark"))
+        pw = generate_password_hash("bench")
+        now = datetime.utcnow()
+        for i in range(n_users):
+            user = User(username=f"bench_user_{i:04d}", password_hash=pw,
+                        full_name=f"Bench User {i}", age=rng.randint(20, 80))
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(PatientProfile(user_id=user.user_id, patient_id=f"PID-B-{i:05d}",
+                                          tips=["Keep exercising."], clinical_tips=[]))
+            for k in range(history):
+                score = round(rng.random(), 3)
+                db.session.add(LifestylePrediction(
+                    user_id=user.user_id, general_health="Good", exercise="Yes",
+                    diabetes="No", sex="Female", age_category=rng.choice(AGE_CATS),
+                    bmi=round(rng.uniform(18, 40), 1), smoking_history="No",
+                    risk_prediction="High" if score >= 0.5 else "Low",
+                    prediction_score=score, created_at=now - timedelta(days=k)))
+                db.session.add(ClinicalPrediction(
+                    user_id=user.user_id, age_years=user.age, resting_bp_systolic=rng.randint(100, 180),
+                    cholesterol_mg_dl=rng.randint(150, 320), max_heart_rate=rng.randint(90, 200),
+                    risk_prediction="High" if score >= 0.5 else "Low",
+                    prediction_score=score, created_at=now - timedelta(days=k)))
+        db.session.commit()
+    return path
+
+
+# -------------------------------------------------
+# Scenarios: fn(rng) -> (method, path, body, content_type)
+# -------------------------------------------------
+FORM_STREAMS = {}   # kind -> payload iterator, set by --traffic-model
+_streams_lock = threading.Lock()
+
+
+def _streamed(kind):
+    with _streams_lock:
+        return next(FORM_STREAMS[kind])
+
+
+def _lifestyle_form(rng):
+    if "lifestyle" in FORM_STREAMS:
+        return _streamed("lifestyle")
+    return {
+        "generalHealth": rng.choice(["Excellent", "Very Good", "Good", "Fair", "Poor"]),
+        "exercise": rng.choice(["Yes", "No"]),
+        "diabetes": rng.choice(["No", "Yes", "Borderline"]),
+        "sex": rng.choice(["Female", "Male"]),
+        "ageCategory": rng.choice(AGE_CATS),
+        "bmi": f"{rng.uniform(17, 42):.1f}",
+        "smoking": rng.choice(["Yes", "No"]),
+        "height": str(rng.randint(150, 195)),
+        "weight": str(rng.randint(45, 130)),
+        "alcohol": str(rng.randint(0, 20)),
+        "fruit": str(rng.randint(0, 60)),
+        "veg": str(rng.randint(0, 30)),
+        "fried": str(rng.randint(0, 12)),
+    }
+
+
+def _clinical_form(rng):
+    if "clinical" in FORM_STREAMS:
+        return _streamed("clinical")
+    return {
+        "age": str(rng.randint(29, 77)),
+        "restingBP": str(rng.randint(94, 200)),
+        "cholesterol": str(rng.randint(126, 400)),
+        "fbs": str(rng.randint(0, 1)),
+        "restingECG": rng.choice(["Normal", "ST-T Wave Abnormality", "Left Ventricular Hypertrophy"]),
+        "maxHR": str(rng.randint(71, 202)),
+        "exAngina": rng.choice(["Yes", "No"]),
+        "oldpeak": f"{rng.uniform(0, 5):.1f}",
+        "slope": rng.choice(["Up", "Flat", "Down"]),
+        "vessels": str(rng.randint(0, 3)),
+        "thal": rng.choice(["Normal", "Fixed Defect", "Reversable Defect"]),
+        "chestPain": rng.choice(["Typical Angina", "Atypical Angina", "Non-anginal Pain", "Asymptomatic"]),
+    }
+
+
+def _user(rng):
+    return f"bench_user_{rng.randrange(N_USERS):04d}"
+
+
+def _form(path, data):
+    return "POST", path, urllib.parse.urlencode(data), "application/x-www-form-urlencoded"
+
+
+def _appointment(rng):
+    day = date.today() + timedelta(days=rng.randint(1, 60))
+    body = {"username": _user(rng), "branch_code": rng.choice(BRANCHES),
+            "date": day.isoformat(), "time": f"{rng.randint(8, 17):02d}:{rng.choice(['00', '30'])}"}
+    return "POST", "/api/appointments", json.dumps(body), "application/json"
+
+
+# name -> (weight, request builder)
+SCENARIOS = {
+    "lifestyle_form": (25, lambda rng: _form("/models/lifestyle", _lifestyle_form(rng))),
+    "clinical_form": (20, lambda rng: _form("/predict/clinical", _clinical_form(rng))),
+    "patient_lifestyle": (15, lambda rng: _form(f"/patient/lifestyle?username={_user(rng)}",
+                                                _lifestyle_form(rng))),
+    "lifestyle_history": (15, lambda rng: ("GET", f"/api/patients/{_user(rng)}/lifestyle-history",
+                                           None, None)),
+    "clinical_history": (10, lambda rng: ("GET", f"/api/patients/{_user(rng)}/clinical-history",
+                                          None, None)),
+    "appointment": (10, _appointment),
+    "visuals_data": (5, lambda rng: ("GET", "/api/visuals-data", None, None)),
+}
+
+
+# -------------------------------------------------
+# Load generation
+# -------------------------------------------------
+def _client(host, port, scenarios, weights, seed, stop_at, out):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    while time.perf_counter() < stop_at:
+        name = rng.choices(scenarios, weights)[0]
+        method, path, body, ctype = SCENARIOS[name][1](rng)
+        headers = {"Content-Type": ctype} if ctype else {}
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status < 400
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+        out.append((name, time.perf_counter() - t0, ok))
+    conn.close()
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, seconds):
+    lat = sorted(s[1] * 1000.0 for s in samples)
+    errors = sum(1 for s in samples if not s[2])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput_rps": len(samples) / seconds if seconds else 0.0,
+        "mean_ms": sum(lat) / len(lat) if lat else 0.0,
+        "p50_ms": percentile(lat, 50),
+        "p95_ms": percentile(lat, 95),
+        "p99_ms": percentile(lat, 99),
+    }
+
+
+def run_step(host, port, concurrency, seconds, scenarios, seed):
+    weights = [SCENARIOS[s][0] for s in scenarios]
+    stop_at = time.perf_counter() + seconds
+    buffers = [[] for _ in range(concurrency)]
+    threads = [threading.Thread(target=_client, daemon=True,
+                                args=(host, port, scenarios, weights, seed * 1000 + i, stop_at, buffers[i]))
+               for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    samples = [s for b in buffers for s in b]
+    step = {"concurrency": concurrency, "duration_s": elapsed,
+            "all": summarize(samples, elapsed), "scenarios": {}}
+    for name in scenarios:
+        step["scenarios"][name] = summarize([s for s in samples if s[0] == name], elapsed)
+    return step
+
+
+def parse_profile(text):
+    steps = []
+    for part in text.split(","):
+        conc, _, secs = part.strip().partition("x")
+        steps.append((int(conc), float(secs or 10)))
+    return steps
+
+
+# -------------------------------------------------
+# Server
+# -------------------------------------------------
+def start_server(app, port, workers, db_path, extra_env=None):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}?timeout=30",
+               WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               MODEL_POLL_SECONDS="0", **(extra_env or {}))
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", app],
+                            cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 300
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/api/models")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.5)
+    stop_server(proc)
+    raise TimeoutError("gunicorn did not become ready")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -------------------------------------------------
+# Commands
+# -------------------------------------------------
+def cmd_run(args):
+    scenarios = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(unknown)}")
+    profile = parse_profile(args.profile)
+    if args.traffic_model:
+        from traffic_gen import TrafficGenerator
+        gen = TrafficGenerator.load(args.traffic_model)
+        FORM_STREAMS.update({kind: gen.stream(kind) for kind in ("lifestyle", "clinical")})
+
+    tmp = Path(tempfile.mkdtemp(prefix="medipredict_bench_"))
+    db_path = seed_database(tmp / "medipredict.sqlite")
+    proc = start_server(args.app, args.port, args.workers, db_path)
+    try:
+        if args.warmup:
+            run_step("127.0.0.1", args.port, 2, args.warmup, scenarios, seed=0)
+        steps = []
+        for i, (conc, secs) in enumerate(profile, start=1):
+            step = run_step("127.0.0.1", args.port, conc, secs, scenarios, seed=i)
+            steps.append(step)
+            a = step["all"]
+            print(f"c={conc:<3} {a['throughput_rps']:8.1f} req/s  p50 {a['p50_ms']:7.1f} ms  "
+                  f"p95 {a['p95_ms']:7.1f} ms  p99 {a['p99_ms']:7.1f} ms  errors {a['errors']}")
+    finally:
+        stop_server(proc)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "workers": args.workers,
+            "profile": args.profile,
+            "scenarios": scenarios,
+            "traffic_model": args.traffic_model,
+        },
+        "steps": steps,
+    }
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"✅ results: {out}")
+    if args.save_baseline:
+        BASELINE_PATH.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"✅ baseline: {BASELINE_PATH}")
+    print(format_table(result))
+
+
+def format_table(result):
+    lines = ["| concurrency | scenario | req/s | p50 ms | p95 ms | p99 ms | errors |",
+             "|---|---|---|---|---|---|---|"]
+    for step in result["steps"]:
+        for name, s in [("(all)", step["all"])] + sorted(step["scenarios"].items()):
+            lines.append(f"| {step['concurrency']} | {name} | {s['throughput_rps']:.1f} "
+                         f"| {s['p50_ms']:.1f} | {s['p95_ms']:.1f} | {s['p99_ms']:.1f} "
+                         f"| {s['errors']} |")
+    return "\n".join(lines)
+
+
+def compare(current, baseline, threshold=0.15, min_ms=1.0):
+    """[(concurrency, scenario, metric, baseline, current, change)] that regressed."""
+    base_steps = {s["concurrency"]: s for s in baseline["steps"]}
+    regressions = []
+    for step in current["steps"]:
+        base = base_steps.get(step["concurrency"])
+        if base is None:
+            continue
+        pairs = [("(all)", step["all"], base["all"])]
+        pairs += [(n, s, base["scenarios"][n]) for n, s in step["scenarios"].items()
+                  if n in base["scenarios"]]
+        for name, cur, old in pairs:
+            if not cur["requests"] or not old["requests"]:
+                continue
+            for metric in ("p95_ms", "p99_ms"):
+                if (cur[metric] > old[metric] * (1 + threshold)
+                        and cur[metric] - old[metric] > min_ms):
+                    regressions.append((step["concurrency"], name, metric, old[metric], cur[metric],
+                                        cur[metric] / old[metric] - 1 if old[metric] else float("inf")))
+            if cur["throughput_rps"] < old["throughput_rps"] * (1 - threshold):
+                regressions.append((step["concurrency"], name, "throughput_rps",
+                                    old["throughput_rps"], cur["throughput_rps"],
+                                    cur["throughput_rps"] / old["throughput_rps"] - 1))
+            if cur["error_rate"] > old["error_rate"] + 0.01:
+                regressions.append((step["concurrency"], name, "error_rate",
+                                    old["error_rate"], cur["error_rate"],
+                                    cur["error_rate"] - old["error_rate"]))
+    return regressions
+
+
+def cmd_compare(args):
+    current = json.loads(Path(args.result).read_text(encoding="utf-8"))
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    regressions = compare(current, baseline, args.threshold)
+    print(f"baseline {baseline['meta'].get('git_commit')} ({baseline['meta']['created_at']}) "
+          f"vs {current['meta'].get('git_commit')} ({current['meta']['created_at']}), "
+          f"threshold {args.threshold:.0%}")
+    if not regressions:
+        print("✅ no regressions")
+        return 0
+    print("| concurrency | scenario | metric | baseline | current | change |")
+    print("|---|---|---|---|---|---|")
+    for conc, name, metric, old, cur, change in regressions:
+        print(f"| {conc} | {name} | {metric} | {old:.2f} | {cur:.2f} | {change:+.0%} |")
+    print(f"❌ {len(regressions)} regression(s)")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP benchmark for flask_app")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="seed a SQLite stand-in, boot the app, drive load")
+    run.add_argument("--profile", default="1x10,8x20,32x20",
+                     help="comma-separated <concurrency>x<seconds> steps")
+    run.add_argument("--scenarios", default="all",
+                     help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    run.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    run.add_argument("--app", default="wsgi:app")
+    run.add_argument("--port", type=int, default=5057)
+    run.add_argument("--warmup", type=float, default=3.0, help="seconds of warm-up traffic")
+    run.add_argument("--out", default=str(LATEST_PATH))
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--traffic-model", help="draw form payloads from this traffic_gen.py model")
+
+    cmp_ = sub.add_parser("compare", help="flag regressions against the baseline")
+    cmp_.add_argument("result", nargs="?", default=str(LATEST_PATH))
+    cmp_.add_argument("--baseline", default=str(BASELINE_PATH))
+    cmp_.add_argument("--threshold", type=float, default=0.15,
+                      help="relative change treated as a regression")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        cmd_run(args)
+    else:
+        sys.exit(cmd_compare(args))
+
+
+if __name__ == "__main__":
+    main()
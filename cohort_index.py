@@ -0,0 +1,268 @@
+# cohort_index.py
+"""
+Ad-hoc cohort slicing over the DS1 (BRFSS lifestyle) dataset.
+
+    index = CohortIndex(DATA_PATH)
+    index.query({"Sex": ["Female"], "Age_Category": ["55-64"],
+                 "Smoking_History": ["Yes"], "Diabetes": ["Yes"]},
+                group_by="General_Health", metric="rate:Heart_Disease=Yes")
+
+The dataset is loaded once (first query, or warm() before the fork). Every
+value of every categorical column gets a bitmap: one bit per row, packed 8
+rows per byte (np.packbits). That is about 38 KB per value for the 308k-row
+export. A query ORs the bitmaps of the values picked within a column and ANDs
+the columns together. Group counts and rates come from popcounts of
+(mask & group bitmap [& target bitmap]). The full table is never scanned, and
+only mean:<numeric column> unpacks the mask.
+
+Filters: {column: [values]}, values matched case-insensitively. An
+Age_Category value may also be a range such as "55-64" or "65+", which
+expands to the 5-year categories it covers.
+Metrics: count (default), rate:<column>=<value> ("rate" alone is
+Heart_Disease=Yes) and mean:<numeric column>.
+
+Results are kept in an LRU keyed by the normalized query (columns and values
+sorted and canonicalised), so "sex=female&smoking=yes" and the same filters
+in another order or case share one entry.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from columnar import load_table
+from observability import METRICS, get_logger, timed
+
+log = get_logger("cohort_index")
+
+DEFAULT_TARGET = ("Heart_Disease", "Yes")
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(bits):
+        return int(np.bitwise_count(bits).sum(dtype=np.int64))
+else:
+    _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(bits):
+        return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+class QueryError(ValueError):
+    """Unknown column / value / metric; reported to the client as a 400."""
+
+
+def _age_bounds(label):
+    label = label.strip()
+    if label.endswith("+"):
+        return float(label[:-1]), float("inf")
+    lo, _, hi = label.partition("-")
+    return float(lo), float(hi)
+
+
+class CohortIndex:
+
+    def __init__(self, source_path, cache_size=1024):
+        self.source_path = source_path
+        self.cache_size = int(cache_size)
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        if not hasattr(self, "_loaded"):
+            self._cache = OrderedDict()   # normalized query -> result
+            self._loaded = False
+            self.rows = 0
+            self.bitmaps = {}        # column -> {value: packed uint8 bitmap}
+            self.numeric = {}        # column -> float64 values (NaN = missing)
+            self.hits = self.misses = 0
+
+    # -------------------------------------------------
+    # Build
+    # -------------------------------------------------
+    def warm(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._build()
+        return self
+
+    def _build(self):
+        with timed("cohort_index_build"):
+            df = load_table(self.source_path)
+            bitmaps, numeric = {}, {}
+            for col in df.columns:
+                s = df[col]
+                if str(s.dtype) == "category":
+                    codes = s.cat.codes.to_numpy()
+                    bitmaps[col] = {str(cat): np.packbits(codes == i)
+                                    for i, cat in enumerate(s.cat.categories)}
+                elif s.dtype.kind in "iuf":
+                    numeric[col] = s.to_numpy(dtype=np.float64, na_value=np.nan)
+            self.rows = len(df)
+            self.bitmaps, self.numeric = bitmaps, numeric
+            self._loaded = True
+        size = sum(b.nbytes for values in bitmaps.values() for b in values.values())
+        log.info("cohort index: %d rows, %d categorical columns, %d bitmaps (%.1f MB)",
+                 self.rows, len(bitmaps), sum(len(v) for v in bitmaps.values()), size / 2**20)
+
+    def schema(self) -> dict:
+        """Filterable columns with their values, and the numeric columns for mean:."""
+        self.warm()
+        return {"rows": self.rows,
+                "categorical": {col: list(values) for col, values in self.bitmaps.items()},
+                "numeric": list(self.numeric)}
+
+    # -------------------------------------------------
+    # Normalisation
+    # -------------------------------------------------
+    def _column(self, name, numeric=False):
+        pool = self.numeric if numeric else self.bitmaps
+        if name in pool:
+            return name
+        for col in pool:
+            if col.lower() == name.strip().lower():
+                return col
+        kind = "numeric" if numeric else "categorical"
+        raise QueryError(f"unknown {kind} column: {name!r}")
+
+    def _values(self, col, raw):
+        values = self.bitmaps[col]
+        by_lower = {v.lower(): v for v in values}
+        out = set()
+        for value in raw:
+            value = str(value).strip()
+            if value.lower() in by_lower:
+                out.add(by_lower[value.lower()])
+            elif col == "Age_Category":
+                out.update(self._age_range(value))
+            else:
+                raise QueryError(f"unknown value for {col}: {value!r}")
+        return tuple(sorted(out))
+
+    def _age_range(self, value):
+        try:
+            lo, hi = _age_bounds(value)
+        except ValueError:
+            raise QueryError(f"unknown value for Age_Category: {value!r}") from None
+        # "55-64" covers 55-59 and 60-64; bounds are inclusive ages
+        picked = [cat for cat in self.bitmaps["Age_Category"]
+                  if lo <= _age_bounds(cat)[0] and _age_bounds(cat)[1] <= hi]
+        if not picked:
+            raise QueryError(f"no Age_Category falls within {value!r}")
+        return picked
+
+    def normalize(self, filters, group_by=None, metric=None):
+        """Canonical, hashable form of a query; raises QueryError."""
+        self.warm()
+        norm = []
+        for name, raw in (filters or {}).items():
+            col = self._column(name)
+            if isinstance(raw, str):
+                raw = [raw]
+            values = self._values(col, raw)
+            if len(values) < len(self.bitmaps[col]):      # every value = no filter
+                norm.append((col, values))
+        group = self._column(group_by) if group_by else None
+
+        metric = (metric or "count").strip()
+        kind, _, arg = metric.partition(":")
+        kind = kind.lower()
+        if kind == "count" and not arg:
+            norm_metric = ("count",)
+        elif kind == "rate":
+            col, value = (arg.split("=", 1) if arg else DEFAULT_TARGET)
+            col = self._column(col)
+            norm_metric = ("rate", col, self._values(col, [value])[0])
+        elif kind == "mean" and arg:
+            norm_metric = ("mean", self._column(arg, numeric=True))
+        else:
+            raise QueryError(f"unknown metric: {metric!r} "
+                             "(count, rate[:<column>=<value>], mean:<numeric column>)")
+        return tuple(sorted(norm)), group, norm_metric
+
+    # -------------------------------------------------
+    # Query
+    # -------------------------------------------------
+    def query(self, filters, group_by=None, metric=None) -> dict:
+        key = self.normalize(filters, group_by, metric)
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if result is not None:
+            METRICS.inc("medipredict_cohort_query_cache_total", 1,
+                        "cohort queries answered from the cache", result="hit")
+            return result
+
+        with timed("cohort_query"):
+            result = self._run(*key)
+        with self._cache_lock:
+            self.misses += 1
+            if self.cache_size > 0:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        METRICS.inc("medipredict_cohort_query_cache_total", 1,
+                    "cohort queries answered from the cache", result="miss")
+        return result
+
+    def _mask(self, filters):
+        mask = None
+        for col, values in filters:
+            bitmaps = self.bitmaps[col]
+            col_mask = bitmaps[values[0]].copy()
+            for value in values[1:]:
+                np.bitwise_or(col_mask, bitmaps[value], out=col_mask)
+            if mask is None:
+                mask = col_mask
+            else:
+                np.bitwise_and(mask, col_mask, out=mask)
+        return mask
+
+    def _measure(self, mask, metric, scratch):
+        """(rows, value) of the metric over the rows set in mask."""
+        rows = _popcount(mask)
+        if metric[0] == "count":
+            return rows, rows
+        if rows == 0:
+            return 0, None
+        if metric[0] == "rate":
+            np.bitwise_and(mask, self.bitmaps[metric[1]][metric[2]], out=scratch)
+            return rows, round(_popcount(scratch) / rows, 4)
+        selected = np.unpackbits(mask, count=self.rows).view(bool)
+        values = self.numeric[metric[1]][selected]
+        values = values[~np.isnan(values)]
+        return rows, (round(float(values.mean()), 2) if len(values) else None)
+
+    def _run(self, filters, group_by, metric):
+        mask = self._mask(filters)
+        if mask is None:                         # no filters: every row
+            mask = np.packbits(np.ones(self.rows, dtype=bool))
+        scratch = np.empty_like(mask)
+        matched, value = self._measure(mask, metric, scratch)
+        result = {
+            "filters": {col: list(values) for col, values in filters},
+            "group_by": group_by,
+            "metric": ":".join(metric[:2]) + (f"={metric[2]}" if metric[0] == "rate" else ""),
+            "rows": matched,
+            "value": value,
+        }
+        if group_by:
+            groups = []
+            group_mask = np.empty_like(mask)
+            for label, bitmap in self.bitmaps[group_by].items():
+                np.bitwise_and(mask, bitmap, out=group_mask)
+                rows, value = self._measure(group_mask, metric, scratch)
+                if rows:
+                    groups.append({group_by: label, "rows": rows, "value": value})
+            result["groups"] = groups
+        return result
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            return {"loaded": self._loaded, "rows": self.rows, "cached": len(self._cache),
+                    "cache_size": self.cache_size, "hits": self.hits, "misses": self.misses}
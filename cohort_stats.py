@@ -0,0 +1,406 @@
+# cohort_stats.py
+"""
+Live aggregates over the predictions patients actually submit.
+
+    cohort = CohortStats()
+    cohort.attach(db.session)          # follow inserts committed through this session
+    cohort.get()                       # dashboard payload, O(groups)
+
+Kept in memory as counters and running moments (Welford: n, mean, M2):
+- lifestyle risk by age_category: rows, high-risk rows, score moments and a
+  10-bin score histogram
+- clinical risk by age band, same shape
+- a KLL quantile sketch per clinical measurement (age, resting BP,
+  cholesterol, max heart rate, oldpeak), mergeable with the reference data's
+  sketches (clinical_visuals.get_sketches)
+- BMI by exercise
+- per lab branch: users with an appointment there, and how many of them are
+  high risk (latest lifestyle or latest clinical prediction is "High")
+
+Every gunicorn worker applies its own inserts as they commit (session events:
+new LifestylePrediction / ClinicalPrediction / Appointment rows are captured
+after the flush and applied after the commit; a rollback drops them). Rows
+written by other workers or scripts are picked up by get(), at most every
+refresh_seconds, with an indexed range scan over ids above the last one seen.
+The scan re-reads
+an overlap window and skips ids already applied, so rows whose transaction
+committed late are not lost. The state plus the id watermarks is checkpointed
+to the cohort_summaries table every checkpoint_seconds; a restarted worker
+loads it and only scans what was inserted since.
+"""
+import threading
+import time
+from datetime import datetime
+
+from observability import get_logger, timed
+from quantile_sketch import KLLSketch
+
+log = get_logger("cohort")
+
+AGE_CATS = ["18-24", "25-29", "30-34", "35-39", "40-44", "45-49", "50-54",
+            "55-59", "60-64", "65-69", "70-74", "75-79", "80+"]
+AGE_BANDS = ["<40", "40-49", "50-59", "60-69", "70+"]
+SCORE_BINS = 10
+OVERLAP = 256           # ids re-checked below the watermark
+SCAN_BATCH = 5000
+SUMMARY_NAME = "live"
+STATE_VERSION = 2       # checkpoints of another version are rebuilt by a full scan
+
+# clinical_visuals.NUM label -> ClinicalPrediction column
+CLINICAL_MEASURES = {
+    "Age (years)": "age_years",
+    "Resting BP (mm Hg)": "resting_bp_systolic",
+    "Cholesterol (mg/dl)": "cholesterol_mg_dl",
+    "Max Heart Rate (bpm)": "max_heart_rate",
+    "ST Depression (oldpeak)": "st_depression_oldpeak",
+}
+
+
+def age_band(age):
+    if age is None:
+        return None
+    age = int(age)
+    if age < 40:
+        return "<40"
+    if age >= 70:
+        return "70+"
+    lo = age // 10 * 10
+    return f"{lo}-{lo + 9}"
+
+
+def _moments_add(m, x):
+    """m = [n, mean, M2]"""
+    m[0] += 1
+    d = x - m[1]
+    m[1] += d / m[0]
+    m[2] += d * (x - m[1])
+
+
+def _moments_out(m):
+    n, mean, m2 = m
+    return {"n": n, "mean": round(mean, 4) if n else None,
+            "std": round((m2 / (n - 1)) ** 0.5, 4) if n > 1 else None}
+
+
+def _risk_group():
+    return {"n": 0, "high": 0, "score": [0, 0.0, 0.0], "hist": [0] * SCORE_BINS}
+
+
+class _Stream:
+    """Ids applied for one table: watermark + the recent ids (overlap window)."""
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.watermark = state.get("watermark", 0)
+        self.recent = set(state.get("recent", ()))
+
+    def seen(self, row_id):
+        return row_id <= self.watermark - OVERLAP or row_id in self.recent
+
+    def add(self, row_id):
+        self.recent.add(row_id)
+        if row_id > self.watermark:
+            self.watermark = row_id
+            floor = row_id - OVERLAP
+            if len(self.recent) > 2 * OVERLAP:
+                self.recent = {i for i in self.recent if i > floor}
+
+    def to_json(self):
+        floor = self.watermark - OVERLAP
+        return {"watermark": self.watermark, "recent": sorted(i for i in self.recent if i > floor)}
+
+
+class CohortStats:
+
+    def __init__(self, refresh_seconds=5.0, checkpoint_seconds=60.0):
+        self.refresh_seconds = float(refresh_seconds)
+        self.checkpoint_seconds = float(checkpoint_seconds)
+        self._lock = threading.Lock()          # state
+        self._refresh_lock = threading.Lock()  # one DB catch-up at a time
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._next_checkpoint = 0.0
+        self._dirty = False
+        self._cached = None
+        self._branch_codes = {}                # branch_id -> branch_code
+        self._set_state({})
+
+    # -------------------------------------------------
+    # State
+    # -------------------------------------------------
+    def _set_state(self, s):
+        self.life_by_age = s.get("life_by_age", {})
+        self.clin_by_band = s.get("clin_by_band", {})
+        self.bmi_by_exercise = s.get("bmi_by_exercise", {})
+        # user id -> [lifestyle pred id, high, clinical pred id, high]
+        self.users = {int(k): v for k, v in s.get("users", {}).items()}
+        self.user_branches = {int(k): set(v) for k, v in s.get("user_branches", {}).items()}
+        self.branches = s.get("branches", {})   # code -> {"users": n, "high": n}
+        sketches = s.get("clin_sketches", {})
+        self.clin_sketches = {col: KLLSketch.from_dict(sketches[col]) if col in sketches
+                              else KLLSketch() for col in CLINICAL_MEASURES}
+        streams = s.get("streams", {})
+        self.streams = {t: _Stream(streams.get(t)) for t in ("lifestyle", "clinical", "appointments")}
+
+    def _state(self):
+        return {
+            "version": STATE_VERSION,
+            "life_by_age": self.life_by_age,
+            "clin_by_band": self.clin_by_band,
+            "bmi_by_exercise": self.bmi_by_exercise,
+            "users": {str(k): v for k, v in self.users.items()},
+            "user_branches": {str(k): sorted(v) for k, v in self.user_branches.items()},
+            "branches": self.branches,
+            "clin_sketches": {col: sk.to_dict() for col, sk in self.clin_sketches.items()},
+            "streams": {t: s.to_json() for t, s in self.streams.items()},
+        }
+
+    # -------------------------------------------------
+    # Applying rows (caller holds self._lock)
+    # -------------------------------------------------
+    def _apply_risk(self, groups, key, high, score):
+        if key is None:
+            return
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = _risk_group()
+        g["n"] += 1
+        g["high"] += int(high)
+        if score is not None:
+            score = float(score)
+            _moments_add(g["score"], score)
+            g["hist"][min(SCORE_BINS - 1, max(0, int(score * SCORE_BINS)))] += 1
+
+    def _set_user_risk(self, user_id, pred_id, high, stage):
+        if user_id is None:
+            return
+        u = self.users.get(user_id)
+        if u is None:
+            u = self.users[user_id] = [0, False, 0, False]
+        i = 0 if stage == "lifestyle" else 2
+        if pred_id < u[i]:
+            return                       # an older row applied late
+        was = u[1] or u[3]
+        u[i], u[i + 1] = pred_id, bool(high)
+        now = u[1] or u[3]
+        if now != was:
+            for code in self.user_branches.get(user_id, ()):
+                self.branches[code]["high"] += 1 if now else -1
+
+    def _apply_lifestyle(self, pred_id, user_id, age_category, exercise, bmi, risk, score):
+        stream = self.streams["lifestyle"]
+        if stream.seen(pred_id):
+            return
+        stream.add(pred_id)
+        high = risk == "High"
+        self._apply_risk(self.life_by_age, age_category, high, score)
+        if exercise is not None and bmi is not None:
+            _moments_add(self.bmi_by_exercise.setdefault(exercise, [0, 0.0, 0.0]), float(bmi))
+        self._set_user_risk(user_id, pred_id, high, "lifestyle")
+        self._dirty = True
+
+    def _apply_clinical(self, pred_id, user_id, age_years, risk, score, *measures):
+        """measures: the CLINICAL_MEASURES columns, in that order."""
+        stream = self.streams["clinical"]
+        if stream.seen(pred_id):
+            return
+        stream.add(pred_id)
+        high = risk == "High"
+        self._apply_risk(self.clin_by_band, age_band(age_years), high, score)
+        for sketch, value in zip(self.clin_sketches.values(), measures):
+            sketch.update(value)
+        self._set_user_risk(user_id, pred_id, high, "clinical")
+        self._dirty = True
+
+    def _apply_appointment(self, appointment_id, user_id, branch_code):
+        stream = self.streams["appointments"]
+        if stream.seen(appointment_id):
+            return
+        stream.add(appointment_id)
+        if user_id is None or branch_code is None:
+            return
+        codes = self.user_branches.setdefault(user_id, set())
+        if branch_code not in codes:
+            codes.add(branch_code)
+            b = self.branches.setdefault(branch_code, {"users": 0, "high": 0})
+            b["users"] += 1
+            u = self.users.get(user_id)
+            if u and (u[1] or u[3]):
+                b["high"] += 1
+        self._dirty = True
+
+    # -------------------------------------------------
+    # Inserts committed by this process
+    # -------------------------------------------------
+    def attach(self, session):
+        """Apply new prediction / appointment rows when session commits them."""
+        from sqlalchemy import event
+        from models import Appointment, ClinicalPrediction, LifestylePrediction
+
+        def capture(sess, flush_context):
+            pending = sess.info.setdefault("cohort_pending", [])
+            for obj in sess.new:
+                if isinstance(obj, LifestylePrediction):
+                    pending.append((self._apply_lifestyle, (
+                        obj.pred_id, obj.user_id, obj.age_category, obj.exercise, obj.bmi,
+                        obj.risk_prediction, obj.prediction_score)))
+                elif isinstance(obj, ClinicalPrediction):
+                    pending.append((self._apply_clinical, (
+                        obj.pred_id, obj.user_id, obj.age_years,
+                        obj.risk_prediction, obj.prediction_score,
+                        *(getattr(obj, attr) for attr in CLINICAL_MEASURES.values()))))
+                elif isinstance(obj, Appointment):
+                    code = self._branch_codes.get(obj.branch_id)
+                    if code is not None:     # unknown branch: left to the next scan
+                        pending.append((self._apply_appointment,
+                                        (obj.appointment_id, obj.user_id, code)))
+
+        def apply(sess):
+            pending = sess.info.pop("cohort_pending", None)
+            if pending:
+                with self._lock:
+                    for fn, args in pending:
+                        fn(*args)
+                    self._cached = None
+
+        def drop(sess, *args):
+            sess.info.pop("cohort_pending", None)
+
+        event.listen(session, "after_flush", capture)
+        event.listen(session, "after_commit", apply)
+        event.listen(session, "after_rollback", drop)
+        self._listeners = (capture, apply, drop)
+
+    # -------------------------------------------------
+    # Catch-up scans + checkpoint
+    # -------------------------------------------------
+    def refresh(self, force=False):
+        """Apply rows other processes inserted; checkpoint when due."""
+        if not force and time.monotonic() < self._next_refresh:
+            return
+        if not self._refresh_lock.acquire(blocking=not self._loaded):
+            return                              # someone else is refreshing; serve current
+        try:
+            with timed("cohort_refresh"):
+                if not self._loaded:
+                    self._load_checkpoint()
+                self._scan()
+                self._next_refresh = time.monotonic() + self.refresh_seconds
+                if self._dirty and time.monotonic() >= self._next_checkpoint:
+                    self.checkpoint()
+        finally:
+            self._refresh_lock.release()
+
+    def _load_checkpoint(self):
+        from models import CohortSummary, db
+        CohortSummary.__table__.create(bind=db.engine, checkfirst=True)
+        row = db.session.get(CohortSummary, SUMMARY_NAME)
+        if row is not None and row.state and row.state.get("version") != STATE_VERSION:
+            log.info("cohort stats: checkpoint format changed, rebuilding from the tables")
+        elif row is not None and row.state:
+            with self._lock:
+                self._set_state(row.state)
+            log.info("cohort stats: checkpoint from %s loaded", row.updated_at)
+        self._next_checkpoint = time.monotonic() + self.checkpoint_seconds
+        self._loaded = True
+
+    def _scan(self):
+        from models import Appointment, ClinicalPrediction, LabBranch, LifestylePrediction, db
+
+        self._branch_codes = dict(db.session.query(LabBranch.branch_id, LabBranch.branch_code).all())
+        L = LifestylePrediction
+        self._scan_table("lifestyle", L.pred_id, db.session.query(
+            L.pred_id, L.user_id, L.age_category, L.exercise, L.bmi,
+            L.risk_prediction, L.prediction_score), self._apply_lifestyle)
+        C = ClinicalPrediction
+        self._scan_table("clinical", C.pred_id, db.session.query(
+            C.pred_id, C.user_id, C.age_years, C.risk_prediction, C.prediction_score,
+            *(getattr(C, attr) for attr in CLINICAL_MEASURES.values())),
+            self._apply_clinical)
+        self._scan_table("appointments", Appointment.appointment_id, db.session.query(
+            Appointment.appointment_id, Appointment.user_id, LabBranch.branch_code)
+            .outerjoin(LabBranch, Appointment.branch_id == LabBranch.branch_id),
+            self._apply_appointment)
+        db.session.rollback()   # end the read transaction
+
+    def _scan_table(self, table, id_col, query, apply):
+        lo = max(0, self.streams[table].watermark - OVERLAP)
+        while True:
+            rows = query.filter(id_col > lo).order_by(id_col).limit(SCAN_BATCH).all()
+            if not rows:
+                return
+            with self._lock:
+                for row in rows:
+                    apply(*row)
+                self._cached = None
+            if len(rows) < SCAN_BATCH:
+                return
+            lo = rows[-1][0]
+
+    def checkpoint(self):
+        from models import CohortSummary, db
+        with self._lock:
+            state = self._state()
+            self._dirty = False
+        try:
+            with timed("db_commit", table="cohort_summaries"):
+                db.session.merge(CohortSummary(name=SUMMARY_NAME, state=state,
+                                               updated_at=datetime.utcnow()))
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._dirty = True
+            log.exception("cohort stats: checkpoint failed")
+        self._next_checkpoint = time.monotonic() + self.checkpoint_seconds
+
+    # -------------------------------------------------
+    # Dashboard payload
+    # -------------------------------------------------
+    def get(self) -> dict:
+        self.refresh()
+        cached = self._cached
+        if cached is not None:
+            return cached
+        with self._lock:
+            self._cached = out = self._render()
+        return out
+
+    def sketches(self) -> dict:
+        """Copies of the live clinical measurement sketches (label -> KLLSketch)."""
+        self.refresh()
+        with self._lock:
+            return {col: sk.copy() for col, sk in self.clin_sketches.items()}
+
+    def _render(self):
+        def risk_rows(groups, order, key_name):
+            rows = []
+            for key in order + sorted(k for k in groups if k not in order):
+                g = groups.get(key)
+                if not g:
+                    continue
+                score = _moments_out(g["score"])
+                rows.append({key_name: key, "n": g["n"], "high_risk": g["high"],
+                             "high_risk_share": round(g["high"] / g["n"], 4),
+                             "mean_score": score["mean"], "std_score": score["std"],
+                             "score_histogram": list(g["hist"])})
+            return rows
+
+        return {
+            "lifestyle": {
+                "total": sum(g["n"] for g in self.life_by_age.values()),
+                "risk_by_age_category": risk_rows(self.life_by_age, AGE_CATS, "age_category"),
+                "bmi_by_exercise": [{"exercise": k, **_moments_out(m)}
+                                    for k, m in sorted(self.bmi_by_exercise.items())],
+            },
+            "clinical": {
+                "total": sum(g["n"] for g in self.clin_by_band.values()),
+                "risk_by_age_band": risk_rows(self.clin_by_band, AGE_BANDS, "age_band"),
+                "measurements": {col: {"n": sk.n, "median": sk.median(),
+                                       "p25": sk.quantile(0.25), "p75": sk.quantile(0.75)}
+                                 for col, sk in self.clin_sketches.items()},
+            },
+            "branches": [{"branch_code": code, "users": b["users"], "high_risk_users": b["high"],
+                          "high_risk_share": round(b["high"] / b["users"], 4) if b["users"] else None}
+                         for code, b in sorted(self.branches.items())],
+            "as_of": {t: s.watermark for t, s in self.streams.items()},
+        }
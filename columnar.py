@@ -0,0 +1,215 @@
+# columnar.py
+"""
+Typed, columnar copies of the DS1 / DS2 CSVs and one loader for all of them.
+
+    python columnar.py convert <csv> [<csv> ...] [--format feather|parquet]
+
+writes <csv stem>.feather (Arrow IPC, uncompressed so it can be memory-mapped)
+or .parquet next to each CSV:
+- text columns and the integer-coded clinical fields (Chest Pain Type,
+  Resting ECG, ...) become categoricals
+- integers are downcast to the smallest int type; floats become float32 in
+  tables of FLOAT32_MIN_ROWS rows or more (the BRFSS export), where it halves
+  the memory. Small tables (Cleveland) keep float64, so their summary values
+  stay exact.
+
+    df = load_table(DATA_PATH, columns=["Sex", "BMI"])
+    for chunk in iter_chunks(DATA_PATH, columns, chunksize=200000): ...
+
+reads only those columns (the ones that exist) from the .feather
+(memory-mapped) or .parquet copy when it is at least as new as the CSV, and
+otherwise falls back to pd.read_csv(usecols=...) + the same dtype rules.
+Needs pyarrow for the columnar path; without it everything still works from
+the CSV.
+
+iter_chunks / chunk_specs + read_chunk split a dataset into row ranges of the
+columnar copy, or into newline-aligned byte ranges of the CSV (rows must not
+contain quoted newlines; the exports don't), so memory is bounded by the
+chunk and each spec can be read independently, e.g. in a process pool.
+"""
+import argparse
+import io
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from observability import get_logger
+
+log = get_logger("columnar")
+
+FORMATS = (".feather", ".parquet")
+
+# integer-coded fields that are categories, not quantities
+CODED_CATEGORICALS = {
+    "Sex", "Chest Pain Type", "Fasting Blood Sugar", "Resting ECG", "Exercise Angina",
+    "ST Slope", "Major Vessels (0–3)", "Thalassemia",
+}
+MAX_CATEGORIES = 1000
+FLOAT32_MIN_ROWS = 10000
+
+
+# -------------------------------------------------
+# Typing
+# -------------------------------------------------
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Categoricals for text / coded columns, downcast numerics."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if col in CODED_CATEGORICALS or (s.dtype.kind in "OUT" or str(s.dtype) == "str"):
+            if s.nunique(dropna=True) <= MAX_CATEGORIES:
+                s = s.astype("category")
+        elif s.dtype.kind in "iu":
+            s = pd.to_numeric(s, downcast="integer")
+        elif s.dtype.kind == "f" and len(df) >= FLOAT32_MIN_ROWS:
+            s = s.astype(np.float32)
+        out[col] = s
+    return pd.DataFrame(out)
+
+
+# -------------------------------------------------
+# Conversion
+# -------------------------------------------------
+def convert(csv_path, fmt="feather") -> Path:
+    csv_path = Path(csv_path)
+    out = csv_path.with_suffix("." + fmt)
+    df = optimize_dtypes(pd.read_csv(csv_path))
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    if fmt == "feather":
+        df.to_feather(tmp, compression="uncompressed")   # mmap needs uncompressed buffers
+    else:
+        df.to_parquet(tmp, index=False)
+    os.replace(tmp, out)
+    before = csv_path.stat().st_size / 2**20
+    print(f"✅ {out.name}: {len(df)} rows, {df.shape[1]} columns, "
+          f"{before:.1f} MB csv -> {out.stat().st_size / 2**20:.1f} MB, "
+          f"{df.memory_usage(deep=True).sum() / 2**20:.1f} MB in memory")
+    return out
+
+
+# -------------------------------------------------
+# Loading
+# -------------------------------------------------
+def columnar_path(csv_path):
+    """Up-to-date .feather / .parquet copy of csv_path, or None."""
+    csv_path = Path(csv_path)
+    try:
+        csv_mtime = csv_path.stat().st_mtime
+    except OSError:
+        csv_mtime = None
+    for suffix in FORMATS:
+        p = csv_path.with_suffix(suffix)
+        if p.exists() and (csv_mtime is None or p.stat().st_mtime >= csv_mtime):
+            return p
+    return None
+
+
+def load_table(csv_path, columns=None) -> pd.DataFrame:
+    """
+    The dataset behind csv_path, typed, restricted to columns (all if None).
+    Prefers the columnar copy written by convert().
+    """
+    path = columnar_path(csv_path)
+    if path is not None:
+        try:
+            return _read_columnar(path, columns)
+        except ImportError:
+            log.warning("pyarrow not installed, reading %s instead of %s", csv_path, path.name)
+    wanted = None if columns is None else set(columns).__contains__
+    return optimize_dtypes(pd.read_csv(csv_path, usecols=wanted))
+
+
+def _read_columnar(path, columns):
+    if path.suffix == ".feather":
+        import pyarrow as pa
+        from pyarrow import feather
+        if columns is not None:
+            with pa.memory_map(str(path)) as source:
+                names = pa.ipc.open_file(source).schema.names
+            columns = [c for c in columns if c in names]
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        import pyarrow.parquet as pq
+        if columns is not None:
+            names = pq.read_schema(path).names
+            columns = [c for c in columns if c in names]
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+# -------------------------------------------------
+# Chunked reading
+# -------------------------------------------------
+def chunk_specs(csv_path, chunksize=200000) -> list:
+    """Picklable descriptions of ~chunksize-row pieces of the dataset."""
+    path = columnar_path(csv_path)
+    if path is not None and path.suffix == ".feather":
+        try:
+            import pyarrow as pa
+            with pa.memory_map(str(path)) as source:
+                n = pa.ipc.open_file(source).read_all().num_rows
+            return [("feather", str(path), start, min(chunksize, n - start))
+                    for start in range(0, n, chunksize)]
+        except ImportError:
+            pass
+
+    csv_path = str(csv_path)
+    with open(csv_path, "rb") as fh:
+        header = fh.readline()
+        body_start = fh.tell()
+        sample = b"".join(fh.readline() for _ in range(1000))
+        size = os.fstat(fh.fileno()).st_size
+        row_bytes = max(1, len(sample) // max(1, sample.count(b"\n")))
+        step = max(1 << 16, chunksize * row_bytes)
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+        specs, start = [], body_start
+        while start < size:
+            fh.seek(min(size, start + step))
+            fh.readline()                       # move to the end of the current row
+            end = min(size, fh.tell())
+            specs.append(("csv", csv_path, start, end, names))
+            start = end
+    return specs
+
+
+def read_chunk(spec, columns=None) -> pd.DataFrame:
+    kind = spec[0]
+    if kind == "feather":
+        from pyarrow import feather
+        _, path, start, length = spec
+        table = feather.read_table(path, memory_map=True)
+        if columns is not None:
+            table = table.select([c for c in columns if c in table.column_names])
+        return table.slice(start, length).to_pandas()
+    _, path, start, end, names = spec
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        data = fh.read(end - start)
+    wanted = None if columns is None else set(columns).__contains__
+    return pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=wanted)
+
+
+def iter_chunks(csv_path, columns=None, chunksize=200000):
+    for spec in chunk_specs(csv_path, chunksize):
+        yield read_chunk(spec, columns)
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Typed columnar copies of the dataset CSVs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("convert", help="write <csv>.feather / .parquet next to each CSV")
+    c.add_argument("csv", nargs="+")
+    c.add_argument("--format", choices=["feather", "parquet"], default="feather")
+    args = parser.parse_args()
+    for path in args.csv:
+        convert(path, args.format)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
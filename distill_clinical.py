@@ -0,0 +1,228 @@
+# distill_clinical.py
+"""
+Fast approximate Stage 2 model, distilled from the calibrated SVM.
+
+    python distill_clinical.py            # train, write DS2/Models/stage1_svm_fast_<ts>.joblib
+                                          # (+ .onnx) and reports/clinical_fast.md
+    python distill_clinical.py --no-save --served stage1_svm_fast_<ts>.joblib
+                                          # report only, naming the artifact already served
+    CLINICAL_MODEL=fast python flask_app.py   # serve it (see DS2/clinical_predict.py)
+
+The served model is CalibratedClassifierCV(SVC(kernel="linear"), isotonic,
+cv=5): five SVC decision functions and five isotonic lookups per call. The
+surrogates learn the SVM's own probabilities (soft labels) on the Cleveland
+rows plus jittered copies of them, reusing the fitted preprocessor so the
+pandas-free FeatureEncoder path still applies:
+- logistic: LogisticRegression on the soft labels (one dot product)
+- hgb:      HistGradientBoostingClassifier on the soft labels
+The fastest candidate whose held-out agreement with the SVM reaches
+--min-agreement (default 0.97) is saved; if none does, the most faithful one.
+
+Agreement / AUC are measured with 5-fold CV over the Cleveland rows: each
+surrogate is trained on the folds it does not score. The SVM itself was fit
+on (part of) these rows, so its AUC here is optimistic; the AUC delta is the
+number to watch.
+"""
+import argparse
+import os
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from model_costs import measure, pareto
+
+ROOT = Path(__file__).resolve().parent
+MODELS_DIR = ROOT / "DS2" / "Models"
+TEACHER_PATH = MODELS_DIR / "stage1_svm_latest.joblib"
+CLEVELAND_CSV = ROOT / "DS2" / "heart_cleveland_upload.csv"
+REPORT_PATH = ROOT / "reports" / "clinical_fast.md"
+FAST_PREFIX = "stage1_svm_fast"
+TGT = "Heart Disease Class (0,1)"
+
+CANDIDATES = {
+    "logistic": LogisticRegression(C=10.0, max_iter=2000),
+    "hgb": HistGradientBoostingClassifier(max_iter=200, learning_rate=0.05,
+                                          max_leaf_nodes=15, random_state=42),
+}
+
+
+# -------------------------------------------------
+# Data
+# -------------------------------------------------
+def load_rows():
+    df = pd.read_csv(CLEVELAND_CSV)
+    df["Fasting Blood Sugar Missing"] = 0
+    df["Exercise Angina Missing"] = 0
+    y = df.pop(TGT).to_numpy()
+    return df, y
+
+
+def augment(df, num_cols, n_copies=20, seed=42):
+    """Jittered copies of df: numeric columns + N(0, 0.1·std), 20% of the
+    categorical cells redrawn from the column's empirical distribution."""
+    rng = np.random.default_rng(seed)
+    out = pd.concat([df] * n_copies, ignore_index=True)
+    for col in out.columns:
+        if col in num_cols:
+            std = df[col].std() or 1.0
+            noisy = out[col] + rng.normal(0.0, 0.1 * std, len(out))
+            out[col] = noisy.round(1) if df[col].dtype.kind == "f" else noisy.round().astype(int)
+        else:
+            redraw = rng.random(len(out)) < 0.2
+            out.loc[redraw, col] = rng.choice(df[col].to_numpy(), redraw.sum())
+    return pd.concat([df, out], ignore_index=True)
+
+
+def num_columns(pipe):
+    for name, _, cols in pipe.steps[0][1].transformers_:
+        if name == "num":
+            return list(cols)
+    return []
+
+
+# -------------------------------------------------
+# Distillation
+# -------------------------------------------------
+def fit_surrogate(template, teacher, df):
+    """Fit a surrogate on teacher probabilities (soft labels via sample weights)."""
+    pre = teacher.steps[0][1]
+    X = pre.transform(df)
+    p = teacher.predict_proba(df)[:, 1]
+    # cross-entropy against soft targets == weighted copies labelled 1 (w=p) and 0 (w=1-p)
+    X2 = np.vstack([X, X])
+    y2 = np.r_[np.ones(len(X)), np.zeros(len(X))]
+    w2 = np.r_[p, 1.0 - p]
+    clf = clone(template).fit(X2, y2, sample_weight=w2)
+    return Pipeline([("pre", pre), ("clf", clf)])
+
+
+def cross_validate(name, teacher, df, y, num_cols, folds=5):
+    p_teacher = teacher.predict_proba(df)[:, 1]
+    p_fast = np.empty(len(df))
+    for train, test in StratifiedKFold(folds, shuffle=True, random_state=42).split(df, y):
+        train_df = augment(df.iloc[train].reset_index(drop=True), num_cols)
+        model = fit_surrogate(CANDIDATES[name], teacher, train_df)
+        p_fast[test] = model.predict_proba(df.iloc[test])[:, 1]
+    return p_teacher, p_fast
+
+
+# -------------------------------------------------
+# Main
+# -------------------------------------------------
+def pick(results, min_agreement):
+    ok = [k for k, r in results.items() if r["agreement"] >= min_agreement]
+    if ok:
+        return min(ok, key=lambda k: results[k]["single_ms"])
+    return max(results, key=lambda k: results[k]["agreement"])
+
+
+def main(save=True, min_agreement=0.97, served=None):
+    if served is not None and not (MODELS_DIR / served).exists():
+        raise FileNotFoundError(MODELS_DIR / served)
+    teacher = joblib.load(TEACHER_PATH)
+    df, y = load_rows()
+    num_cols = num_columns(teacher)
+    rows = df.to_dict("records")
+
+    teacher_cost = measure(teacher, rows)
+    results = {}
+    for name in CANDIDATES:
+        p_teacher, p_fast = cross_validate(name, teacher, df, y, num_cols)
+        final = fit_surrogate(CANDIDATES[name], teacher, augment(df, num_cols))
+        cost = measure(final, rows)
+        results[name] = {
+            "model": final,
+            "agreement": float(np.mean((p_teacher >= 0.5) == (p_fast >= 0.5))),
+            "auc_teacher": roc_auc_score(y, p_teacher),
+            "auc_fast": roc_auc_score(y, p_fast),
+            "max_diff": float(np.abs(p_teacher - p_fast).max()),
+            "mean_diff": float(np.abs(p_teacher - p_fast).mean()),
+            "single_ms": cost["single_ms"],
+            "batch_ms": cost["batch_ms"],
+            "kb": cost["estimator_kb"],
+            "load_ms": cost["load_ms"],
+        }
+
+    best = pick(results, min_agreement)
+    out = None
+    if save:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = MODELS_DIR / f"{FAST_PREFIX}_{stamp}.joblib"
+        tmp = out.with_suffix(".joblib.tmp")
+        joblib.dump(results[best]["model"], tmp)
+        os.replace(tmp, out)
+        print(f"✅ {best}: {out.relative_to(ROOT)}")
+        try:  # same version for MODEL_BACKEND=onnx; the .joblib is already safe
+            from export_onnx import write_onnx
+            write_onnx(results[best]["model"], out.with_suffix(".onnx"))
+            print(f"✅ {best}: {out.with_suffix('.onnx').relative_to(ROOT)}")
+        except Exception as e:
+            print(f"⚠️ ONNX export skipped ({type(e).__name__}: {e})")
+
+    report = build_report(results, best, out, teacher_cost, len(rows), min_agreement,
+                          served=None if save else served)
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(report, encoding="utf-8")
+    print(report)
+
+
+def build_report(results, best, out, teacher_cost, n_rows, min_agreement, served=None):
+    t_single = teacher_cost["single_ms"]
+    auc_teacher = next(iter(results.values()))["auc_teacher"]
+    front = pareto({"svm": {"auc": auc_teacher, **teacher_cost},
+                    **{k: {"auc": r["auc_fast"], **r} for k, r in results.items()}},
+                   "auc", ("single_ms",))
+    lines = [
+        "# Fast clinical scorer vs calibrated SVM",
+        "",
+        f"Generated by `python distill_clinical.py"
+        f"{f' --no-save --served {served}' if served else ''}`. Served with `CLINICAL_MODEL=fast`.",
+        "",
+        f"Teacher: {TEACHER_PATH.name} (CalibratedClassifierCV of 5 linear SVCs, isotonic). "
+        f"Agreement and AUC from 5-fold CV over the {n_rows} Cleveland rows; "
+        "latency is one predict_proba call per row through the FeatureEncoder path "
+        "(single) and all rows in one call (batch); load is joblib.load of the whole pipeline. "
+        "★ = on the AUC / single-row latency Pareto front.",
+        "",
+        "| model | agreement @0.5 | AUC | AUC delta | max abs diff | mean abs diff "
+        "| ms/row (single) | ms/row (batch) | speed-up (single) | estimator KB | load ms | Pareto |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    lines.append(f"| svm (current) | 1.0000 | {auc_teacher:.4f} | | | "
+                 f"| {t_single:.3f} | {teacher_cost['batch_ms']:.4f} | 1.0x "
+                 f"| {teacher_cost['estimator_kb']:.0f} | {teacher_cost['load_ms']:.1f} "
+                 f"| {'★' if 'svm' in front else ''} |")
+    for name, r in results.items():
+        mark = " (selected)" if name == best else ""
+        lines.append(
+            f"| {name}{mark} | {r['agreement']:.4f} | {r['auc_fast']:.4f} "
+            f"| {r['auc_fast'] - r['auc_teacher']:+.4f} | {r['max_diff']:.3f} | {r['mean_diff']:.4f} "
+            f"| {r['single_ms']:.3f} | {r['batch_ms']:.4f} | {t_single / r['single_ms']:.1f}x "
+            f"| {r['kb']:.0f} | {r['load_ms']:.1f} | {'★' if name in front else ''} |")
+    lines += ["", f"Selection: fastest candidate with agreement >= {min_agreement:.2f} "
+              f"→ **{best}**."]
+    if out:
+        lines += [f"Saved: `DS2/Models/{out.name}`"]
+    elif served:
+        lines += [f"Served: `DS2/Models/{served}` (from an earlier run; not rewritten by this one)"]
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil the Stage 2 SVM into a fast surrogate")
+    parser.add_argument("--no-save", action="store_true", help="only write the report")
+    parser.add_argument("--min-agreement", type=float, default=0.97,
+                        help="lowest acceptable label agreement with the SVM")
+    parser.add_argument("--served", metavar="NAME",
+                        help="with --no-save: the DS2/Models artifact being served, named in the report")
+    args = parser.parse_args()
+    main(save=not args.no_save, min_agreement=args.min_agreement, served=args.served)
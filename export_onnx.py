@@ -0,0 +1,386 @@
+# export_onnx.py
+"""
+Export the fitted risk pipelines (preprocessing included) to ONNX.
+
+    python export_onnx.py                       # write *_latest.onnx next to the joblib files
+    python export_onnx.py --report --cardio-csv <BRFSS csv>
+                                                # + parity / latency report (reports/onnx_backend.md)
+    python export_onnx.py --report --synthetic-cardio 20000
+                                                # same, DS1 rows drawn from the fitted preprocessor
+
+Each ONNX model has one input per original column (string / int64 / double),
+so the worker only needs onnxruntime + numpy to score a life_dict / clin_dict
+(see onnx_backend.py). The column names and input kinds are stored in the
+model metadata.
+
+Notes
+- skl2onnx cannot convert a SimpleImputer on string columns with
+  missing_values=nan, so categorical imputers are exported with
+  missing_values="" (onnx_backend feeds "" for missing strings).
+- skl2onnx approximates isotonic calibration with a nearest-threshold lookup,
+  which is far off for the Stage 2 CalibratedClassifierCV. We register our
+  own converter that computes the linear decision function in double
+  precision and reproduces np.interp exactly.
+- Numeric columns are fed as double so imputation/scaling match sklearn
+  exactly; tree ensembles then get a float cast, like XGBoost itself.
+"""
+import argparse
+import copy
+import json
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+MODELS = {
+    "lifestyle": ROOT / "DS1" / "Models" / "stage1_xgb_latest.joblib",
+    "clinical": ROOT / "DS2" / "Models" / "stage1_svm_latest.joblib",
+}
+CLEVELAND_CSV = ROOT / "DS2" / "heart_cleveland_upload.csv"
+REPORT_PATH = ROOT / "reports" / "onnx_backend.md"
+SYNTHETIC_LABEL = "BRFSS-schema sample (synthetic; the BRFSS export is not in the repo)"
+TARGET_OPSET = {"": 17, "ai.onnx.ml": 3}
+
+
+# -------------------------------------------------
+# Converters
+# -------------------------------------------------
+def _register_converters():
+    from skl2onnx import update_registered_converter
+    from skl2onnx.common.shape_calculator import calculate_linear_classifier_output_shapes
+    from skl2onnx.shape_calculators.imputer import calculate_sklearn_imputer_output_shapes
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.impute import SimpleImputer
+    from xgboost import XGBClassifier
+    from onnxmltools.convert.xgboost.operator_converters.XGBoost import convert_xgboost
+
+    update_registered_converter(
+        XGBClassifier, "XGBoostXGBClassifier",
+        calculate_linear_classifier_output_shapes, convert_xgboost,
+        options={"nocl": [True, False], "zipmap": [True, False, "columns"]},
+    )
+    update_registered_converter(
+        SimpleImputer, "SklearnSimpleImputer",
+        calculate_sklearn_imputer_output_shapes, _convert_imputer,
+        overwrite=True,
+    )
+    update_registered_converter(
+        CalibratedClassifierCV, "SklearnCalibratedClassifierCV",
+        calculate_linear_classifier_output_shapes, _convert_calibrated_linear,
+        options={"zipmap": [True, False, "columns"], "nocl": [True, False]},
+        overwrite=True,
+    )
+
+
+def _convert_imputer(scope, operator, container):
+    """
+    The ai.onnx.ml Imputer has no double kernel in onnxruntime; for double
+    inputs emit Where(IsNaN(X), statistics_, X) instead.
+    """
+    from onnx import TensorProto
+    from skl2onnx.common.data_types import DoubleTensorType
+    from skl2onnx.operator_converters.common import concatenate_variables
+    from skl2onnx.operator_converters.imputer_op import convert_sklearn_imputer
+
+    if not isinstance(operator.inputs[0].type, DoubleTensorType):
+        return convert_sklearn_imputer(scope, operator, container)
+
+    stats = np.asarray(operator.raw_operator.statistics_, dtype=np.float64)
+    X = concatenate_variables(scope, operator.inputs, container)
+    stats_name = scope.get_unique_variable_name("statistics")
+    container.add_initializer(stats_name, TensorProto.DOUBLE, [1, len(stats)], stats.tolist())
+    mask = scope.get_unique_variable_name("isnan")
+    container.add_node("IsNaN", [X], mask, name=scope.get_unique_operator_name("IsNaN"))
+    container.add_node("Where", [mask, stats_name, X], operator.outputs[0].full_name,
+                       name=scope.get_unique_operator_name("Where"))
+
+
+def _convert_calibrated_linear(scope, operator, container):
+    """
+    Binary CalibratedClassifierCV over linear estimators (coef_ / intercept_),
+    e.g. SVC(kernel="linear"). For each fold k:
+        f_k = X @ w_k + b_k          (double precision)
+        p_k = interp(clip(f_k), X_thresholds_, y_thresholds_)   # isotonic
+           or expit(-(a * f_k + b))                             # sigmoid
+    proba[:, 1] = mean_k p_k, proba[:, 0] = 1 - proba[:, 1]
+    """
+    from onnx import TensorProto
+    from skl2onnx.common.data_types import guess_proto_type
+
+    model = operator.raw_operator
+    if len(model.classes_) != 2:
+        raise NotImplementedError("Only binary CalibratedClassifierCV is supported")
+
+    def name(prefix):
+        return scope.get_unique_variable_name(prefix)
+
+    def const(prefix, values, dtype=TensorProto.DOUBLE):
+        values = np.asarray(values)
+        n = name(prefix)
+        container.add_initializer(n, dtype, list(values.shape), values.ravel().tolist())
+        return n
+
+    def node(op, inputs, **attrs):
+        out = name(op.lower())
+        container.add_node(op, inputs, out, name=scope.get_unique_operator_name(op), **attrs)
+        return out
+
+    X = node("Cast", [operator.inputs[0].full_name], to=TensorProto.DOUBLE)
+    fold_probs = []
+    for cc in model.calibrated_classifiers_:
+        est = cc.estimator
+        if not hasattr(est, "coef_"):
+            raise NotImplementedError(f"{type(est).__name__} has no linear coef_")
+        coef = np.asarray(est.coef_, dtype=np.float64).reshape(1, -1).T
+        f = node("Add", [node("MatMul", [X, const("coef", coef)]),
+                         const("intercept", np.asarray(est.intercept_, dtype=np.float64))])
+        cal = cc.calibrators[0]
+        if model.method == "isotonic":
+            p = _isotonic_nodes(f, cal, const, node)
+        else:
+            z = node("Add", [node("Mul", [f, const("a", [cal.a_])]), const("b", [cal.b_])])
+            p = node("Sigmoid", [node("Neg", [z])])
+        fold_probs.append(p)
+
+    p1 = node("Div", [node("Sum", fold_probs), const("n", [float(len(fold_probs))])])
+    p0 = node("Sub", [const("one", [1.0]), p1])
+    proba = node("Concat", [p0, p1], axis=1)
+    container.add_node("Cast", [proba], operator.outputs[1].full_name,
+                       name=scope.get_unique_operator_name("Cast"),
+                       to=guess_proto_type(operator.outputs[1].type))
+    idx = node("ArgMax", [proba], axis=1, keepdims=0)
+    classes = const("classes", np.asarray(model.classes_, dtype=np.int64), TensorProto.INT64)
+    container.add_node("Gather", [classes, idx], operator.outputs[0].full_name,
+                       name=scope.get_unique_operator_name("Gather"), axis=0)
+
+
+def _isotonic_nodes(f, cal, const, node):
+    """np.interp(clip(f, X_min_, X_max_), X_thresholds_, y_thresholds_) on an (N, 1) tensor."""
+    from onnx import TensorProto
+
+    xs = np.asarray(cal.X_thresholds_, dtype=np.float64)
+    ys = np.asarray(cal.y_thresholds_, dtype=np.float64)
+    if len(xs) == 1:
+        return node("Add", [node("Mul", [f, const("zero", [0.0])]), const("y", ys)])
+    f = node("Clip", [f, const("lo", np.float64(xs[0])), const("hi", np.float64(xs[-1]))])
+    xs_c, ys_c = const("xs", xs), const("ys", ys)
+    # hi = number of thresholds strictly below f, kept in [1, M-1]; lo = hi - 1
+    below = node("Cast", [node("Less", [xs_c, f])], to=TensorProto.INT64)
+    hi = node("ReduceSum", [below, const("axis", np.array([1], dtype=np.int64), TensorProto.INT64)],
+              keepdims=1)
+    hi = node("Clip", [hi, const("one_i", np.int64(1), TensorProto.INT64),
+                       const("last_i", np.int64(len(xs) - 1), TensorProto.INT64)])
+    lo = node("Sub", [hi, const("one_i", np.int64(1), TensorProto.INT64)])
+    x0, x1 = node("Gather", [xs_c, lo], axis=0), node("Gather", [xs_c, hi], axis=0)
+    y0, y1 = node("Gather", [ys_c, lo], axis=0), node("Gather", [ys_c, hi], axis=0)
+    slope = node("Div", [node("Sub", [y1, y0]), node("Sub", [x1, x0])])
+    return node("Add", [node("Mul", [slope, node("Sub", [f, x0])]), y0])
+
+
+# -------------------------------------------------
+# Export
+# -------------------------------------------------
+def input_spec(column_transformer):
+    """[(column, kind)] in ColumnTransformer order; kind is 'str', 'int' or 'float'."""
+    from sklearn.preprocessing import OneHotEncoder
+
+    spec = []
+    for _, trans, cols in column_transformer.transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        steps = [s for _, s in trans.steps] if hasattr(trans, "steps") else [trans]
+        ohe = next((s for s in steps if isinstance(s, OneHotEncoder)), None)
+        for j, col in enumerate(cols):
+            if ohe is None:
+                spec.append((col, "float"))
+            elif ohe.categories_[j].dtype.kind in "OUS":
+                spec.append((col, "str"))
+            else:
+                spec.append((col, "int"))
+    return spec
+
+
+def to_onnx(pipe):
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import DoubleTensorType, Int64TensorType, StringTensorType
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+
+    _register_converters()
+    pipe = copy.deepcopy(pipe)
+    ct = pipe.steps[0][1]
+    spec = input_spec(ct)
+    kinds = dict(spec)
+
+    sk_pipe = Pipeline(pipe.steps)  # imblearn Pipeline -> sklearn Pipeline
+    options = {id(sk_pipe.steps[-1][1]): {"zipmap": False}}
+    for _, trans, cols in ct.transformers_:
+        if not hasattr(trans, "steps"):
+            continue
+        for _, step in trans.steps:
+            if isinstance(step, SimpleImputer) and len(cols) and kinds.get(cols[0]) == "str":
+                step.missing_values = ""
+
+    tensor = {"str": StringTensorType, "int": Int64TensorType, "float": DoubleTensorType}
+    initial_types = [(col, tensor[kind]([None, 1])) for col, kind in spec]
+    onx = convert_sklearn(sk_pipe, initial_types=initial_types,
+                          target_opset=TARGET_OPSET, options=options)
+    _cast_tree_inputs_to_float(onx)
+    meta = onx.metadata_props.add()
+    meta.key, meta.value = "columns", json.dumps(spec)
+    return onx
+
+
+def _cast_tree_inputs_to_float(onx):
+    """
+    XGBoost compares float32(x) against float32 thresholds. With double
+    inputs onnxruntime compares in double, which sends rows near a split
+    down the other branch, so feed tree ensembles float like xgboost does.
+    """
+    from onnx import TensorProto, helper
+
+    graph = onx.graph
+    for n in list(graph.node):
+        if not n.op_type.startswith("TreeEnsemble"):
+            continue
+        cast_out = n.input[0] + "_float"
+        graph.node.insert(list(graph.node).index(n),
+                          helper.make_node("Cast", [n.input[0]], [cast_out],
+                                           name=n.name + "_CastFloat", to=TensorProto.FLOAT))
+        n.input[0] = cast_out
+
+
+def write_onnx(pipe, out):
+    """Convert and write to out via a temp file, so the registry never sees a partial .onnx."""
+    out = Path(out)
+    data = to_onnx(pipe).SerializeToString()
+    tmp = out.with_suffix(".onnx.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, out)
+    return out
+
+
+def export_all(models=MODELS):
+    paths = {}
+    for key, path in models.items():
+        out = write_onnx(joblib.load(path), path.with_suffix(".onnx"))
+        paths[key] = out
+        print(f"✅ {key}: {out.relative_to(ROOT)} ({out.stat().st_size / 1024:.0f} KB)")
+    return paths
+
+
+# -------------------------------------------------
+# Parity / latency report
+# -------------------------------------------------
+def synthetic_rows(pipe, n, seed=0):
+    """
+    n BRFSS-schema input dicts for a fitted pipeline, without the export:
+    categories drawn uniformly from the OneHotEncoder, numbers from the
+    StandardScaler's mean / scale (clipped at 0).
+    """
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for _, trans, cols in pipe.steps[0][1].transformers_:
+        if trans == "drop" or len(cols) == 0:
+            continue
+        steps = [s for _, s in trans.steps] if hasattr(trans, "steps") else [trans]
+        ohe = next((s for s in steps if isinstance(s, OneHotEncoder)), None)
+        scaler = next((s for s in steps if isinstance(s, StandardScaler)), None)
+        for j, col in enumerate(cols):
+            if ohe is not None:
+                cats = ohe.categories_[j]
+                columns[col] = cats[rng.integers(len(cats), size=n)].tolist()
+            else:
+                mean, scale = (scaler.mean_[j], scaler.scale_[j]) if scaler is not None else (0.0, 1.0)
+                columns[col] = np.round(np.clip(rng.normal(mean, scale, n), 0, None), 2).tolist()
+    return [dict(zip(columns, vals)) for vals in zip(*columns.values())]
+
+
+def _rows_for(key, cardio_csv=None, limit=20000, synthetic=0):
+    import pandas as pd
+
+    if key == "clinical":
+        df = pd.read_csv(CLEVELAND_CSV)
+        df["Fasting Blood Sugar Missing"] = 0
+        df["Exercise Angina Missing"] = 0
+        return "DS2 heart_cleveland_upload.csv", df.to_dict("records")
+    if synthetic:
+        return f"DS1 {SYNTHETIC_LABEL}", synthetic_rows(joblib.load(MODELS[key]), synthetic)
+    if cardio_csv is None:
+        return None, None
+    df = pd.read_csv(cardio_csv, nrows=limit)
+    return f"DS1 {Path(cardio_csv).name}", df.to_dict("records")
+
+
+def _time_per_row(fn, rows, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for r in rows:
+            fn([r])
+    return (time.perf_counter() - t0) / (repeat * len(rows)) * 1000.0
+
+
+def build_report(cardio_csv=None, single_rows=200, repeat=3, synthetic=0):
+    import pandas as pd
+    from onnx_backend import OnnxModel
+
+    command = "python export_onnx.py --report"
+    if synthetic:
+        command += f" --synthetic-cardio {synthetic}"
+    elif cardio_csv:
+        command += f" --cardio-csv {Path(cardio_csv).name}"
+    lines = ["# ONNX Runtime vs sklearn/xgboost backend", "",
+             f"Generated by `{command}`.", "",
+             "| model | dataset | rows | max abs diff | mean abs diff | label agreement @0.5 "
+             "| sklearn ms/row (single) | onnx ms/row (single) | sklearn ms/row (batch) "
+             "| onnx ms/row (batch) |",
+             "|---|---|---|---|---|---|---|---|---|---|"]
+    for key, path in MODELS.items():
+        label, rows = _rows_for(key, cardio_csv, synthetic=synthetic)
+        if rows is None:
+            lines.append(f"| {key} | (no dataset given, pass --cardio-csv or --synthetic-cardio) "
+                         "| | | | | | | | |")
+            continue
+        pipe = joblib.load(path)
+        onnx_model = OnnxModel(path.with_suffix(".onnx"))
+
+        def sk(batch):
+            return pipe.predict_proba(pd.DataFrame(batch))[:, 1]
+
+        ref, got = sk(rows), onnx_model.predict_proba(rows)
+        diff = np.abs(ref - got)
+        agree = float(np.mean((ref >= 0.5) == (got >= 0.5)))
+
+        sample = rows[:single_rows]
+        sk_single = _time_per_row(sk, sample, repeat)
+        ox_single = _time_per_row(onnx_model.predict_proba, sample, repeat)
+        t0 = time.perf_counter(); sk(rows); sk_batch = (time.perf_counter() - t0) / len(rows) * 1000
+        t0 = time.perf_counter(); onnx_model.predict_proba(rows); ox_batch = (time.perf_counter() - t0) / len(rows) * 1000
+
+        lines.append(f"| {key} | {label} | {len(rows)} | {diff.max():.2e} | {diff.mean():.2e} "
+                     f"| {agree:.4f} | {sk_single:.3f} | {ox_single:.3f} | {sk_batch:.4f} | {ox_batch:.4f} |")
+
+    lines += ["", "Single = one predict_proba call per row (the Flask path); "
+              "batch = all rows in one call. onnxruntime runs with ONNX_THREADS=1.", ""]
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text("\n".join(lines), encoding="utf-8")
+    print("\n".join(lines))
+    return REPORT_PATH
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export risk models to ONNX")
+    parser.add_argument("--report", action="store_true", help="write the parity/latency report")
+    parser.add_argument("--cardio-csv", help="BRFSS export used for the DS1 report")
+    parser.add_argument("--synthetic-cardio", type=int, default=0, metavar="N",
+                        help="without the export: report DS1 on N synthetic BRFSS-schema rows")
+    args = parser.parse_args()
+
+    export_all()
+    if args.report:
+        build_report(args.cardio_csv, synthetic=args.synthetic_cardio)
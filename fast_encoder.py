@@ -0,0 +1,230 @@
+# fast_encoder.py
+"""
+Pandas-free feature encoding for the inference hot path.
+
+predict_lifestyle / predict_clinical used to wrap every dict in
+pd.DataFrame([input_dict]) so the fitted ColumnTransformer could run.
+FeatureEncoder reads the fitted parameters out of that ColumnTransformer once
+(imputer statistics, one-hot categories, scaler mean/scale) and maps a
+life_dict / clin_dict straight into a NumPy row with the same layout.
+
+The arithmetic mirrors sklearn (impute -> (x - mean) / scale, one-hot with
+handle_unknown="ignore"), so the encoded matrix is identical to
+pipe[:-1].transform(df) and the probabilities match bit-for-bit.
+check_parity() verifies that against the real pipeline; PARITY_TOL is the
+tolerance it accepts (0.0 = exact). tests/test_fast_encoder.py asserts it for
+both shipped models on rows built from the fitted encoder (no dataset needed).
+"""
+import threading
+
+import numpy as np
+
+PARITY_TOL = 0.0
+
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and v != v)
+
+
+class _NumCol:
+    """Numeric column: optional imputation + optional standard scaling."""
+
+    def __init__(self, name, pos, fill=None, mean=None, scale=None):
+        self.name, self.pos = name, pos
+        self.fill, self.mean, self.scale = fill, mean, scale
+
+    def write(self, value, row):
+        if _is_missing(value):
+            if self.fill is None:
+                value = np.nan
+            else:
+                value = self.fill
+        value = float(value)
+        if self.mean is not None:
+            value -= self.mean
+        if self.scale is not None:
+            value /= self.scale
+        row[self.pos] = value
+
+
+class _OneHotCol:
+    """Categorical column: optional imputation + one-hot encoding."""
+
+    def __init__(self, name, pos, categories, fill=None, ignore_unknown=True):
+        self.name, self.pos = name, pos
+        self.width = len(categories)
+        self.index = {c: i for i, c in enumerate(categories)}
+        self.fill = fill
+        self.ignore_unknown = ignore_unknown
+
+    def write(self, value, row):
+        if _is_missing(value) and self.fill is not None:
+            value = self.fill
+        row[self.pos:self.pos + self.width] = 0.0
+        i = self.index.get(value)
+        if i is not None:
+            row[self.pos + i] = 1.0
+        elif not self.ignore_unknown:
+            raise ValueError(f"Found unknown category {value!r} in column {self.name!r}")
+
+
+class FeatureEncoder:
+    """
+    Compiled replacement for a fitted ColumnTransformer.
+    Only the step types used by the project models are supported
+    (SimpleImputer, OneHotEncoder, StandardScaler, passthrough);
+    anything else raises ValueError so callers can fall back to pandas.
+    """
+
+    def __init__(self, column_transformer):
+        self.columns = []
+        pos = 0
+        for name, trans, cols in column_transformer.transformers_:
+            if trans == "drop" or len(cols) == 0:
+                continue
+            steps = _steps_of(trans)
+            for j, col in enumerate(_column_names(column_transformer, cols)):
+                spec = _compile_column(col, j, pos, steps)
+                self.columns.append(spec)
+                pos += getattr(spec, "width", 1)
+        self.n_features = pos
+        self._local = threading.local()
+
+    @classmethod
+    def from_pipeline(cls, pipe):
+        """Build from a fitted [ColumnTransformer, estimator] Pipeline."""
+        if len(pipe.steps) != 2:
+            raise ValueError("Expected a two-step (preprocessor, estimator) pipeline")
+        return cls(pipe.steps[0][1])
+
+    def encode(self, row_dict: dict, out=None):
+        """
+        Encode one dict to a (1, n_features) array.
+        Without `out`, a per-thread preallocated row is reused, so the result
+        must be consumed (e.g. passed to predict_proba) before the next call.
+        """
+        if out is None:
+            out = getattr(self._local, "row", None)
+            if out is None:
+                out = self._local.row = np.empty((1, self.n_features))
+        row = out[0]
+        for spec in self.columns:
+            spec.write(row_dict.get(spec.name), row)
+        return out
+
+    def encode_many(self, rows: list, out=None):
+        """Encode a list of dicts to an (n, n_features) array (into `out` if given)."""
+        X = np.empty((len(rows), self.n_features)) if out is None else out
+        for i, row_dict in enumerate(rows):
+            self.encode(row_dict, out=X[i:i + 1])
+        return X
+
+
+def final_estimator(pipe):
+    return pipe.steps[-1][1]
+
+
+def check_parity(pipe, rows: list, tol: float = PARITY_TOL):
+    """
+    Score `rows` through the original pipeline (DataFrame path) and through
+    FeatureEncoder + final estimator. Returns the max absolute difference in
+    probabilities and raises AssertionError if it exceeds `tol`.
+    """
+    import pandas as pd
+
+    enc = FeatureEncoder.from_pipeline(pipe)
+    ref = pipe.predict_proba(pd.DataFrame(rows))[:, 1]
+    fast = final_estimator(pipe).predict_proba(enc.encode_many(rows))[:, 1]
+    single = np.array([final_estimator(pipe).predict_proba(enc.encode(r))[0, 1] for r in rows])
+    diff = float(max(np.max(np.abs(ref - fast)), np.max(np.abs(ref - single))))
+    assert diff <= tol, f"FeatureEncoder parity failed: max |diff| = {diff} > {tol}"
+    return diff
+
+
+# -------------------------------------------------
+# Compilation helpers
+# -------------------------------------------------
+def _steps_of(trans):
+    if trans == "passthrough":
+        return []
+    if hasattr(trans, "steps"):
+        return [s for _, s in trans.steps if s != "passthrough" and s is not None]
+    return [trans]
+
+
+def _column_names(ct, cols):
+    names = list(getattr(ct, "feature_names_in_", []))
+    out = []
+    for c in cols:
+        if isinstance(c, (int, np.integer)):
+            if not names:
+                raise ValueError("Integer column selectors need feature_names_in_")
+            out.append(names[c])
+        else:
+            out.append(c)
+    return out
+
+
+def _compile_column(col, j, pos, steps):
+    """j is the index of `col` inside its transformer's column list."""
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    fill = None
+    mean = scale = None
+    spec = None
+    for step in steps:
+        if spec is not None:
+            raise ValueError(f"{col}: OneHotEncoder must be the last step")
+        if isinstance(step, SimpleImputer):
+            if step.add_indicator or not _is_missing(step.missing_values):
+                raise ValueError(f"{col}: unsupported SimpleImputer settings")
+            fill = step.statistics_[_feature_idx(step, col, j)]
+            if _is_missing(fill):
+                raise ValueError(f"{col}: imputer has no fill value")
+            fill = fill.item() if hasattr(fill, "item") else fill
+        elif isinstance(step, StandardScaler):
+            k = _feature_idx(step, col, j)
+            mean = float(step.mean_[k]) if step.with_mean else None
+            scale = float(step.scale_[k]) if step.with_std else None
+        elif isinstance(step, OneHotEncoder):
+            if (step.drop_idx_ is not None or getattr(step, "_infrequent_enabled", False)
+                    or step.handle_unknown not in ("ignore", "error", "infrequent_if_exist")):
+                raise ValueError(f"{col}: unsupported OneHotEncoder settings")
+            cats = [c.item() if hasattr(c, "item") else c
+                    for c in step.categories_[_feature_idx(step, col, j)]]
+            spec = _OneHotCol(col, pos, cats, fill=fill,
+                              ignore_unknown=step.handle_unknown != "error")
+        else:
+            raise ValueError(f"{col}: unsupported step {type(step).__name__}")
+    return spec or _NumCol(col, pos, fill=fill, mean=mean, scale=scale)
+
+
+def _feature_idx(step, col, default):
+    names = list(getattr(step, "feature_names_in_", []))
+    return names.index(col) if col in names else default
+
+
+# -------------------------------------------------
+# Parity check against the shipped models
+#   python fast_encoder.py [path/to/cardio.csv]
+# -------------------------------------------------
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    import joblib
+    import pandas as pd
+
+    root = Path(__file__).resolve().parent
+
+    clin = pd.read_csv(root / "DS2" / "heart_cleveland_upload.csv")
+    clin["Fasting Blood Sugar Missing"] = 0
+    clin["Exercise Angina Missing"] = 0
+    svm_pipe = joblib.load(root / "DS2" / "Models" / "stage1_svm_latest.joblib")
+    print("DS2 svm max |diff|:", check_parity(svm_pipe, clin.to_dict("records")))
+
+    if len(sys.argv) > 1:
+        life = pd.read_csv(sys.argv[1], nrows=20000)
+        xgb_pipe = joblib.load(root / "DS1" / "Models" / "stage1_xgb_latest.joblib")
+        print("DS1 xgb max |diff|:", check_parity(xgb_pipe, life.to_dict("records")))
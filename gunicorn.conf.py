@@ -0,0 +1,32 @@
+# gunicorn.conf.py
+"""
+Preload-and-fork serving: the app (models, reference CSV, templates) is
+imported once in the master and workers are forked from it, so the loaded
+objects are shared copy-on-write. See reports/preload_rss.md for numbers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", 8))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+
+# PRELOAD_APP=0 loads the app in each worker instead (old behaviour, useful
+# for comparing memory)
+preload_app = os.environ.get("PRELOAD_APP", "1") == "1"
+
+# one BLAS / OpenMP thread per worker, N workers already use N cores.
+# Set here so it is in place before the app (numpy) is imported.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+
+def post_worker_init(worker):
+    # each web worker gets its own inference pool (INFERENCE_POOL_SIZE > 0);
+    # start it now rather than on the first request
+    from flask_app import inference_pool
+    if inference_pool is not None:
+        inference_pool.start()
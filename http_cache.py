@@ -0,0 +1,147 @@
+# http_cache.py
+"""
+Conditional GET + precompressed bodies for read-mostly JSON endpoints.
+
+    @app.route("/api/visuals-data")
+    @cached_json(version=visuals_snapshot.version, max_age=60)
+    def api_visuals_data():
+        return visuals_snapshot.get()          # plain dict / list, not jsonify()
+
+The view's payload is serialised once into a CachedBody: the JSON bytes, a
+content-hash ETag and, on first request for each, gzip and brotli copies.
+While the body is reused the view is not called at all:
+- version=fn: reused while fn() returns the same value (e.g. the snapshot
+  build), checked on every request
+- ttl=seconds: reused for that long (DB-backed lists like /api/labs)
+- neither: the view runs every time; its output is hashed, so unchanged
+  payloads still get 304s and keep their compressed copies
+
+Requests with a matching If-None-Match get 304 Not Modified with no body;
+otherwise the best encoding the client accepts (br, gzip, identity) is sent
+as is. Responses carry ETag, Cache-Control and Vary: Accept-Encoding.
+brotli is optional (pip install brotli); without it only gzip is offered.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+
+from observability import METRICS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 512
+MAX_ENTRIES = 64          # per view; distinct query strings beyond this evict the oldest
+
+
+class CachedBody:
+
+    def __init__(self, payload, version=None):
+        self.body = json.dumps(payload, ensure_ascii=False, sort_keys=True,
+                               separators=(",", ":"), default=str).encode("utf-8")
+        self.etag = 'W/"' + hashlib.blake2b(self.body, digest_size=16).hexdigest() + '"'
+        self.version = version
+        self.created = time.monotonic()
+        self._encoded = {"identity": self.body}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    if encoding == "br":
+                        data = brotli.compress(self.body, quality=9)
+                    else:
+                        data = gzip.compress(self.body, compresslevel=9, mtime=0)
+                    self._encoded[encoding] = data
+        return data
+
+
+def pick_encoding(accept_encoding, size):
+    if size < MIN_COMPRESS_BYTES or not accept_encoding:
+        return "identity"
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[token.strip().lower()] = q
+    for enc in (("br",) if brotli is not None else ()) + ("gzip",):
+        if offered.get(enc, offered.get("*", 0.0)) > 0.0:
+            return enc
+    return "identity"
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == bare:
+            return True
+    return False
+
+
+def cached_json(version=None, ttl=None, max_age=60):
+    """Decorator for views that return a JSON-able payload (see module doc)."""
+    from flask import current_app, request
+
+    def decorator(view):
+        entries = {}   # request.full_path -> CachedBody
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.full_path
+            entry = entries.get(key)
+            v = version() if version is not None else None
+            fresh = entry is not None and (
+                (version is not None and entry.version == v) or
+                (ttl is not None and time.monotonic() - entry.created < ttl))
+            if not fresh:
+                result = view(*args, **kwargs)
+                if not isinstance(result, (dict, list)):
+                    return result                  # errors etc. pass through untouched
+                new = CachedBody(result, v)
+                if entry is not None and entry.etag == new.etag:
+                    entry.version, entry.created = v, new.created   # keep compressed copies
+                else:
+                    if key not in entries and len(entries) >= MAX_ENTRIES:
+                        entries.pop(next(iter(entries)), None)
+                    entry = entries[key] = new
+
+            cache_control = f"public, max-age={int(max_age)}"
+            if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+                METRICS.inc("medipredict_http_not_modified_total", 1,
+                            "304 responses from cached_json endpoints", endpoint=request.endpoint)
+                resp = current_app.response_class(status=304)
+            else:
+                encoding = pick_encoding(request.headers.get("Accept-Encoding"), len(entry.body))
+                resp = current_app.response_class(entry.encoded(encoding),
+                                                  mimetype="application/json")
+                if encoding != "identity":
+                    resp.headers["Content-Encoding"] = encoding
+            resp.headers["ETag"] = entry.etag
+            resp.headers["Cache-Control"] = cache_control
+            resp.headers["Vary"] = "Accept-Encoding"
+            return resp
+
+        wrapper.cache_entries = entries
+        return wrapper
+
+    return decorator
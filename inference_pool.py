@@ -0,0 +1,364 @@
+# inference_pool.py
+"""
+Out-of-process scoring for the risk models.
+
+SVC.predict_proba (kernel evaluations against every support vector) holds the
+GIL for the whole call, so one clinical prediction stalls every other request
+thread in the same web worker. InferencePool keeps long-lived processes that
+load the model artifacts themselves; request threads only encode and wait.
+
+One job:
+    request thread  encodes the rows straight into a free shared-memory slot
+                    (float64, n x n_features) and queues (slot, artifact path, n)
+    pool process    runs predict_proba on a view of the slot, writes P(class 1)
+                    back into the same slot and answers with a small message
+Models without a compiled encoder (ONNX) send the rows through the queue
+instead; the probabilities still come back through the slot.
+
+The number of slots is the queue limit: a job waits up to its timeout for a
+free slot and raises PoolBusy otherwise. InferenceTimeout is raised when the
+result is not back in time (the slot is released when the late result lands).
+"""
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from micro_batcher import _bucket, _hist_dict
+from observability import get_logger, timed
+
+log = get_logger("inference_pool")
+
+LATENCY_MS_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class PoolBusy(RuntimeError):
+    """No free slot within the timeout (queue limit reached)."""
+
+
+class InferenceTimeout(TimeoutError):
+    """The pool did not return a result within the timeout."""
+
+
+class _Job:
+    __slots__ = ("slot", "n", "width", "future", "submitted", "started")
+
+    def __init__(self, slot, n, width):
+        self.slot, self.n, self.width = slot, n, width
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.started = None
+
+
+class InferencePool:
+    """
+    pool.run(loaded_model, rows) -> P(class 1) array, computed in a pool process.
+    Plug it into a registry with registry.executor = pool.run.
+
+    Processes are started by start() or on first use, once per process that
+    uses the pool, so a pool created before gunicorn forks its workers gives
+    every web worker its own pool. Starting blocks until every pool process
+    has loaded preload_paths, so no job pays the cold start.
+    """
+
+    def __init__(self, size=2, queue_limit=64, timeout_ms=2000, slot_kb=1024,
+                 preload_paths=(), start_method="spawn", startup_timeout=120.0):
+        self.size = max(1, int(size))
+        self.queue_limit = max(1, int(queue_limit))
+        self.timeout = float(timeout_ms) / 1000.0
+        self.slot_bytes = int(slot_kb) * 1024
+        self.preload_paths = [str(p) for p in preload_paths]
+        self.start_method = start_method
+        self.startup_timeout = startup_timeout
+
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._start()
+
+    def run(self, model, rows: list, timeout=None):
+        self.start()
+        timeout = self.timeout if timeout is None else float(timeout)
+
+        width = model.n_features
+        per_row = 8 * ((width or 0) + 1)
+        chunk = max(1, self.slot_bytes // per_row)
+        if len(rows) > chunk:
+            return np.concatenate([self.run(model, rows[i:i + chunk], timeout)
+                                   for i in range(0, len(rows), chunk)])
+
+        deadline = time.monotonic() + timeout
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._rejected += 1
+            raise PoolBusy(f"inference pool: all {self.queue_limit} slots busy") from None
+
+        n = len(rows)
+        payload = rows
+        if width is not None:
+            try:
+                with timed("feature_build", model=model.name):
+                    model.encode(rows, out=self._view(slot, 0, (n, width)))
+            except Exception:
+                self._free.put(slot)
+                raise
+            payload = None
+
+        job_id = next(self._ids)
+        job = _Job(slot, n, width)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._submitted += 1
+        self._tasks.put((job_id, slot, str(model.path), n, width, payload))
+
+        try:
+            with timed("predict_proba", model=model.name, executor="pool"):
+                return job.future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise InferenceTimeout(
+                f"inference pool: no result within {timeout * 1000:.0f} ms") from None
+
+    def stats(self) -> dict:
+        base = {
+            "size": self.size,
+            "queue_limit": self.queue_limit,
+            "timeout_ms": self.timeout * 1000.0,
+            "slot_kb": self.slot_bytes // 1024,
+            "started": self._pid == os.getpid(),
+        }
+        if not base["started"]:
+            return base
+        with self._lock:
+            done = self._completed + self._failed
+            base.update({
+                "alive": sum(p.is_alive() for p in self._procs),
+                "in_flight": len(self._jobs),
+                "free_slots": self._free.qsize(),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "worker_restarts": self._restarts,
+                "latency_ms": {
+                    "avg": self._latency_total * 1000.0 / done if done else 0.0,
+                    "max": self._latency_max * 1000.0,
+                    "histogram": _hist_dict(LATENCY_MS_BUCKETS, self._latency_hist),
+                },
+                "queue_wait_ms": {
+                    "avg": self._wait_total * 1000.0 / done if done else 0.0,
+                    "histogram": _hist_dict(LATENCY_MS_BUCKETS, self._wait_hist),
+                },
+            })
+        return base
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        self._pid = None
+        self._closed = True
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=2)
+            if p.is_alive():
+                p.terminate()
+        self._shm.close()
+        self._shm.unlink()
+
+    # -------------------------------------------------
+    # Startup
+    # -------------------------------------------------
+    def _start(self):
+        self._ctx = mp.get_context(self.start_method)
+        self._shm = shared_memory.SharedMemory(create=True,
+                                               size=self.queue_limit * self.slot_bytes)
+        self._free = queue.Queue()
+        for slot in range(self.queue_limit):
+            self._free.put(slot)
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._jobs = {}      # job_id -> _Job
+        self._running = {}   # worker pid -> job_id
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._submitted = self._completed = self._failed = 0
+        self._timeouts = self._rejected = self._restarts = 0
+        self._latency_hist = [0] * (len(LATENCY_MS_BUCKETS) + 1)
+        self._wait_hist = [0] * (len(LATENCY_MS_BUCKETS) + 1)
+        self._latency_total = self._latency_max = self._wait_total = 0.0
+
+        self._procs = [self._spawn() for _ in range(self.size)]
+        self._wait_ready(self.size)
+        threading.Thread(target=self._collect, name="inference-pool", daemon=True).start()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def _spawn(self):
+        p = self._ctx.Process(target=_worker_main, name="inference-worker", daemon=True,
+                              args=(self._shm.name, self.slot_bytes, self._tasks,
+                                    self._results, self.preload_paths))
+        p.start()
+        return p
+
+    def _wait_ready(self, count):
+        deadline = time.monotonic() + self.startup_timeout
+        while count:
+            try:
+                kind, _, pid, err = self._results.get(
+                    timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                raise RuntimeError("inference pool: workers did not start in time") from None
+            if err is not None:
+                raise RuntimeError(f"inference pool: worker {pid} failed to start: {err}")
+            count -= 1
+
+    def _view(self, slot, offset_items, shape):
+        return np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf,
+                          offset=slot * self.slot_bytes + 8 * offset_items)
+
+    # -------------------------------------------------
+    # Results
+    # -------------------------------------------------
+    def _collect(self):
+        next_check = time.monotonic() + 1.0
+        while not self._closed:
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 1.0
+            try:
+                kind, job_id, pid, err = self._results.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if kind == "ready":
+                if err is not None:
+                    log.error("worker %s failed to start: %s", pid, err)
+            elif kind == "start":
+                with self._lock:
+                    self._running[pid] = job_id
+                    job = self._jobs.get(job_id)
+                    if job is not None:
+                        job.started = time.perf_counter()
+            else:
+                self._finish(job_id, pid, err)
+
+    def _finish(self, job_id, pid, err):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if self._running.get(pid) == job_id:
+                del self._running[pid]
+        if job is None:
+            return
+        if err is None:
+            out = self._view(job.slot, job.n * (job.width or 0), (job.n,)).copy()
+        self._free.put(job.slot)
+
+        now = time.perf_counter()
+        latency = now - job.submitted
+        wait = (job.started or now) - job.submitted
+        with self._lock:
+            if err is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._latency_hist[_bucket(LATENCY_MS_BUCKETS, latency * 1000.0)] += 1
+            self._wait_hist[_bucket(LATENCY_MS_BUCKETS, wait * 1000.0)] += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            self._wait_total += wait
+
+        if err is None:
+            job.future.set_result(out)
+        else:
+            job.future.set_exception(RuntimeError(err))
+
+    def _check_workers(self):
+        for i, p in enumerate(self._procs):
+            if p.is_alive() or self._closed:
+                continue
+            with self._lock:
+                job_id = self._running.pop(p.pid, None)
+                self._restarts += 1
+            if job_id is not None:
+                self._finish(job_id, p.pid,
+                             f"inference worker {p.pid} died (exit code {p.exitcode})")
+            self._procs[i] = self._spawn()
+
+
+# -------------------------------------------------
+# Pool process
+# -------------------------------------------------
+def _worker_main(shm_name, slot_bytes, tasks, results, preload_paths):
+    from pathlib import Path
+    from model_registry import LoadedModel
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    models = {}   # artifact path -> LoadedModel; follows the registry's hot swaps
+
+    def get_model(path):
+        model = models.get(path)
+        if model is None:
+            if len(models) >= 4:
+                models.pop(next(iter(models)))
+            model = models[path] = LoadedModel(Path(path).stem, path)
+        return model
+
+    pid = os.getpid()
+    try:
+        for path in preload_paths:
+            get_model(path)
+    except Exception as e:
+        results.put(("ready", None, pid, f"{type(e).__name__}: {e}"))
+        raise
+    results.put(("ready", None, pid, None))
+
+    try:
+        while True:
+            msg = tasks.get()
+            if msg is None:
+                break
+            job_id, slot, path, n, width, rows = msg
+            results.put(("start", job_id, pid, None))
+            base = slot * slot_bytes
+            try:
+                model = get_model(path)
+                if width is None:
+                    proba = model.predict_proba(rows)
+                else:
+                    X = np.ndarray((n, width), dtype=np.float64, buffer=shm.buf, offset=base)
+                    proba = model.predict_encoded(X)
+                    del X
+                out = np.ndarray((n,), dtype=np.float64, buffer=shm.buf,
+                                 offset=base + 8 * n * (width or 0))
+                out[:] = proba
+                del out
+                results.put(("done", job_id, pid, None))
+            except Exception as e:
+                results.put(("done", job_id, pid, f"{type(e).__name__}: {e}"))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shm.close()
@@ -0,0 +1,168 @@
+# measure_rss.py
+"""
+Memory per gunicorn worker with and without preload-and-fork.
+
+Starts gunicorn twice (PRELOAD_APP=0, then 1) with the same worker count,
+sends some scoring traffic so every worker has touched the models, then
+reads /proc/<pid>/smaps_rollup of each worker (Linux only).
+
+RSS counts shared pages in every process that maps them; PSS splits them
+between the sharers, so sum(PSS) is the real memory cost of the pool.
+
+    python measure_rss.py --workers 8 [--app wsgi:app] [--out reports/preload_rss.md]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+SAMPLE_RECORD = {
+    "generalHealth": "Good", "exercise": "Yes", "diabetes": "No", "sex": "Female",
+    "ageCategory": "45-49", "bmi": "27.5", "smoking": "No",
+}
+
+
+# -------------------------------------------------
+# /proc helpers
+# -------------------------------------------------
+def smaps(pid) -> dict:
+    """kB values from /proc/<pid>/smaps_rollup."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0].rstrip(":") in FIELDS:
+                out[parts[0].rstrip(":")] = int(parts[1])
+    return out
+
+
+def children(pid):
+    kids = []
+    for p in Path("/proc").iterdir():
+        if not p.name.isdigit():
+            continue
+        try:
+            stat = (p / "stat").read_text()
+        except OSError:
+            continue
+        # the ppid is the 2nd field after "(comm)"
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            kids.append(int(p.name))
+    return sorted(kids)
+
+
+# -------------------------------------------------
+# One run
+# -------------------------------------------------
+def _post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as r:
+        return r.status
+
+
+def _wait_ready(base, proc, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            with urllib.request.urlopen(base + "/api/models", timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError("gunicorn did not become ready")
+
+
+def run(preload, workers, app, port, requests, startup_timeout):
+    env = dict(os.environ, PRELOAD_APP="1" if preload else "0",
+               WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               MODEL_POLL_SECONDS="0")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", app],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base, proc, startup_timeout)
+        # without preload the workers finish importing at different times
+        while len(children(proc.pid)) < workers:
+            time.sleep(0.2)
+        for _ in range(requests):
+            _post(base + "/api/predict/lifestyle/batch", [SAMPLE_RECORD])
+        ready_s = time.perf_counter() - started
+        time.sleep(1.0)
+
+        master = smaps(proc.pid)
+        per_worker = [smaps(pid) for pid in children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    def avg(key):
+        return sum(w.get(key, 0) for w in per_worker) / len(per_worker)
+
+    return {
+        "mode": "preload" if preload else "per-worker load",
+        "workers": len(per_worker),
+        "ready_s": ready_s,
+        "rss_avg": avg("Rss"),
+        "pss_avg": avg("Pss"),
+        "private_avg": avg("Private_Clean") + avg("Private_Dirty"),
+        "shared_avg": avg("Shared_Clean") + avg("Shared_Dirty"),
+        "pss_total": master.get("Pss", 0) + sum(w.get("Pss", 0) for w in per_worker),
+    }
+
+
+# -------------------------------------------------
+# Report
+# -------------------------------------------------
+def build_report(results, requests) -> str:
+    mb = lambda kb: f"{kb / 1024:.1f}"
+    lines = [
+        "# Worker memory: per-worker load vs preload-and-fork",
+        "",
+        f"gunicorn (gthread), {results[0]['workers']} workers, {requests} lifestyle "
+        "requests sent before sampling. Values in MB from /proc/<pid>/smaps_rollup.",
+        "",
+        "| mode | RSS / worker | PSS / worker | private / worker | shared / worker "
+        "| total PSS (master + workers) | startup (s) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for r in results:
+        lines.append(f"| {r['mode']} | {mb(r['rss_avg'])} | {mb(r['pss_avg'])} "
+                     f"| {mb(r['private_avg'])} | {mb(r['shared_avg'])} "
+                     f"| {mb(r['pss_total'])} | {r['ready_s']:.1f} |")
+    if len(results) == 2 and results[0]["pss_total"]:
+        saved = 1 - results[1]["pss_total"] / results[0]["pss_total"]
+        lines += ["", f"Preload reduces the pool's total PSS by {saved:.0%}."]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--app", default="wsgi:app")
+    ap.add_argument("--port", type=int, default=5055)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--startup-timeout", type=float, default=300)
+    ap.add_argument("--out", default="reports/preload_rss.md")
+    args = ap.parse_args()
+
+    results = [run(preload, args.workers, args.app, args.port, args.requests,
+                   args.startup_timeout)
+               for preload in (False, True)]
+    report = build_report(results, args.requests)
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.out).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# micro_batcher.py
+"""
+In-process request coalescing for the risk models.
+
+Concurrent Flask requests each score a single row, and every call pays the
+fixed cost of DataFrame construction + ColumnTransformer dispatch + model
+invocation. MicroBatcher collects rows submitted from many threads over a
+short window (max_wait_ms) or until max_batch_size rows are queued, scores
+them with one batch call and hands every caller its own result.
+
+If the batch call fails, the rows are re-scored one at a time so an error
+(unseen category, invalid value) reaches only the request that caused it.
+A call waits at most `timeout` seconds (concurrent.futures.TimeoutError),
+so a request thread cannot hang if the worker thread is gone.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# upper bounds of the histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50)
+
+
+class MicroBatcher:
+    """
+    score_batch: function(list of rows) -> list of results (same order).
+    Call the batcher like the single-row function it replaces:
+        pred, proba = batcher(life_dict)
+    """
+
+    def __init__(self, score_batch, max_batch_size=32, max_wait_ms=2.0,
+                 name="batcher", timeout=30.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.timeout = timeout
+
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._row_errors = 0
+        self._size_hist = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._wait_hist = [0] * (len(WAIT_MS_BUCKETS) + 1)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        self._start()
+        # threads do not survive fork (gunicorn --preload): restart in the worker
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def submit(self, row) -> Future:
+        fut = Future()
+        self._queue.put((time.perf_counter(), row, fut))
+        return fut
+
+    def __call__(self, row, timeout=None):
+        return self.submit(row).result(self.timeout if timeout is None else timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "errors": self._errors,
+                "row_errors": self._row_errors,
+                "avg_batch_size": self._rows / self._batches if self._batches else 0.0,
+                "batch_size_histogram": _hist_dict(BATCH_SIZE_BUCKETS, self._size_hist),
+                "added_wait_ms": {
+                    "avg": self._wait_total * 1000.0 / self._rows if self._rows else 0.0,
+                    "max": self._wait_max * 1000.0,
+                    "histogram": _hist_dict(WAIT_MS_BUCKETS, self._wait_hist),
+                },
+            }
+
+    # -------------------------------------------------
+    # Worker
+    # -------------------------------------------------
+    def _collect(self):
+        """Block for the first row, then gather more until the window closes."""
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                failed, row_errors = self._score(batch)
+            except BaseException as e:      # keep the worker alive whatever happens
+                for _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                failed, row_errors = True, len(batch)
+            self._record(batch, started, failed, row_errors)
+
+    def _score(self, batch):
+        """Score the batch; on failure, row by row. Returns (batch failed, failed rows)."""
+        rows = [row for _, row, _ in batch]
+        try:
+            results = self.score_batch(rows)
+            if len(results) != len(rows):
+                raise RuntimeError(
+                    f"{self.name}: got {len(results)} results for {len(rows)} rows")
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return True, 1
+        else:
+            for (_, _, fut), res in zip(batch, results):
+                fut.set_result(res)
+            return False, 0
+
+        row_errors = 0
+        for _, row, fut in batch:
+            try:
+                fut.set_result(self.score_batch([row])[0])
+            except Exception as e:
+                fut.set_exception(e)
+                row_errors += 1
+        return True, row_errors
+
+    def _record(self, batch, started, failed, row_errors=0):
+        waits = [started - enqueued for enqueued, _, _ in batch]
+        with self._lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._errors += int(failed)
+            self._row_errors += row_errors
+            self._size_hist[_bucket(BATCH_SIZE_BUCKETS, len(batch))] += 1
+            for w in waits:
+                self._wait_hist[_bucket(WAIT_MS_BUCKETS, w * 1000.0)] += 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+
+def _bucket(bounds, value):
+    for i, b in enumerate(bounds):
+        if value <= b:
+            return i
+    return len(bounds)
+
+
+def _hist_dict(bounds, counts):
+    out = {f"le_{b}": c for b, c in zip(bounds, counts)}
+    out["inf"] = counts[-1]
+    return out
@@ -0,0 +1,86 @@
+# model_costs.py
+"""
+Inference cost of a fitted (preprocessor, estimator) pipeline, and the
+quality / latency Pareto front used when picking the model to ship.
+
+    cost = measure(pipe, rows)     # rows: list of input dicts, as the app sees them
+    # {"single_ms", "batch_ms", "batch_rows", "size_kb", "estimator_kb", "load_ms"}
+    front = pareto(candidates, quality="pr_auc", costs=("single_ms",))
+
+Latency goes through the same path as the app: FeatureEncoder (pandas-free
+encoding, see fast_encoder.py) + one predict_proba call, per row for
+single_ms, all rows in one call for batch_ms (reported per row). size_kb is
+the joblib artifact; load_ms is joblib.load of it with MODEL_MMAP, as
+model_registry loads it. Every timing is the best of `repeat` runs.
+"""
+import io
+import os
+import tempfile
+import time
+
+import joblib
+
+from fast_encoder import FeatureEncoder, final_estimator
+from model_registry import MODEL_MMAP
+
+
+def score_fn(clf):
+    """Positive-class score: predict_proba, or decision_function (e.g. SVC without probability)."""
+    if hasattr(clf, "predict_proba"):
+        return lambda X: clf.predict_proba(X)[:, 1]
+    return clf.decision_function
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def measure(pipe, rows, repeat=3, single_rows=200) -> dict:
+    enc = FeatureEncoder.from_pipeline(pipe)
+    clf = final_estimator(pipe)
+    score = score_fn(clf)
+    few = rows[:single_rows]
+
+    def one_by_one():
+        for r in few:
+            score(enc.encode(r))
+
+    X = enc.encode_many(rows)
+    score(X)                                              # first call: lazy init, caches
+    single = _best(one_by_one, repeat) / len(few) * 1000.0
+    batch = _best(lambda: score(enc.encode_many(rows, out=X)), repeat) / len(rows) * 1000.0
+
+    buf = io.BytesIO()
+    joblib.dump(clf, buf)
+    estimator_kb = buf.tell() / 1024
+    fd, path = tempfile.mkstemp(suffix=".joblib")
+    os.close(fd)
+    try:
+        joblib.dump(pipe, path)
+        size_kb = os.path.getsize(path) / 1024
+        load = _best(lambda: joblib.load(path, mmap_mode=MODEL_MMAP), repeat) * 1000.0
+    finally:
+        os.remove(path)
+    return {"single_ms": single, "batch_ms": batch, "batch_rows": len(rows),
+            "size_kb": size_kb, "estimator_kb": estimator_kb, "load_ms": load}
+
+
+def pareto(candidates: dict, quality: str, costs=("single_ms",)) -> set:
+    """
+    Names of the candidates no other candidate beats on quality (higher is
+    better) and every cost (lower is better) at once.
+    candidates: {name: {quality: float, cost: float, ...}}
+    """
+    def dominates(a, b):
+        ge = a[quality] >= b[quality] and all(a[c] <= b[c] for c in costs)
+        gt = a[quality] > b[quality] or any(a[c] < b[c] for c in costs)
+        return ge and gt
+
+    scored = {n: c for n, c in candidates.items() if c.get(quality) is not None}
+    return {n for n, c in scored.items()
+            if not any(dominates(o, c) for m, o in scored.items() if m != n)}
@@ -0,0 +1,277 @@
+# model_registry.py
+"""
+Versioned model artifacts with atomic hot-reload.
+
+Artifacts follow the training scripts' naming:
+    <prefix>_<YYYYmmdd_HHMMSS>.joblib   e.g. DS1/Models/stage1_xgb_20251129_231213.joblib
+    <prefix>_latest.joblib              fallback when no timestamped file exists
+(.onnx instead of .joblib when MODEL_BACKEND=onnx, see export_onnx.py).
+
+joblib artifacts are loaded with mmap_mode (MODEL_MMAP, default "r"), so
+their numpy arrays (e.g. the SVM support vectors) are file-backed pages
+shared by every worker process. Publish new versions as new files (or
+write + rename); never overwrite a served artifact in place.
+
+ModelRegistry serves the newest version, loaded at construction or, with
+lazy=True, on first use (flask_app warms it in the background). A new
+artifact is loaded and warmed up off the request path, then swapped in with a single reference assignment,
+so in-flight requests finish on the model they started with and nothing is
+dropped. Every prediction carries the version that produced it.
+
+pin(version) writes <models_dir>/<prefix>.pin; while it exists that version
+is served instead of the newest one, and unpin() removes it. The pin lives
+in the models dir, not in the process, so every gunicorn worker's watcher
+follows a pin / unpin within its poll interval.
+"""
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from observability import get_logger, timed
+from onnx_backend import MODEL_BACKEND
+
+MODEL_MMAP = os.environ.get("MODEL_MMAP", "r") or None
+
+VERSION_RE = re.compile(r"^(?P<prefix>.+)_(?P<version>\d{8}_\d{6}|latest)$")
+
+log = get_logger("registry")
+
+
+class Prediction(tuple):
+    """(pred, proba) that also remembers which model version produced it."""
+
+    def __new__(cls, pred, proba, model_version=None):
+        obj = super().__new__(cls, (pred, proba))
+        obj.model_version = model_version
+        return obj
+
+
+class LoadedModel:
+    """One loaded artifact; predict_proba(list of dicts) -> P(class 1)."""
+
+    def __init__(self, version, path, name=None):
+        self.version = version
+        self.path = Path(path)
+        self.name = name or self.path.stem   # metrics label
+        self.loaded_at = time.time()
+        self.pipe = self._encoder = self._clf = self._onnx = None
+
+        if self.path.suffix == ".onnx":
+            from onnx_backend import OnnxModel
+            self._onnx = OnnxModel(self.path)
+        else:
+            import joblib
+            from fast_encoder import FeatureEncoder
+
+            self.pipe = joblib.load(self.path, mmap_mode=MODEL_MMAP)
+            # Pandas-free encoder compiled from the fitted ColumnTransformer;
+            # None → fall back to the DataFrame path.
+            try:
+                self._encoder = FeatureEncoder.from_pipeline(self.pipe)
+                self._clf = self.pipe.steps[-1][1]
+            except ValueError:
+                self._encoder = self._clf = None
+
+    def predict_proba(self, rows: list):
+        if self._onnx is not None:
+            with timed("predict_proba", model=self.name):
+                return self._onnx.predict_proba(rows)
+        if self._encoder is None:
+            import pandas as pd
+            with timed("feature_build", model=self.name):
+                X = pd.DataFrame(rows)
+            with timed("predict_proba", model=self.name):
+                return self.pipe.predict_proba(X)[:, 1]
+        with timed("feature_build", model=self.name):
+            X = self._encoder.encode(rows[0]) if len(rows) == 1 else self._encoder.encode_many(rows)
+        with timed("predict_proba", model=self.name):
+            return self._clf.predict_proba(X)[:, 1]
+
+    # split form used by the inference pool: encode here, score elsewhere
+    @property
+    def n_features(self):
+        return self._encoder.n_features if self._encoder is not None else None
+
+    def encode(self, rows: list, out=None):
+        return self._encoder.encode_many(rows, out=out)
+
+    def predict_encoded(self, X):
+        return self._clf.predict_proba(X)[:, 1]
+
+
+class ModelRegistry:
+
+    def __init__(self, models_dir, prefix, backend=MODEL_BACKEND, warmup_rows=None, name=None,
+                 lazy=False):
+        self.models_dir = Path(models_dir)
+        self.prefix = prefix
+        self.name = name or prefix
+        self.suffix = ".onnx" if backend == "onnx" else ".joblib"
+        self.warmup_rows = warmup_rows or []
+        self.pinned = False
+        self.last_error = None
+        # optional fn(LoadedModel, rows) -> proba that runs the model somewhere
+        # else (InferencePool.run); None scores in this thread
+        self.executor = None
+
+        self._load_lock = threading.Lock()
+        self._current = None
+        self._sig = None
+        self._watcher = None
+        self._watch_interval = None
+        if not lazy:
+            self.load()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    # -------------------------------------------------
+    # Discovery
+    # -------------------------------------------------
+    def discover(self):
+        """[(version, path)] oldest → newest; 'latest' only if nothing is timestamped."""
+        found, latest = [], None
+        for path in self.models_dir.glob(f"{self.prefix}_*{self.suffix}"):
+            m = VERSION_RE.match(path.stem)
+            if not m or m.group("prefix") != self.prefix:
+                continue
+            if m.group("version") == "latest":
+                latest = ("latest", path)
+            else:
+                found.append((m.group("version"), path))
+        found.sort()
+        if not found and latest:
+            found.append(latest)
+        return found
+
+    @property
+    def pin_path(self) -> Path:
+        return self.models_dir / f"{self.prefix}.pin"
+
+    def pinned_version(self):
+        try:
+            return self.pin_path.read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def pin(self, version):
+        """Persist a pin to version (checked to exist) for every process watching this dir."""
+        v, _ = self._resolve(version)
+        tmp = self.pin_path.with_suffix(f".pin.{os.getpid()}.tmp")
+        tmp.write_text(v, encoding="utf-8")
+        os.replace(tmp, self.pin_path)
+        return v
+
+    def unpin(self):
+        try:
+            self.pin_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _resolve(self, version=None):
+        if version is None:
+            version = self.pinned_version()
+        versions = self.discover()
+        if not versions:
+            raise FileNotFoundError(f"No {self.prefix}_*{self.suffix} in {self.models_dir}")
+        if version is None:
+            return versions[-1]
+        for v, path in versions + [("latest", self.models_dir / f"{self.prefix}_latest{self.suffix}")]:
+            if v == version and path.exists():
+                return v, path
+        raise FileNotFoundError(f"{self.prefix} version {version!r} not found")
+
+    def serving_path(self) -> Path:
+        """Artifact load() would serve now, without loading it (e.g. for InferencePool preload)."""
+        return self._resolve()[1]
+
+    # -------------------------------------------------
+    # Serving
+    # -------------------------------------------------
+    def current(self) -> LoadedModel:
+        model = self._current
+        if model is None:          # lazy registry, first use
+            self.load()
+            model = self._current
+        return model
+
+    def version(self):
+        return self.current().version
+
+    def predict_proba(self, rows: list):
+        """Score with one consistent model snapshot; returns (proba array, version)."""
+        model = self.current()
+        if self.executor is not None:
+            return self.executor(model, rows), model.version
+        return model.predict_proba(rows), model.version
+
+    # -------------------------------------------------
+    # Loading / hot swap
+    # -------------------------------------------------
+    def load(self, version=None):
+        """Load + warm a version (pinned, else newest, by default) and swap it in atomically."""
+        with self._load_lock:
+            pinned = self.pinned_version()
+            v, path = self._resolve(version)
+            sig = (v, path.stat().st_size, path.stat().st_mtime_ns)
+            self.pinned = version is not None or pinned is not None
+            if sig == self._sig:
+                return v
+            model = LoadedModel(v, path, self.name)
+            if self.warmup_rows:
+                model.predict_proba(self.warmup_rows)
+            self._current = model   # atomic swap; in-flight calls keep the old object
+            self._sig = sig
+            self.last_error = None
+            log.info("%s: serving version %s (%s)", self.prefix, v, path.name)
+            return v
+
+    def reload_async(self, version=None):
+        t = threading.Thread(target=self._safe_load, args=(version,),
+                             name=f"{self.prefix}-reload", daemon=True)
+        t.start()
+        return t
+
+    def _safe_load(self, version=None):
+        try:
+            self.load(version)
+        except Exception as e:  # keep serving the old model
+            self.last_error = f"{type(e).__name__}: {e}"
+            kept = self._current.version if self._current is not None else None
+            log.warning("%s: reload failed, keeping %s (%s)", self.prefix, kept, self.last_error)
+
+    def start_watching(self, interval=30.0):
+        """Poll the models dir and hot-swap to the pinned or newest artifact."""
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._watch_interval = interval
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                if self._current is not None:
+                    self._safe_load()
+
+        self._watcher = threading.Thread(target=loop, name=f"{self.prefix}-watch", daemon=True)
+        self._watcher.start()
+
+    def _after_fork(self):
+        # the lock may have been held by the parent's watcher; the watcher
+        # thread itself is gone in the child
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        if self._watch_interval:
+            self.start_watching(self._watch_interval)
+
+    def info(self) -> dict:
+        cur = self.current()
+        return {
+            "artifact": self.prefix,
+            "current": cur.version,
+            "path": str(cur.path),
+            "loaded_at": cur.loaded_at,
+            "pinned": self.pinned,
+            "pinned_version": self.pinned_version(),
+            "last_error": self.last_error,
+            "available": [v for v, _ in self.discover()],
+        }
@@ -5,6 +5,10 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+# text[] on Postgres; stored as a JSON list on SQLite (local stand-in used by
+# benchmark.py), so the tip columns still round-trip as Python lists
+StringArray = ARRAY(db.String).with_variant(db.JSON(), "sqlite")
+
 # =====================================================
 # 1. USERS TABLE
 # =====================================================
@@ -35,8 +39,8 @@ class PatientProfile(db.Model):
     patient_id = db.Column(db.String(20), unique=True, nullable=False)
     risk_level = db.Column(db.String(20), default='Low')
     last_checkup = db.Column(db.Date)
-    tips = db.Column(ARRAY(db.String))               # keep for lifestyle
-    clinical_tips = db.Column(ARRAY(db.String))      # NEW for clinical
+    tips = db.Column(StringArray)                    # keep for lifestyle
+    clinical_tips = db.Column(StringArray)           # NEW for clinical
 
 
 
@@ -112,6 +116,7 @@ class LifestylePrediction(db.Model):
     fried_potato_consumption = db.Column(db.Numeric(5,2))
     risk_prediction = db.Column(db.String(20))
     prediction_score = db.Column(db.Numeric(5,3))
+    model_version = db.Column(db.String(40))         # registry version that scored this row
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 # =====================================================
@@ -137,8 +142,19 @@ class ClinicalPrediction(db.Model):
     chest_pain_type = db.Column(db.String(50))
     risk_prediction = db.Column(db.String(20))
     prediction_score = db.Column(db.Numeric(5,3))
+    model_version = db.Column(db.String(40))         # registry version that scored this row
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# =====================================================
+# 7b. LIVE COHORT STATS CHECKPOINT (see cohort_stats.py)
+# =====================================================
+class CohortSummary(db.Model):
+    __tablename__ = 'cohort_summaries'
+
+    name = db.Column(db.String(40), primary_key=True)
+    state = db.Column(db.JSON)                       # counters, moments, id watermarks
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 # =====================================================
 # 8. LAB PATIENTS
 # =====================================================
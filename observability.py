@@ -0,0 +1,185 @@
+# observability.py
+"""
+Latency histograms, request counters and sampled debug logging.
+
+Hot-path stages are timed with
+
+    with timed("predict_proba", model="lifestyle"):
+        ...
+
+and exported together with per-endpoint request counts / durations as
+Prometheus text at /metrics (see instrument_app). Values are per process:
+under gunicorn every worker keeps its own, so scrape each worker or sum them.
+
+Debug logging on the hot path goes through sampled(logger): a level check
+first (one attribute lookup when DEBUG is off), then LOG_SAMPLE_RATE.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 0.01))
+
+# upper bounds in seconds
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGE_METRIC = "medipredict_stage_duration_seconds"
+
+
+class Histogram:
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe counters and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}     # name -> "counter" | "histogram"
+        self._help = {}
+        self._series = {}    # name -> {labels tuple: value or Histogram}
+
+    def _get(self, name, kind, labels, help_text):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(name)
+        if series is None:
+            self._kinds[name] = kind
+            self._help[name] = help_text
+            series = self._series[name] = {}
+        if key not in series:
+            series[key] = Histogram() if kind == "histogram" else 0
+        return series, key
+
+    def inc(self, name, amount=1, help_text="", **labels):
+        with self._lock:
+            series, key = self._get(name, "counter", labels, help_text)
+            series[key] += amount
+
+    def observe(self, name, value, help_text="", **labels):
+        with self._lock:
+            series, key = self._get(name, "histogram", labels, help_text)
+            series[key].observe(value)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._series.items()):
+                kind = self._kinds[name]
+                if self._help[name]:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, v in sorted(series.items()):
+                    if kind == "counter":
+                        lines.append(f"{name}{_labels(key)} {v}")
+                        continue
+                    cumulative = 0
+                    for bound, c in zip(v.buckets + (float("inf"),), v.counts):
+                        cumulative += c
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {v.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {v.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    if not key:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in key) + "}"
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Record the duration of the block in medipredict_stage_duration_seconds."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(STAGE_METRIC, time.perf_counter() - t0,
+                        "Time spent per hot-path stage", stage=stage, **labels)
+
+
+# -------------------------------------------------
+# Logging
+# -------------------------------------------------
+def get_logger(name):
+    return logging.getLogger(f"medipredict.{name}")
+
+
+def sampled(logger, level=logging.DEBUG, rate=None) -> bool:
+    """True for ~rate of the calls, and only when logger is enabled for level."""
+    if not logger.isEnabledFor(level):
+        return False
+    return random.random() < (LOG_SAMPLE_RATE if rate is None else rate)
+
+
+# -------------------------------------------------
+# Flask
+# -------------------------------------------------
+def instrument_app(app):
+    """Request counts / durations per endpoint, exceptions and template render time."""
+    if not METRICS_ENABLED:
+        return
+    from flask import before_render_template, g, got_request_exception, request, template_rendered
+
+    def endpoint():
+        return request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        t0 = g.pop("_metrics_t0", None)
+        ep = endpoint()
+        METRICS.inc("medipredict_http_requests_total", 1, "HTTP requests by endpoint and status",
+                    endpoint=ep, method=request.method, status=str(response.status_code))
+        if t0 is not None:
+            METRICS.observe("medipredict_http_request_duration_seconds",
+                            time.perf_counter() - t0, "HTTP request duration", endpoint=ep)
+        return response
+
+    def _exception(sender, exception, **extra):
+        METRICS.inc("medipredict_http_exceptions_total", 1, "Unhandled exceptions by endpoint",
+                    endpoint=endpoint(), exception=type(exception).__name__)
+
+    def _render_start(sender, template, context, **extra):
+        g.setdefault("_render_t0", []).append(time.perf_counter())
+
+    def _render_done(sender, template, context, **extra):
+        starts = g.get("_render_t0")
+        if starts:
+            METRICS.observe(STAGE_METRIC, time.perf_counter() - starts.pop(),
+                            "Time spent per hot-path stage",
+                            stage="render", template=template.name or "<string>")
+
+    # signals hold weak references by default; keep these alive with the app
+    app.extensions["observability"] = (_exception, _render_start, _render_done)
+    got_request_exception.connect(_exception, app)
+    before_render_template.connect(_render_start, app)
+    template_rendered.connect(_render_done, app)
@@ -0,0 +1,70 @@
+# onnx_backend.py
+"""
+onnxruntime (CPU) scoring for models exported by export_onnx.py.
+
+Only needs numpy + onnxruntime, so a worker running with MODEL_BACKEND=onnx
+does not import sklearn / xgboost at all.
+
+Threading is pinned per session (ONNX_THREADS, default 1) so N web workers
+use N cores instead of fighting over a shared intra-op pool.
+"""
+import json
+import os
+
+import numpy as np
+
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "sklearn").lower()
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", 1))
+
+
+def _is_missing(v):
+    return v is None or (isinstance(v, float) and v != v)
+
+
+def _as_int(v):
+    # like sklearn, only numeric values can match the integer categories;
+    # anything else maps to -1, which the one-hot encoder ignores
+    if isinstance(v, (int, np.integer)):
+        return int(v)
+    if isinstance(v, (float, np.floating)) and float(v).is_integer():
+        return int(v)
+    return -1
+
+
+class OnnxModel:
+    """Wraps an exported pipeline; predict_proba(list of dicts) -> P(class 1)."""
+
+    def __init__(self, path, threads=ONNX_THREADS):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.inter_op_num_threads = 1
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.path = str(path)
+        self.session = ort.InferenceSession(self.path, sess_options=opts,
+                                            providers=["CPUExecutionProvider"])
+
+        meta = self.session.get_modelmeta().custom_metadata_map
+        spec = json.loads(meta["columns"])
+        inputs = [i.name for i in self.session.get_inputs()]
+        # skl2onnx sanitises input names ("Age (years)" -> "Age__years_"), keep both
+        self.columns = [(inp, col, kind) for inp, (col, kind) in zip(inputs, spec)]
+        self.output = "probabilities"
+
+    def _feed(self, rows):
+        feed = {}
+        for inp, col, kind in self.columns:
+            values = [r.get(col) for r in rows]
+            if kind == "str":
+                arr = np.array(["" if _is_missing(v) else str(v) for v in values], dtype=object)
+            elif kind == "int":
+                arr = np.array([_as_int(v) for v in values], dtype=np.int64)
+            else:
+                arr = np.array([np.nan if _is_missing(v) else float(v) for v in values],
+                               dtype=np.float64)
+            feed[inp] = arr.reshape(-1, 1)
+        return feed
+
+    def predict_proba(self, rows: list):
+        return self.session.run([self.output], self._feed(rows))[0][:, 1].astype(np.float64)
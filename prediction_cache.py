@@ -0,0 +1,168 @@
+# prediction_cache.py
+"""
+Bounded LRU + TTL cache in front of the prediction and tips functions.
+
+Most lifestyle inputs are categorical and full_lifestyle_eval fills defaults
+for several fields, so identical feature vectors repeat a lot. Keys are a
+canonical form of life_dict / clin_dict (sorted items, floats rounded to
+round_digits), so 31.0 and 31.004 BMI share an entry. wrap(..., exact=True)
+keys on the unrounded values instead, for functions with hard thresholds
+(the tips: BMI 29.996 and 30.0 must not share an entry).
+
+The cache is cleared automatically when the model it is bound to changes,
+checked at most once per check_interval seconds: either version_fn()
+(e.g. ModelRegistry.version) or the size / mtime of model_path. version_fn
+is first called on the first lookup, so a lazily loaded model is not loaded
+by building the cache, and it is never called with the cache lock held.
+A value computed while the model changed is returned but not stored (the
+generation counter moved), so an old version's result is never cached
+under the new model.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_UNSET = object()
+
+
+class PredictionCache:
+
+    def __init__(self, maxsize=4096, ttl=600.0, round_digits=2,
+                 model_path=None, version_fn=None, check_interval=1.0):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.round_digits = round_digits
+        self.model_path = model_path
+        self.version_fn = version_fn
+        self.check_interval = check_interval
+
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._generation = 0         # bumped on every invalidation / clear
+        self._check_lock = threading.Lock()   # orders model checks; never held with _lock waiting on it
+        if version_fn is not None:
+            self._model_sig = _UNSET          # taken on the first lookup
+            self._next_check = 0.0
+        else:
+            self._model_sig = self._signature()
+            self._next_check = time.monotonic() + check_interval
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    # -------------------------------------------------
+    # Keys
+    # -------------------------------------------------
+    def canonical(self, d: dict, exact=False):
+        items = []
+        for k, v in d.items():
+            if isinstance(v, float):
+                v = v if exact else round(v, self.round_digits)
+                if v.is_integer():
+                    v = int(v)
+            items.append((k, v))
+        return tuple(sorted(items))
+
+    # -------------------------------------------------
+    # Lookup
+    # -------------------------------------------------
+    def get_or_compute(self, namespace, d: dict, compute, exact=False):
+        if self.maxsize <= 0:
+            return compute(d)
+        key = (namespace, self.canonical(d, exact))
+        now = time.monotonic()
+        self._check_model(now)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return _copy(entry[1])
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            generation = self._generation
+
+        value = compute(d)  # outside the lock; concurrent misses may both compute
+
+        # the model may have been swapped while computing: look again now
+        self._check_model(time.monotonic(), force=True)
+        with self._lock:
+            if generation != self._generation:
+                return _copy(value)
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return _copy(value)
+
+    def wrap(self, fn, namespace=None, exact=False):
+        """Cached version of a single-dict function (predict_* / *_tips)."""
+        namespace = namespace or getattr(fn, "__name__", repr(fn))
+
+        def cached(d):
+            return self.get_or_compute(namespace, d, fn, exact)
+
+        cached.__name__ = f"cached_{namespace}"
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+            self._generation += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "model": (None if self._model_sig is _UNSET else self._model_sig)
+                         if self.version_fn else
+                         (str(self.model_path) if self.model_path else None),
+            }
+
+    # -------------------------------------------------
+    # Model file change detection
+    # -------------------------------------------------
+    def _signature(self):
+        if self.version_fn is not None:
+            return self.version_fn()
+        if not self.model_path:
+            return None
+        try:
+            st = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _check_model(self, now, force=False):
+        if self.model_path is None and self.version_fn is None:
+            return
+        if not force and now < self._next_check:
+            return
+        with self._check_lock:
+            sig = self._signature()   # not under _lock: lookups never wait on version_fn
+            with self._lock:
+                self._next_check = now + self.check_interval
+                if self._model_sig is _UNSET:
+                    self._model_sig = sig
+                elif sig != self._model_sig:
+                    self._model_sig = sig
+                    self._data.clear()
+                    self.invalidations += 1
+                    self._generation += 1
+
+
+def _copy(value):
+    # tips are lists; don't let callers mutate the cached copy
+    return list(value) if isinstance(value, list) else value
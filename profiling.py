@@ -0,0 +1,218 @@
+# profiling.py
+"""
+On-demand sampled request profiling.
+
+A request is profiled when PROFILE_SAMPLE_RATE picks it, or when it carries
+X-Profile: <PROFILE_TOKEN>. While at least one profiled request is running, a
+background thread snapshots the stacks of those request threads every
+PROFILE_INTERVAL_MS (sys._current_frames, no tracing hooks) and counts them
+per Flask endpoint (patient_lifestyle_form, clinical_history,
+api_visuals_data, ...). Unprofiled requests are never sampled.
+
+    GET  /admin/profile                 folded stacks ("endpoint;frame;frame count"),
+                                        input for flamegraph.pl / speedscope
+    GET  /admin/profile?route=<endpoint>&format=json
+    POST /admin/profile                 {"rate": 0.05} change the sample rate, {"reset": true}
+
+The admin routes want the same X-Profile header and answer 403 while
+PROFILE_TOKEN is unset (behind a proxy every client looks like loopback, so
+the source address is not trusted). With rate 0 and no token the request hook
+is a single branch.
+Like /metrics, the data is per process.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from observability import get_logger
+
+log = get_logger("profiling")
+
+HEADER = "X-Profile"
+
+
+class SamplingProfiler:
+
+    def __init__(self, rate=0.0, token="", interval_ms=5.0, max_depth=80):
+        self.rate = float(rate)
+        self.token = token or ""
+        self.interval = float(interval_ms) / 1000.0
+        self.max_depth = max_depth
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._active = {}                    # thread ident -> endpoint
+        self._stacks = defaultdict(Counter)  # endpoint -> folded stack -> samples
+        self._requests = Counter()           # endpoint -> profiled requests
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0.0 or bool(self.token)
+
+    def authorized(self, header_value) -> bool:
+        return bool(self.token) and header_value is not None and \
+            hmac.compare_digest(header_value.encode(), self.token.encode())
+
+    def should_profile(self, header_value) -> bool:
+        if header_value is not None and self.authorized(header_value):
+            return True
+        return self.rate > 0.0 and random.random() < self.rate
+
+    # -------------------------------------------------
+    # Per request
+    # -------------------------------------------------
+    def begin(self, endpoint):
+        with self._lock:
+            self._active[threading.get_ident()] = endpoint
+            self._requests[endpoint] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler",
+                                                daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def end(self):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+
+    # -------------------------------------------------
+    # Sampler thread
+    # -------------------------------------------------
+    def _run(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+                for ident, endpoint in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        self._stacks[endpoint][self._fold(frame)] += 1
+            del frames
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        names.reverse()
+        # drop the server / threading frames above Flask's dispatch
+        for i, name in enumerate(names):
+            if name.startswith("flask.app:"):
+                names = names[i:]
+                break
+        return ";".join(n.replace(";", ":") for n in names)
+
+    # -------------------------------------------------
+    # Output
+    # -------------------------------------------------
+    def folded(self, endpoint=None) -> str:
+        lines = []
+        with self._lock:
+            for ep, stacks in sorted(self._stacks.items()):
+                if endpoint and ep != endpoint:
+                    continue
+                for stack, n in stacks.most_common():
+                    lines.append(f"{ep};{stack} {n}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self, endpoint=None, top=15) -> dict:
+        """Profiled requests, samples and the hottest leaf frames per endpoint."""
+        out = {}
+        with self._lock:
+            for ep in sorted(set(self._requests) | set(self._stacks)):
+                if endpoint and ep != endpoint:
+                    continue
+                stacks = self._stacks.get(ep, Counter())
+                total = sum(stacks.values())
+                own, inclusive = Counter(), Counter()
+                for stack, n in stacks.items():
+                    frames = stack.split(";")
+                    own[frames[-1]] += n
+                    for f in set(frames):
+                        inclusive[f] += n
+                out[ep] = {
+                    "requests": self._requests.get(ep, 0),
+                    "samples": total,
+                    "approx_ms": total * self.interval * 1000.0,
+                    "self": [{"frame": f, "samples": n, "share": n / total}
+                             for f, n in own.most_common(top)],
+                    "inclusive": [{"frame": f, "samples": n, "share": n / total}
+                                  for f, n in inclusive.most_common(top)],
+                }
+        return {"rate": self.rate, "interval_ms": self.interval * 1000.0,
+                "token": bool(self.token), "endpoints": out}
+
+    def clear(self):
+        with self._lock:
+            self._stacks.clear()
+            self._requests.clear()
+
+
+# -------------------------------------------------
+# Flask
+# -------------------------------------------------
+def require_token(token, header):
+    """403 unless `token` is configured and the request sends it in `header`."""
+    from flask import abort, request
+
+    value = request.headers.get(header)
+    if not token or value is None or not hmac.compare_digest(value.encode(), token.encode()):
+        abort(403)
+
+
+def require_admin(profiler):
+    """403 unless the request has X-Profile: PROFILE_TOKEN; always 403 with no token set."""
+    require_token(profiler.token, HEADER)
+
+
+def instrument_profiling(app, profiler):
+    """Request hooks + the /admin/profile routes."""
+    from flask import jsonify, request
+
+    @app.before_request
+    def _maybe_profile():
+        if not profiler.enabled:
+            return
+        if request.endpoint not in (None, "admin_profile") and \
+                profiler.should_profile(request.headers.get(HEADER)):
+            profiler.begin(request.endpoint)
+
+    @app.teardown_request
+    def _stop_profile(exc=None):
+        if profiler._active:
+            profiler.end()
+
+    def _check_admin():
+        require_admin(profiler)
+
+    @app.route("/admin/profile", methods=["GET", "POST"])
+    def admin_profile():
+        _check_admin()
+        if request.method == "POST":
+            data = request.get_json(silent=True) or {}
+            if "rate" in data:
+                profiler.rate = min(1.0, max(0.0, float(data["rate"])))
+                log.info("profiling sample rate set to %s", profiler.rate)
+            if data.get("reset"):
+                profiler.clear()
+            return jsonify({"rate": profiler.rate, "enabled": profiler.enabled})
+        route = request.args.get("route")
+        if request.args.get("format") == "json":
+            return jsonify(profiler.summary(route))
+        return app.response_class(profiler.folded(route), mimetype="text/plain")
+
+    return profiler
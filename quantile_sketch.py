@@ -0,0 +1,210 @@
+# quantile_sketch.py
+"""
+Mergeable quantile sketch (KLL: Karnin, Lang, Liberty 2016).
+
+    s = KLLSketch()
+    for x in values: s.update(x)
+    s.quantile(0.9); s.quantiles([0.25, 0.5, 0.75]); s.cdf(240)
+    s.histogram(bins=10, lo=100, hi=400)    # [{"bin", "lo", "hi", "count"}]
+    total = KLLSketch.merged(reference, live)
+
+Levels of buffers where an item on level h stands for 2**h inputs; a full
+level is sorted and every other item (random offset) is promoted. Size stays
+around 3k items whatever the input, rank error ~1/k. Until the first
+compaction (n <= k) the sketch holds the data itself and every answer is
+exact, which covers the 303-row Cleveland table at the default k. Queries
+work on the sorted, weighted items (cached until the next update), so they
+cost O(sketch size), not O(n). min / max / count / mean are tracked exactly.
+
+to_dict() / from_dict() give a JSON-able form (cohort_summaries checkpoint).
+"""
+import math
+import random
+
+import numpy as np
+
+DEFAULT_K = 400
+
+
+class KLLSketch:
+
+    def __init__(self, k=DEFAULT_K, c=2.0 / 3.0, seed=0):
+        self.k = int(k)
+        self.c = float(c)
+        self.levels = [[]]
+        self.n = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._sorted = None                   # (values, cumulative weights)
+
+    # -------------------------------------------------
+    # Updates
+    # -------------------------------------------------
+    def _capacity(self, h):
+        depth = len(self.levels) - h - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def update(self, x):
+        if x is None:
+            return
+        x = float(x)
+        if math.isnan(x):
+            return
+        self.levels[0].append(x)
+        self.n += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+        self._size += 1
+        self._sorted = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values):
+        for x in values:
+            self.update(x)
+
+    def _grow(self):
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        for h in range(len(self.levels)):
+            if len(self.levels[h]) >= self._capacity(h):
+                if h + 1 >= len(self.levels):
+                    self._grow()
+                buf = sorted(self.levels[h])
+                keep = [buf.pop()] if len(buf) % 2 else []   # odd one out stays here
+                offset = self._rng.random() < 0.5
+                self.levels[h + 1].extend(buf[offset::2])
+                self.levels[h] = keep
+                self._size = sum(len(level) for level in self.levels)
+                if self._size < self._max_size:
+                    break
+
+    def merge(self, other):
+        """Fold other into this sketch (other is unchanged)."""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for h, level in enumerate(other.levels):
+            self.levels[h].extend(level)
+        self.n += other.n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._size = sum(len(level) for level in self.levels)
+        self._sorted = None
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def copy(self):
+        return KLLSketch.from_dict(self.to_dict())
+
+    @classmethod
+    def merged(cls, *sketches):
+        out = cls(k=sketches[0].k if sketches else DEFAULT_K)
+        for s in sketches:
+            out.merge(s)
+        return out
+
+    # -------------------------------------------------
+    # Queries
+    # -------------------------------------------------
+    def _weighted(self):
+        if self._sorted is None:
+            values = np.concatenate([np.asarray(level, dtype=np.float64) for level in self.levels])
+            weights = np.concatenate([np.full(len(level), 2 ** h, dtype=np.float64)
+                                      for h, level in enumerate(self.levels)])
+            order = np.argsort(values, kind="stable")
+            self._sorted = (values[order], np.cumsum(weights[order]))
+        return self._sorted
+
+    def quantiles(self, qs) -> list:
+        if self.n == 0:
+            return [None] * len(qs)
+        values, cum = self._weighted()
+        out = []
+        for q in qs:
+            q = min(1.0, max(0.0, float(q)))
+            if q == 0.0:
+                out.append(self.min)
+            elif q == 1.0:
+                out.append(self.max)
+            else:
+                i = int(np.searchsorted(cum, q * cum[-1], side="left"))
+                out.append(float(values[min(i, len(values) - 1)]))
+        return out
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def median(self):
+        """Midpoint of the two middle items, like np.median (exact while n <= k)."""
+        if self.n == 0:
+            return None
+        values, cum = self._weighted()
+        total = cum[-1]
+        lo = values[min(int(np.searchsorted(cum, total / 2.0, side="left")), len(values) - 1)]
+        hi = values[min(int(np.searchsorted(cum, total / 2.0, side="right")), len(values) - 1)]
+        return float((lo + hi) / 2.0) if self.n % 2 == 0 else float(lo)
+
+    def cdf(self, x) -> float:
+        """Share of inputs <= x."""
+        if self.n == 0:
+            return 0.0
+        values, cum = self._weighted()
+        i = int(np.searchsorted(values, float(x), side="right"))
+        return float(cum[i - 1] / cum[-1]) if i else 0.0
+
+    def histogram(self, bins=8, lo=None, hi=None, label_digits=0) -> list:
+        """Counts in bins equal-width bins over [lo, hi] (default min..max), np.histogram edges."""
+        if self.n == 0:
+            return []
+        lo = self.min if lo is None else float(lo)
+        hi = self.max if hi is None else float(hi)
+        if hi <= lo:
+            lo, hi = lo - 0.5, lo + 0.5               # np.histogram does the same for one value
+        edges = np.linspace(lo, hi, int(bins) + 1)
+        values, cum = self._weighted()
+        cum = np.concatenate([[0.0], cum])
+        # [e_i, e_i+1) except the last bin, which is closed
+        idx = np.searchsorted(values, edges, side="left")
+        idx[-1] = np.searchsorted(values, edges[-1], side="right")
+        counts = np.diff(cum[idx])
+        return [{"bin": f"{edges[i]:.{label_digits}f}-{edges[i + 1]:.{label_digits}f}",
+                 "lo": float(edges[i]), "hi": float(edges[i + 1]), "count": int(round(counts[i]))}
+                for i in range(len(counts))]
+
+    def summary(self, qs=(0.25, 0.5, 0.75)) -> dict:
+        if self.n == 0:
+            return {"n": 0}
+        return {"n": self.n, "min": self.min, "max": self.max,
+                "mean": self.total / self.n, "median": self.median(),
+                "quantiles": {str(q): v for q, v in zip(qs, self.quantiles(qs))}}
+
+    # -------------------------------------------------
+    # Serialisation
+    # -------------------------------------------------
+    def to_dict(self) -> dict:
+        return {"k": self.k, "c": self.c, "n": self.n, "total": self.total,
+                "min": self.min if self.n else None, "max": self.max if self.n else None,
+                "levels": [list(level) for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls(k=d.get("k", DEFAULT_K), c=d.get("c", 2.0 / 3.0), seed=d.get("n", 0))
+        s.levels = [list(level) for level in d.get("levels", [[]])] or [[]]
+        s.n = d.get("n", 0)
+        s.total = d.get("total", 0.0)
+        s.min = d["min"] if d.get("min") is not None else math.inf
+        s.max = d["max"] if d.get("max") is not None else -math.inf
+        s._size = sum(len(level) for level in s.levels)
+        s._max_size = sum(s._capacity(h) for h in range(len(s.levels)))
+        return s
@@ -0,0 +1,168 @@
+# startup.py
+"""
+Startup timing and background warm-up.
+
+    import startup                      # first import in flask_app
+    warmup = startup.Warmup()
+    warmup.add("lifestyle_model", lifestyle_registry.current)
+    warmup.add("cohort_index", cohort_index.warm, required=False)
+    warmup.start()                      # background thread
+    warmup.ready                        # True once every required task ran
+    warmup.wait()                       # create_app: finish before gunicorn forks
+    startup.report(warmup)              # import times per module + warm-up timings
+
+Importing this module installs an import hook (STARTUP_IMPORT_TIMING=0 turns
+it off) that times every module loaded from a file after it: inclusive time
+and self time (without the modules it imported in turn). This is the same
+split `python -X importtime` prints, but available at runtime and summed per
+top-level package (sklearn, xgboost, pandas, ...).
+"""
+import importlib.machinery
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+STARTED = time.perf_counter()
+
+_FILE_LOADERS = (importlib.machinery.SourceFileLoader,
+                 importlib.machinery.SourcelessFileLoader,
+                 importlib.machinery.ExtensionFileLoader)
+
+
+# -------------------------------------------------
+# Import timing
+# -------------------------------------------------
+class ImportTimer:
+    """sys.meta_path hook; wraps each file loader's exec_module with a timer."""
+
+    def __init__(self):
+        self.times = {}                    # module -> (inclusive s, self s)
+        self._local = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if isinstance(spec.loader, _FILE_LOADERS):
+                    self._wrap(name, spec.loader)
+                return spec
+        return None
+
+    def _wrap(self, name, loader):
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)                  # time spent in nested imports
+            t0 = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                total = time.perf_counter() - t0
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += total
+                self.times[name] = (total, total - nested)
+
+        loader.exec_module = timed_exec_module   # per-module loader instance
+
+    def packages(self) -> dict:
+        """Self time summed per top-level package, slowest first."""
+        totals = defaultdict(float)
+        for name, (_, own) in list(self.times.items()):
+            totals[name.partition(".")[0]] += own
+        return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+    def slowest(self, top=25) -> list:
+        rows = sorted(list(self.times.items()), key=lambda kv: -kv[1][0])[:top]
+        return [{"module": name, "inclusive_s": round(inc, 4), "self_s": round(own, 4)}
+                for name, (inc, own) in rows]
+
+
+import_timer = None
+if os.environ.get("STARTUP_IMPORT_TIMING", "1") != "0":
+    import_timer = ImportTimer()
+    sys.meta_path.insert(0, import_timer)
+
+
+# -------------------------------------------------
+# Warm-up
+# -------------------------------------------------
+class Warmup:
+    """Named load steps run once, in a background thread or inline."""
+
+    def __init__(self, log=None):
+        self.tasks = []                    # (name, fn, required)
+        self.results = {}                  # name -> {"seconds", "error"}
+        self.ready = False
+        self.finished_at = None
+        self.log = log
+        self._thread = None
+        self._run_lock = threading.Lock()
+        self._done = threading.Event()
+
+    def add(self, name, fn, required=True):
+        self.tasks.append((name, fn, required))
+
+    def run(self):
+        with self._run_lock:
+            if self._done.is_set():
+                return self.ready
+            ok = True
+            for name, fn, required in self.tasks:
+                t0 = time.perf_counter()
+                error = None
+                try:
+                    fn()
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    ok = ok and not required
+                    if self.log:
+                        self.log.warning("warm-up %s failed: %s", name, error)
+                self.results[name] = {"seconds": round(time.perf_counter() - t0, 3),
+                                      "error": error, "required": required}
+            self.finished_at = time.perf_counter()
+            self.ready = ok
+            self._done.set()
+            if self.log:
+                self.log.info("warm-up finished %.2fs after startup (%s)%s",
+                              self.finished_at - STARTED,
+                              ", ".join(f"{n} {r['seconds']:.2f}s" for n, r in self.results.items()),
+                              "" if ok else "; NOT ready")
+            return ok
+
+    def start(self):
+        if self._thread is None and not self._done.is_set():
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None) -> bool:
+        """Block until warm-up is done (runs it here if it was never started)."""
+        if self._thread is None:
+            self.run()
+        else:
+            self._done.wait(timeout)
+        return self.ready
+
+    def info(self) -> dict:
+        return {"ready": self.ready, "done": self._done.is_set(),
+                "seconds_since_start": round(time.perf_counter() - STARTED, 3),
+                "ready_after_s": None if self.finished_at is None
+                else round(self.finished_at - STARTED, 3),
+                "tasks": {name: self.results.get(name, {"pending": True, "required": required})
+                          for name, _, required in self.tasks}}
+
+
+def report(warmup=None, top=25) -> dict:
+    out = {"import_timing": import_timer is not None}
+    if import_timer is not None:
+        out["packages"] = [{"package": k, "self_s": round(v, 4)}
+                           for k, v in import_timer.packages().items() if v >= 0.001][:top]
+        out["slowest_modules"] = import_timer.slowest(top)
+    if warmup is not None:
+        out["warmup"] = warmup.info()
+    return out
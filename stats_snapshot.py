@@ -0,0 +1,228 @@
+# stats_snapshot.py
+"""
+Precomputed dashboard stats, persisted to disk and served from memory.
+
+    snap = StatsSnapshot("cardio_visuals", DATA_PATH, get_visual_stats)
+    snap.get()        # dict, from memory
+
+The first get() loads <SNAPSHOT_DIR>/<name>.json if it was built from the
+same source file (size + mtime, or the same sha256 when only the mtime moved)
+by the same build (SNAPSHOT_VERSION and the `config` passed in, e.g. the
+chunk size), otherwise it builds the stats once and writes the file atomically. Later calls
+return the in-memory dict; every check_seconds the source is stat()ed and, if
+it changed, the stats are rebuilt in a background thread while the old ones
+keep being served.
+
+Several worker processes share the snapshot file: one takes <name>.json.lock
+(O_EXCL, works on Windows too) and rebuilds, the others pick the new file up
+on their next check.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from observability import get_logger, timed
+
+ROOT = Path(__file__).resolve().parent
+SNAPSHOT_DIR = Path(os.environ.get("SNAPSHOT_DIR", ROOT / "snapshots"))
+STALE_LOCK_SECONDS = 1800
+# bump when the layout of a snapshot document or of the stats it holds changes
+SNAPSHOT_VERSION = 2
+
+log = get_logger("snapshot")
+
+
+def fingerprint(path, with_hash=True) -> dict:
+    st = os.stat(path)
+    fp = {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        fp["sha256"] = h.hexdigest()
+    return fp
+
+
+class StatsSnapshot:
+
+    def __init__(self, name, source_path, build_fn, snapshot_dir=SNAPSHOT_DIR,
+                 check_seconds=30.0, config=None):
+        self.name = name
+        self.source_path = source_path
+        self.build_fn = build_fn          # build_fn(source_path) -> JSON-able dict
+        # what else the stats depend on; compared after a JSON round trip, like the file
+        self.build = json.loads(json.dumps({"version": SNAPSHOT_VERSION, "config": config or {}},
+                                           default=_plain))
+        self.path = Path(snapshot_dir) / f"{name}.json"
+        self.check_seconds = float(check_seconds)
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        if not hasattr(self, "_data"):
+            self._data = None             # full snapshot document
+            self._next_check = 0.0
+
+    # -------------------------------------------------
+    # Public API
+    # -------------------------------------------------
+    def get(self) -> dict:
+        data = self._data
+        if data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self._load_or_build()
+                    self._next_check = time.monotonic() + self.check_seconds
+            return self._data["stats"]
+        if time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_seconds
+            self._check()
+        return data["stats"]
+
+    def version(self):
+        """Changes whenever get() starts returning a different build."""
+        self.get()
+        data = self._data
+        return data["source"].get("sha256"), data["built_at"]
+
+    def info(self) -> dict:
+        data = self._data or {}
+        return {
+            "name": self.name,
+            "snapshot": str(self.path),
+            "loaded": bool(data),
+            "source": data.get("source"),
+            "build": data.get("build"),
+            "built_at": data.get("built_at"),
+            "build_seconds": data.get("build_seconds"),
+            "rebuilding": self._rebuilding,
+        }
+
+    # -------------------------------------------------
+    # Load / build
+    # -------------------------------------------------
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _matches(self, doc, fp) -> bool:
+        """doc built from the file described by fp (stat only; hash if the mtime moved)."""
+        if not doc or "source" not in doc or doc.get("build") != self.build:
+            return False
+        src = doc["source"]
+        if src["size"] != fp["size"]:
+            return False
+        if src["mtime_ns"] == fp["mtime_ns"]:
+            return True
+        if src.get("sha256") != fingerprint(self.source_path)["sha256"]:
+            return False
+        # same bytes, new mtime (copied / touched): remember it, skip the hash next time
+        src["mtime_ns"] = fp["mtime_ns"]
+        self._write(doc)
+        return True
+
+    def _write(self, doc):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(doc, ensure_ascii=False, default=_plain), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _load_or_build(self):
+        doc = self._read()
+        try:
+            fp = fingerprint(self.source_path, with_hash=False)
+        except OSError:
+            if doc is None:
+                raise
+            log.warning("%s: %s not found, serving the snapshot as is", self.name, self.source_path)
+            return doc
+        if self._matches(doc, fp):
+            log.info("%s: snapshot loaded from %s", self.name, self.path)
+            return doc
+        if doc is not None and doc.get("build") == self.build:
+            # stale but usable: serve it and rebuild off the request path
+            self._start_rebuild()
+            return doc
+        return self._build()
+
+    def _build(self):
+        fp = fingerprint(self.source_path)
+        t0 = time.perf_counter()
+        with timed("snapshot_build", snapshot=self.name):
+            stats = self.build_fn(self.source_path)
+        doc = {
+            "source": fp,
+            "build": self.build,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "build_seconds": round(time.perf_counter() - t0, 3),
+            "stats": stats,
+        }
+        self._write(doc)
+        log.info("%s: snapshot built in %.1fs -> %s", self.name, doc["build_seconds"], self.path)
+        # same representation as a snapshot read back from disk
+        return json.loads(json.dumps(doc, ensure_ascii=False, default=_plain))
+
+    # -------------------------------------------------
+    # Change detection
+    # -------------------------------------------------
+    def _check(self):
+        try:
+            fp = fingerprint(self.source_path, with_hash=False)
+        except OSError:
+            return
+        src = self._data["source"]
+        if (src["size"], src["mtime_ns"]) == (fp["size"], fp["mtime_ns"]):
+            return
+        self._start_rebuild()
+
+    def _start_rebuild(self):
+        with self._rebuild_lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name=f"snapshot-{self.name}", daemon=True).start()
+
+    def _rebuild(self):
+        lock = self.path.with_suffix(".json.lock")
+        try:
+            fp = fingerprint(self.source_path, with_hash=False)
+            doc = self._read()
+            if self._matches(doc, fp):            # another process was faster
+                self._data = doc
+                return
+            if not self._take_lock(lock):
+                return                            # retried on the next check
+            try:
+                self._data = self._build()
+            finally:
+                lock.unlink(missing_ok=True)
+        except Exception:
+            log.exception("%s: snapshot rebuild failed, still serving the previous one", self.name)
+        finally:
+            self._rebuilding = False
+
+    def _take_lock(self, lock):
+        lock.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if time.time() - lock.stat().st_mtime > STALE_LOCK_SECONDS:
+                lock.unlink(missing_ok=True)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+
+def _plain(v):
+    return v.item() if hasattr(v, "item") else str(v)
@@ -0,0 +1,64 @@
+"""FeatureEncoder against the shipped pipelines, on rows built from the fitted encoder."""
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from fast_encoder import PARITY_TOL, FeatureEncoder, _NumCol, final_estimator
+
+ROOT = Path(__file__).resolve().parent.parent
+MODELS = {
+    "lifestyle": ROOT / "DS1" / "Models" / "stage1_xgb_latest.joblib",
+    "clinical": ROOT / "DS2" / "Models" / "stage1_svm_latest.joblib",
+}
+
+
+def make_rows(enc, n=300, seed=0):
+    """Every category and numbers across mean +- 3 scale, with a few missing values."""
+    rng = np.random.default_rng(seed)
+    rows = [{} for _ in range(n)]
+    for spec in enc.columns:
+        if isinstance(spec, _NumCol):
+            center = spec.mean if spec.mean is not None else (spec.fill or 0.0)
+            spread = spec.scale if spec.scale is not None else max(abs(center), 1.0)
+            values = rng.uniform(center - 3 * spread, center + 3 * spread, n).round(2)
+        else:
+            cats = list(spec.index)
+            values = [cats[i % len(cats)] for i in rng.permutation(n)]
+        for row, v in zip(rows, values):
+            row[spec.name] = v.item() if hasattr(v, "item") else v
+    for i in range(0, n, 10):
+        spec = enc.columns[i % len(enc.columns)]
+        if isinstance(spec, _NumCol) and spec.fill is not None:
+            rows[i][spec.name] = np.nan
+    return rows
+
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def model(request):
+    pipe = joblib.load(MODELS[request.param])
+    enc = FeatureEncoder.from_pipeline(pipe)
+    rows = make_rows(enc)
+    ref = pipe.predict_proba(pd.DataFrame(rows))[:, 1]
+    return pipe, enc, rows, ref
+
+
+def test_batch_parity(model):
+    pipe, enc, rows, ref = model
+    got = final_estimator(pipe).predict_proba(enc.encode_many(rows))[:, 1]
+    assert np.max(np.abs(ref - got)) <= PARITY_TOL
+
+
+def test_single_row_parity(model):
+    pipe, enc, rows, ref = model
+    clf = final_estimator(pipe)
+    got = np.array([clf.predict_proba(enc.encode(r))[0, 1] for r in rows])
+    assert np.max(np.abs(ref - got)) <= PARITY_TOL
+
+
+def test_encoding_matches_transform(model):
+    pipe, enc, rows, _ = model
+    expected = pipe[:-1].transform(pd.DataFrame(rows))
+    assert np.array_equal(enc.encode_many(rows), np.asarray(expected, dtype=float))
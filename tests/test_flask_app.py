@@ -0,0 +1,77 @@
+"""Admin and stats routes of flask_app, on a throwaway SQLite database."""
+import importlib
+import os
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("app")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{tmp / 'app.db'}",
+        "SNAPSHOT_DIR": str(tmp / "snapshots"),
+        "WARMUP": "0",
+        "MODEL_POLL_SECONDS": "0",
+        "MICROBATCH_ENABLED": "1",
+    })
+    sys.modules.pop("flask_app", None)
+    flask_app = importlib.import_module("flask_app")
+    flask_app.app.config["TESTING"] = True
+    return flask_app.app.test_client()
+
+
+def test_microbatch_stats(client):
+    resp = client.get("/api/microbatch/stats")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body["enabled"] is True
+    assert body["lifestyle"]["name"] == "lifestyle"
+    assert body["clinical"]["name"] == "clinical"
+
+
+@pytest.fixture
+def profiler(client, monkeypatch):
+    import flask_app
+    monkeypatch.setattr(flask_app.profiler, "token", "")
+    return flask_app.profiler
+
+
+def test_admin_profile_denied_without_token(client, profiler):
+    # the test client is a loopback client: that alone must not be enough
+    assert client.get("/admin/profile").status_code == 403
+    assert client.post("/admin/profile", json={"rate": 1.0}).status_code == 403
+    assert profiler.rate == 0.0
+
+
+def test_admin_profile_needs_the_token(client, profiler, monkeypatch):
+    monkeypatch.setattr(profiler, "token", "s3cret")
+    assert client.get("/admin/profile").status_code == 403
+    assert client.get("/admin/profile", headers={"X-Profile": "wrong"}).status_code == 403
+    resp = client.get("/admin/profile?format=json", headers={"X-Profile": "s3cret"})
+    assert resp.status_code == 200
+    assert resp.get_json()["token"] is True
+
+
+def test_models_reload_denied_without_admin_token(client, monkeypatch):
+    import flask_app
+    monkeypatch.setitem(flask_app.app.config, "MODEL_ADMIN_TOKEN", "")
+    monkeypatch.setattr(flask_app.profiler, "token", "p")
+    body = {"model": "clinical"}
+    assert client.post("/api/models/reload", json=body).status_code == 403
+    # the profiling token is not a model admin token
+    assert client.post("/api/models/reload", json=body, headers={"X-Profile": "p"}).status_code == 403
+
+
+def test_models_reload_needs_the_admin_token(client, monkeypatch):
+    import flask_app
+    monkeypatch.setitem(flask_app.app.config, "MODEL_ADMIN_TOKEN", "m0dels")
+    body = {"model": "clinical", "version": "19990101_000000"}
+    assert client.post("/api/models/reload", json=body).status_code == 403
+    assert client.post("/api/models/reload", json=body,
+                       headers={"X-Model-Admin": "wrong"}).status_code == 403
+    # authorized: an unknown version is rejected without writing a pin
+    resp = client.post("/api/models/reload", json=body, headers={"X-Model-Admin": "m0dels"})
+    assert resp.status_code == 404
+    assert flask_app.clinical_registry.pinned_version() is None
@@ -0,0 +1,366 @@
+# traffic_gen.py
+"""
+Synthetic form traffic that follows the training data distributions.
+
+    python traffic_gen.py fit --cardio-csv <BRFSS csv> [--out reports/traffic_model.json]
+    python traffic_gen.py generate --kind lifestyle -n 1000000 [--format jsonl|csv] [--out file]
+    python traffic_gen.py generate --kind mix -n 100000 --seed 7
+
+fit reads the DS1 BRFSS export (in chunks) and DS2/heart_cleveland_upload.csv
+and stores counts only:
+- the joint frequency of the categorical form fields (DS1: general health,
+  exercise, diabetes, sex, age category, smoking; DS2: chest pain, ECG,
+  slope, thalassemia, vessels, fasting sugar, exercise angina)
+- per group (DS1: sex x age category, DS2: chest pain type) the frequency
+  of every rounded numeric value.
+Sampling draws a categorical tuple from the joint table (with a little
+mass, --smoothing, on combinations built from the marginals so unseen but
+plausible combinations appear), then each numeric from its group, jittered
+within its rounding step.
+
+generate streams payloads in blocks, so any number of records can be written
+without holding them in memory. Kinds: lifestyle / clinical (the form keys
+the routes expect), register (/api/register), appointment (/api/appointments)
+and mix (one {"kind", "payload"} object per line).
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+CLEVELAND_CSV = ROOT / "DS2" / "heart_cleveland_upload.csv"
+MODEL_PATH = ROOT / "reports" / "traffic_model.json"
+BLOCK = 10000
+
+AGE_RANGES = {"18-24": (18, 24), "25-29": (25, 29), "30-34": (30, 34), "35-39": (35, 39),
+              "40-44": (40, 44), "45-49": (45, 49), "50-54": (50, 54), "55-59": (55, 59),
+              "60-64": (60, 64), "65-69": (65, 69), "70-74": (70, 74), "75-79": (75, 79),
+              "80+": (80, 90)}
+
+# dataset column, rounding step
+SPECS = {
+    "lifestyle": {
+        "cat": ["General_Health", "Exercise", "Diabetes", "Sex", "Age_Category", "Smoking_History"],
+        "group": ["Sex", "Age_Category"],
+        "num": {"Height_(cm)": 1.0, "Weight_(kg)": 0.5, "Alcohol_Consumption": 1.0,
+                "Fruit_Consumption": 1.0, "Green_Vegetables_Consumption": 1.0,
+                "FriedPotato_Consumption": 1.0},
+    },
+    "clinical": {
+        "cat": ["Chest Pain Type", "Resting ECG", "ST Slope", "Thalassemia",
+                "Major Vessels (0–3)", "Fasting Blood Sugar", "Exercise Angina"],
+        "group": ["Chest Pain Type"],
+        "num": {"Age (years)": 1.0, "Resting BP (mm Hg)": 2.0, "Cholesterol (mg/dl)": 5.0,
+                "Max Heart Rate (bpm)": 2.0, "ST Depression (oldpeak)": 0.2},
+    },
+}
+
+# dataset value -> value the form posts
+DIABETES_FORM = {"No, pre-diabetes or borderline diabetes": "Borderline",
+                 "Yes, but female told only during pregnancy": "Yes"}
+CHEST_PAIN_FORM = {0: "Typical Angina", 1: "Atypical Angina", 2: "Non-anginal Pain", 3: "Asymptomatic"}
+ECG_FORM = {0: "Normal", 1: "ST-T Wave Abnormality", 2: "Left Ventricular Hypertrophy"}
+SLOPE_FORM = {0: "Up", 1: "Flat", 2: "Down"}
+THAL_FORM = {0: "Normal", 1: "Fixed Defect", 2: "Reversable Defect"}
+
+
+# -------------------------------------------------
+# Fitting (counts only, chunk by chunk)
+# -------------------------------------------------
+class CountModel:
+    """Joint categorical counts + per-group counts of rounded numerics."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.rows = 0
+        self.joint = Counter()                                  # cat tuple -> n
+        self.numeric = defaultdict(lambda: defaultdict(Counter))  # group -> col -> value -> n
+
+    def update(self, df):
+        cat, group, num = self.spec["cat"], self.spec["group"], self.spec["num"]
+        df = df.dropna(subset=cat)
+        self.rows += len(df)
+        self.joint.update(df[cat].itertuples(index=False, name=None))
+        for key, part in df.groupby(group):
+            key = key if isinstance(key, tuple) else (key,)
+            for col, step in num.items():
+                vals = (part[col].dropna() / step).round().astype(int)
+                self.numeric[_gkey(key)][col].update(vals.value_counts().to_dict())
+
+    def to_json(self):
+        return {
+            "rows": self.rows,
+            "joint": [[list(map(_plain, k)), n] for k, n in self.joint.items()],
+            "numeric": {g: {c: {str(v): n for v, n in cnt.items()} for c, cnt in cols.items()}
+                        for g, cols in self.numeric.items()},
+        }
+
+
+def _gkey(values):
+    return json.dumps([_plain(v) for v in values], ensure_ascii=False)
+
+
+def _plain(v):
+    return v.item() if hasattr(v, "item") else v
+
+
+def fit(cardio_csv, out=MODEL_PATH, chunksize=100000):
+    import pandas as pd
+
+    model = {}
+    life = CountModel(SPECS["lifestyle"])
+    for chunk in pd.read_csv(cardio_csv, chunksize=chunksize):
+        life.update(chunk)
+    model["lifestyle"] = life.to_json()
+
+    clin = CountModel(SPECS["clinical"])
+    clin.update(pd.read_csv(CLEVELAND_CSV))
+    model["clinical"] = clin.to_json()
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(model, ensure_ascii=False), encoding="utf-8")
+    print(f"✅ {out} (lifestyle rows: {life.rows}, clinical rows: {clin.rows})", file=sys.stderr)
+    return out
+
+
+# -------------------------------------------------
+# Sampling
+# -------------------------------------------------
+class Sampler:
+    """Draws dataset-shaped rows (dicts) for one spec from the fitted counts."""
+
+    def __init__(self, spec, fitted, smoothing=0.05):
+        self.spec = spec
+        self.smoothing = smoothing
+        tuples = [tuple(k) for k, _ in fitted["joint"]]
+        counts = np.array([n for _, n in fitted["joint"]], dtype=float)
+        self.tuples = tuples
+        self.p = counts / counts.sum()
+        # per-column marginals, for the smoothing draws
+        self.marginals = []
+        for j in range(len(spec["cat"])):
+            m = Counter()
+            for t, n in zip(tuples, counts):
+                m[t[j]] += n
+            values = list(m)
+            probs = np.array([m[v] for v in values])
+            self.marginals.append((values, probs / probs.sum()))
+
+        self.group_idx = [spec["cat"].index(g) for g in spec["group"]]
+        self.numeric = {}
+        pooled = defaultdict(Counter)
+        for g, cols in fitted["numeric"].items():
+            self.numeric[g] = {}
+            for col, cnt in cols.items():
+                values = np.array([int(v) for v in cnt], dtype=float)
+                probs = np.array(list(cnt.values()), dtype=float)
+                self.numeric[g][col] = (values, probs / probs.sum())
+                pooled[col].update({int(v): n for v, n in cnt.items()})
+        self.pooled = {col: (np.array(list(c), dtype=float),
+                             np.array(list(c.values()), dtype=float) / sum(c.values()))
+                       for col, c in pooled.items()}
+
+    def block(self, rng, n):
+        idx = rng.choice(len(self.tuples), size=n, p=self.p)
+        rows = [list(self.tuples[i]) for i in idx]
+        for r in np.flatnonzero(rng.random(n) < self.smoothing):
+            rows[r] = [values[rng.choice(len(values), p=p)] for values, p in self.marginals]
+
+        by_group = defaultdict(list)
+        for r, row in enumerate(rows):
+            by_group[_gkey([row[j] for j in self.group_idx])].append(r)
+
+        cat = self.spec["cat"]
+        out = [dict(zip(cat, row)) for row in rows]
+        for g, members in by_group.items():
+            dists = self.numeric.get(g, {})
+            for col, step in self.spec["num"].items():
+                values, p = dists.get(col) or self.pooled[col]
+                draw = values[rng.choice(len(values), size=len(members), p=p)]
+                draw = (draw + rng.uniform(-0.5, 0.5, len(members))) * step
+                draw = np.round(draw / step) * step
+                draw = np.clip(draw, values.min() * step, values.max() * step).round(2) + 0.0
+                for r, v in zip(members, draw.tolist()):  # + 0.0: no "-0.0"
+                    out[r][col] = v
+        return out
+
+
+def lifestyle_payload(row, rng):
+    h, w = row["Height_(cm)"], row["Weight_(kg)"]
+    return {
+        "generalHealth": row["General_Health"],
+        "exercise": row["Exercise"],
+        "diabetes": DIABETES_FORM.get(row["Diabetes"], row["Diabetes"]),
+        "sex": row["Sex"],
+        "ageCategory": row["Age_Category"],
+        "bmi": f"{w / (h / 100.0) ** 2:.2f}",
+        "smoking": row["Smoking_History"],
+        "height": f"{h:g}",
+        "weight": f"{w:g}",
+        "alcohol": f"{row['Alcohol_Consumption']:g}",
+        "fruit": f"{row['Fruit_Consumption']:g}",
+        "veg": f"{row['Green_Vegetables_Consumption']:g}",
+        "fried": f"{row['FriedPotato_Consumption']:g}",
+    }
+
+
+def clinical_payload(row, rng):
+    return {
+        "age": str(int(row["Age (years)"])),
+        "restingBP": str(int(row["Resting BP (mm Hg)"])),
+        "cholesterol": str(int(row["Cholesterol (mg/dl)"])),
+        "fbs": str(int(row["Fasting Blood Sugar"])),
+        "restingECG": ECG_FORM[int(row["Resting ECG"])],
+        "maxHR": str(int(row["Max Heart Rate (bpm)"])),
+        "exAngina": "Yes" if int(row["Exercise Angina"]) == 1 else "No",
+        "oldpeak": f"{row['ST Depression (oldpeak)']:.1f}",
+        "slope": SLOPE_FORM[int(row["ST Slope"])],
+        "vessels": str(int(row["Major Vessels (0–3)"])),
+        "thal": THAL_FORM.get(int(row["Thalassemia"]), "Normal"),
+        "chestPain": CHEST_PAIN_FORM[int(row["Chest Pain Type"])],
+    }
+
+
+class TrafficGenerator:
+    """
+    Infinite, seeded payload streams:
+        gen = TrafficGenerator.load()
+        for payload in gen.stream("lifestyle", n=1000): ...
+    """
+
+    def __init__(self, model, seed=42, smoothing=0.05, n_users=100000,
+                 branch_codes=("LAB-CAI-01", "LAB-ALX-01", "LAB-GIZ-01")):
+        self.rng = np.random.default_rng(seed)
+        self.samplers = {k: Sampler(SPECS[k], model[k], smoothing) for k in SPECS if k in model}
+        self.n_users = n_users
+        self.branch_codes = list(branch_codes)
+        self._next_user = 0
+
+    @classmethod
+    def load(cls, path=MODEL_PATH, **kwargs):
+        return cls(json.loads(Path(path).read_text(encoding="utf-8")), **kwargs)
+
+    def _blocks(self, kind):
+        rng = self.rng
+        if kind in ("lifestyle", "clinical"):
+            to_payload = lifestyle_payload if kind == "lifestyle" else clinical_payload
+            while True:
+                yield [to_payload(r, rng) for r in self.samplers[kind].block(rng, BLOCK)]
+        elif kind == "register":
+            while True:
+                rows = self.samplers["lifestyle"].block(rng, BLOCK)
+                out = []
+                for r in rows:
+                    i = self._next_user
+                    self._next_user += 1
+                    lo, hi = AGE_RANGES[r["Age_Category"]]
+                    out.append({"username": f"synth_{i:07d}", "password": f"pw-{i:07d}",
+                                "name": f"Synthetic Patient {i}", "age": int(rng.integers(lo, hi + 1))})
+                yield out
+        elif kind == "appointment":
+            today = date.today()
+            while True:
+                users = rng.integers(0, max(1, self.n_users), BLOCK)
+                days = rng.integers(1, 61, BLOCK)
+                hours = rng.integers(8, 18, BLOCK)
+                halves = rng.integers(0, 2, BLOCK)
+                branches = rng.integers(0, len(self.branch_codes), BLOCK)
+                yield [{"username": f"synth_{u:07d}", "branch_code": self.branch_codes[b],
+                        "date": (today + timedelta(days=int(d))).isoformat(),
+                        "time": f"{h:02d}:{'30' if m else '00'}"}
+                       for u, d, h, m, b in zip(users, days, hours, halves, branches)]
+        else:
+            raise ValueError(f"unknown kind {kind!r}")
+
+    def stream(self, kind, n=None, mix=None):
+        """Yield n payloads (forever if n is None). kind="mix" yields {"kind", "payload"}."""
+        if kind == "mix":
+            yield from self._mix(n, mix or {"lifestyle": 50, "clinical": 30,
+                                            "register": 10, "appointment": 10})
+            return
+        produced = 0
+        for block in self._blocks(kind):
+            for payload in block:
+                if n is not None and produced >= n:
+                    return
+                produced += 1
+                yield payload
+
+    def _mix(self, n, weights):
+        kinds = list(weights)
+        p = np.array([weights[k] for k in kinds], dtype=float)
+        streams = {k: self.stream(k) for k in kinds}
+        produced = 0
+        while n is None or produced < n:
+            for k in self.rng.choice(kinds, size=BLOCK if n is None else min(BLOCK, n - produced),
+                                     p=p / p.sum()):
+                yield {"kind": str(k), "payload": next(streams[k])}
+                produced += 1
+
+
+# -------------------------------------------------
+# CLI
+# -------------------------------------------------
+def write(records, out, fmt):
+    fh = open(out, "w", encoding="utf-8", newline="") if out else sys.stdout
+    try:
+        if fmt == "csv":
+            writer = None
+            for rec in records:
+                if writer is None:
+                    writer = csv.DictWriter(fh, fieldnames=list(rec))
+                    writer.writeheader()
+                writer.writerow(rec)
+        else:
+            for rec in records:
+                fh.write(json.dumps(rec, ensure_ascii=False))
+                fh.write("\n")
+    finally:
+        if out:
+            fh.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic form traffic from the training data")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    f = sub.add_parser("fit", help="learn category / value frequencies")
+    f.add_argument("--cardio-csv", required=True, help="DS1 BRFSS export")
+    f.add_argument("--out", default=str(MODEL_PATH))
+
+    g = sub.add_parser("generate", help="stream payloads")
+    g.add_argument("--kind", default="lifestyle",
+                   choices=["lifestyle", "clinical", "register", "appointment", "mix"])
+    g.add_argument("-n", type=int, default=1000)
+    g.add_argument("--model", default=str(MODEL_PATH))
+    g.add_argument("--seed", type=int, default=42)
+    g.add_argument("--smoothing", type=float, default=0.05,
+                   help="share of rows drawn from independent marginals")
+    g.add_argument("--users", type=int, default=100000,
+                   help="appointments reference synth_0000000 .. synth_<users-1>")
+    g.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    g.add_argument("--out", help="file (default stdout)")
+
+    args = parser.parse_args()
+    if args.command == "fit":
+        fit(args.cardio_csv, args.out)
+        return
+    if args.kind == "mix" and args.format == "csv":
+        parser.error("--kind mix only supports jsonl")
+    gen = TrafficGenerator.load(args.model, seed=args.seed, smoothing=args.smoothing,
+                                n_users=args.users)
+    try:
+        write(gen.stream(args.kind, args.n), args.out, args.format)
+    except BrokenPipeError:  # e.g. piped into head
+        pass
+
+
+if __name__ == "__main__":
+    main()